@@ -1,3 +1,4 @@
 from app.api.face_analysis import router as face_analysis_router
 from app.api.health import router as health_router
-from app.api.analytics import router as analytics_router
\ No newline at end of file
+from app.api.analytics import router as analytics_router
+from app.api.webhooks import router as webhooks_router
\ No newline at end of file
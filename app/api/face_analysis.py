@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, Query, Path, WebSocket, WebSocketDisconnect
+import asyncio
 import logging
 import numpy as np
+import os
 import uuid
-from typing import Optional
-import base64
+from typing import List, Optional
 import json
 
-from app.models.responses import FaceAnalysisResponse, ClientInfo
+from app.models.responses import FaceAnalysisResponse, BatchFaceAnalysisResponse, BatchImageResult, VideoFaceAnalysisResponse, ClientInfo
 from app.models.enums import FaceShapeEnum
 from app.utils.client_info import extract_client_info
-from app.utils.image_processing import validate_image_file, read_image_file
-from app.core.face_detection import get_face_image
-from app.core.face_analysis import generate_full_analysis
+from app.utils.image_processing import validate_image_file, decode_image_bytes, save_video_upload
+from app.core.vision_pool import run_vision_job
+from app.core.face_tracking import FaceTracker
+from app.core.video_analysis import analyze_video_file
+from app.core.face_detection import project_face_coordinates
+from app.core.face_shape_data import load_face_shape_data, get_recommended_frame_types
+from app.services.blob_store import put_blob
+from app.services.result_cache import client_cache_scope
 from app.core.frame_matching import get_combined_result
-from app.services.tasks import detect_face_task, analyze_face_shape_task, match_frames_task
+from app.services.tasks import detect_face_task, analyze_pipeline_task
 from app.db.repository import save_analysis_result, save_recommendation
+from app.config import settings
 from celery.result import AsyncResult
 
 # تنظیمات لاگر
@@ -65,49 +72,69 @@ async def analyze_face(
 
         # پردازش غیرهمزمان
         if async_process:
-            # خواندن تصویر و تبدیل به base64
+            # ذخیره یک‌باره تصویر در مخزن داده‌ها؛ فقط مرجع آن در پیام وظیفه ارسال می‌شود
             image_content = await file.read()
-            image_base64 = base64.b64encode(image_content).decode('utf-8')
             await file.seek(0)  # بازگشت به ابتدای فایل
+            image_ref = await asyncio.to_thread(put_blob, image_content)
 
             # ارسال وظیفه به Celery
-            task = detect_face_task.delay(
-                image_data=image_base64,
-                user_id=user_id,
-                request_id=request_id,
-                client_info=client_info_dict
-            )
+            if settings.CELERY_PIPELINE_MODE == "chained":
+                # شناسه وظیفه پایانی از قبل تعیین می‌شود تا با یک بار بررسی وضعیت نتیجه نهایی دیده شود
+                task_id = str(uuid.uuid4())
+                detect_face_task.delay(
+                    image_ref=image_ref,
+                    user_id=user_id,
+                    request_id=request_id,
+                    client_info=client_info_dict,
+                    final_task_id=task_id
+                )
+            else:
+                task = analyze_pipeline_task.delay(
+                    image_ref=image_ref,
+                    user_id=user_id,
+                    request_id=request_id,
+                    client_info=client_info_dict,
+                    include_frames=include_frames,
+                    min_price=min_price,
+                    max_price=max_price,
+                    limit=limit
+                )
+                task_id = task.id
 
             # برگرداندن پاسخ با شناسه وظیفه
             return FaceAnalysisResponse(
                 success=True,
                 message="پردازش تصویر آغاز شد. برای بررسی وضعیت، از شناسه وظیفه استفاده کنید.",
-                task_id=task.id,
+                task_id=task_id,
                 client_info=client_info
             )
 
         # پردازش همزمان
         else:
-            # خواندن تصویر
-            image = await read_image_file(file)
-            if image is None:
+            # خواندن محتوای فایل؛ پردازش تصویر در استخر پروسه‌ها انجام می‌شود
+            image_content = await file.read()
+            await file.seek(0)
+
+            # تشخیص و تحلیل چهره بدون مسدود کردن event loop
+            pipeline_result = await run_vision_job(
+                image_content, client_cache_scope(client_info_dict))
+            stage = pipeline_result.get("stage")
+
+            if stage == "decode":
                 raise HTTPException(
                     status_code=400, detail="خطا در خواندن فایل تصویر")
 
-            # تشخیص چهره در تصویر
-            success, detection_result, face_image = get_face_image(image)
-
-            if not success:
+            if stage in ("detection", "error"):
                 return FaceAnalysisResponse(
                     success=False,
-                    message=detection_result.get(
-                        "message", "خطا در تشخیص چهره"),
+                    message=pipeline_result.get(
+                        "message") or "خطا در تشخیص چهره",
                     client_info=client_info
                 )
 
             # آنالیز شکل چهره
-            face_coordinates = detection_result.get("face")
-            analysis_result = generate_full_analysis(image, face_coordinates)
+            face_coordinates = pipeline_result.get("face_coordinates")
+            analysis_result = pipeline_result.get("analysis", {})
 
             if not analysis_result.get("success", False):
                 return FaceAnalysisResponse(
@@ -185,6 +212,442 @@ async def analyze_face(
             status_code=500, detail=f"خطا در پردازش درخواست: {str(e)}")
 
 
+@router.post("/analyze/batch", response_model=BatchFaceAnalysisResponse)
+async def analyze_face_batch(
+    files: List[UploadFile] = File(...),
+    include_frames: bool = Form(True),
+    min_price: Optional[float] = Form(None),
+    max_price: Optional[float] = Form(None),
+    limit: int = Form(15),
+    request: Request = None
+):
+    """
+    آنالیز دسته‌ای چند تصویر چهره در یک درخواست.
+
+    این API:
+    1. چند تصویر را دریافت می‌کند (حداکثر BATCH_MAX_FILES)
+    2. تصاویر را به صورت همزمان (حداکثر BATCH_MAX_PARALLEL) در استخر پردازش تصویر تحلیل می‌کند
+    3. برای هر شکل چهره متمایز فقط یک بار فریم‌های پیشنهادی را از کاتالوگ دریافت می‌کند
+    4. نتیجه هر تصویر را به ترتیب ارسال برمی‌گرداند
+
+    خطای یک تصویر باعث شکست کل درخواست نمی‌شود و فقط در نتیجه همان تصویر ثبت می‌شود.
+    """
+    try:
+        # استخراج اطلاعات مرورگر و دستگاه کاربر
+        client_info = extract_client_info(request) if request else None
+        client_info_dict = client_info.dict() if client_info else {}
+
+        if not files:
+            raise HTTPException(
+                status_code=400, detail="هیچ تصویری ارسال نشده است")
+
+        if len(files) > settings.BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"حداکثر {settings.BATCH_MAX_FILES} تصویر در هر درخواست مجاز است")
+
+        # یک شناسه کاربر و درخواست برای کل دسته
+        user_id = str(uuid.uuid4())
+        request_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+
+        semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_PARALLEL))
+
+        async def process_image(file: UploadFile):
+            # بررسی اعتبار تصویر
+            if not await validate_image_file(file):
+                return {"stage": "decode", "message": "فایل تصویر نامعتبر است"}
+
+            image_content = await file.read()
+            async with semaphore:
+                try:
+                    return await run_vision_job(
+                        image_content, client_cache_scope(client_info_dict))
+                except Exception as e:
+                    logger.error(f"خطا در پردازش تصویر {file.filename}: {str(e)}")
+                    return {"stage": "error", "message": f"خطا در پردازش تصویر: {str(e)}"}
+
+        pipeline_results = await asyncio.gather(
+            *(process_image(file) for file in files))
+
+        # ساخت نتیجه هر تصویر به ترتیب ارسال
+        results = []
+        analysed = []
+        for index, (file, pipeline_result) in enumerate(zip(files, pipeline_results)):
+            item = {
+                "index": index,
+                "filename": file.filename,
+                "success": False,
+                "face_coordinates": pipeline_result.get("face_coordinates")
+            }
+            stage = pipeline_result.get("stage")
+            analysis_result = pipeline_result.get("analysis", {})
+
+            if stage == "decode":
+                item["message"] = pipeline_result.get(
+                    "message") or "خطا در خواندن فایل تصویر"
+            elif stage in ("detection", "error"):
+                item["message"] = pipeline_result.get(
+                    "message") or "خطا در تشخیص چهره"
+            elif not analysis_result.get("success", False):
+                item["message"] = analysis_result.get(
+                    "message", "خطا در تحلیل شکل چهره")
+            else:
+                item.update({
+                    "success": True,
+                    "message": "تحلیل چهره با موفقیت انجام شد",
+                    "face_shape": analysis_result.get("face_shape"),
+                    "confidence": analysis_result.get("confidence"),
+                    "description": analysis_result.get("description"),
+                    "recommendation": analysis_result.get("recommendation"),
+                    "recommended_frame_types": analysis_result.get(
+                        "recommended_frame_types", [])
+                })
+                analysed.append(item)
+
+            results.append(item)
+
+        # ذخیره نتایج تحلیل در دیتابیس
+        analysis_ids = await asyncio.gather(*(
+            save_analysis_result(
+                user_id=user_id,
+                request_id=request_id,
+                face_shape=item["face_shape"],
+                confidence=item["confidence"],
+                client_info=client_info_dict
+            )
+            for item in analysed
+        ))
+
+        # دریافت فریم‌های پیشنهادی فقط یک بار برای هر شکل چهره متمایز
+        if include_frames and analysed:
+            face_shapes = list(dict.fromkeys(item["face_shape"] for item in analysed))
+            frames_results = dict(zip(face_shapes, await asyncio.gather(*(
+                get_combined_result(
+                    face_shape=face_shape,
+                    min_price=min_price,
+                    max_price=max_price,
+                    limit=limit
+                )
+                for face_shape in face_shapes
+            ))))
+
+            for face_shape, frames_result in frames_results.items():
+                if not frames_result.get("success", False):
+                    logger.warning(
+                        f"خطا در دریافت فریم‌های پیشنهادی برای {face_shape}: {frames_result.get('message')}")
+
+            # ذخیره پیشنهادات در دیتابیس
+            await asyncio.gather(*(
+                save_recommendation(
+                    user_id=user_id,
+                    face_shape=item["face_shape"],
+                    recommended_frame_types=frames_results[item["face_shape"]].get(
+                        "recommended_frame_types", []),
+                    recommended_frames=frames_results[item["face_shape"]].get(
+                        "recommended_frames", []),
+                    client_info=client_info_dict,
+                    analysis_id=analysis_id
+                )
+                for item, analysis_id in zip(analysed, analysis_ids)
+                if frames_results[item["face_shape"]].get("success", False)
+            ))
+
+            for item in analysed:
+                item["recommended_frames"] = frames_results[item["face_shape"]].get(
+                    "recommended_frames", [])
+
+        succeeded = len(analysed)
+        return BatchFaceAnalysisResponse(
+            success=succeeded > 0,
+            message=f"تحلیل {succeeded} تصویر از {len(files)} تصویر با موفقیت انجام شد",
+            total=len(files),
+            succeeded=succeeded,
+            failed=len(files) - succeeded,
+            results=[BatchImageResult(**item) for item in results],
+            client_info=client_info
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"خطا در پردازش درخواست آنالیز دسته‌ای: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"خطا در پردازش درخواست: {str(e)}")
+
+
+@router.post("/analyze/video", response_model=VideoFaceAnalysisResponse)
+async def analyze_face_video(
+    file: UploadFile = File(...),
+    include_frames: bool = Form(True),
+    min_price: Optional[float] = Form(None),
+    max_price: Optional[float] = Form(None),
+    limit: int = Form(15),
+    request: Request = None
+):
+    """
+    آنالیز شکل چهره در یک ویدیوی کوتاه سلفی.
+
+    این API:
+    1. ویدیو را دریافت می‌کند (mp4، mov، webm یا mkv)
+    2. فریم‌ها را به صورت جریانی می‌خواند و فقط فریم‌های نمونه را تحلیل می‌کند
+    3. پس از رسیدن اطمینان تجمیعی به آستانه، خواندن را متوقف می‌کند
+    4. شکل چهره تجمیعی، زمان‌بندی هر فریم نمونه و در صورت درخواست فریم‌های پیشنهادی را برمی‌گرداند
+    """
+    video_path = None
+    try:
+        # استخراج اطلاعات مرورگر و دستگاه کاربر
+        client_info = extract_client_info(request) if request else None
+        client_info_dict = client_info.dict() if client_info else {}
+
+        video_path = await save_video_upload(file)
+        if video_path is None:
+            raise HTTPException(
+                status_code=400, detail="فایل ویدیو نامعتبر است")
+
+        user_id = str(uuid.uuid4())
+        request_id = getattr(request.state, 'request_id', str(uuid.uuid4()))
+
+        # خواندن و تحلیل فریم‌ها بدون مسدود کردن event loop
+        result = await asyncio.to_thread(analyze_video_file, video_path)
+
+        video_info = result.get("video", {})
+        response = VideoFaceAnalysisResponse(
+            success=result.get("success", False),
+            message=result.get("message", "خطا در تحلیل ویدیو"),
+            face_shape=result.get("face_shape"),
+            confidence=result.get("confidence"),
+            agreement=result.get("agreement"),
+            description=result.get("description"),
+            recommendation=result.get("recommendation"),
+            recommended_frame_types=result.get("recommended_frame_types"),
+            frames=result.get("frames", []),
+            stopped_early=result.get("stopped_early", False),
+            duration_seconds=video_info.get("duration_seconds"),
+            elapsed_ms=result.get("elapsed_ms"),
+            client_info=client_info
+        )
+
+        if not response.success:
+            return response
+
+        analysis_id = await save_analysis_result(
+            user_id=user_id,
+            request_id=request_id,
+            face_shape=response.face_shape,
+            confidence=response.confidence,
+            client_info=client_info_dict
+        )
+
+        if include_frames:
+            frames_result = await get_combined_result(
+                face_shape=response.face_shape,
+                min_price=min_price,
+                max_price=max_price,
+                limit=limit
+            )
+
+            if frames_result.get("success", False):
+                await save_recommendation(
+                    user_id=user_id,
+                    face_shape=response.face_shape,
+                    recommended_frame_types=frames_result.get(
+                        "recommended_frame_types", []),
+                    recommended_frames=frames_result.get(
+                        "recommended_frames", []),
+                    client_info=client_info_dict,
+                    analysis_id=analysis_id
+                )
+            else:
+                logger.warning(
+                    f"خطا در دریافت فریم‌های پیشنهادی: {frames_result.get('message')}")
+
+            response.recommended_frames = frames_result.get(
+                "recommended_frames", [])
+
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"خطا در پردازش درخواست آنالیز ویدیو: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"خطا در پردازش درخواست: {str(e)}")
+    finally:
+        if video_path is not None and os.path.exists(video_path):
+            os.remove(video_path)
+
+
+@router.websocket("/analyze/stream")
+async def analyze_face_stream(
+    websocket: WebSocket,
+    include_frames: bool = Query(True),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    limit: int = Query(15)
+):
+    """
+    تحلیل زنده چهره از جریان تصاویر دوربین.
+
+    کلاینت فریم‌ها را به صورت پیام‌های باینری JPEG ارسال می‌کند و برای هر فریم
+    پردازش شده یک پیام status (وضعیت ردیابی و شکل چهره پیشرو) دریافت می‌کند.
+    وقتی رأی‌گیری شکل چهره پایدار شد، یک پیام result شامل توضیحات و فریم‌های
+    پیشنهادی ارسال می‌شود.
+
+    اگر فریم‌ها سریع‌تر از پردازش برسند فقط آخرین فریم پردازش می‌شود.
+    """
+    await websocket.accept()
+
+    client_info = extract_client_info(websocket)
+    client_info_dict = client_info.dict() if client_info else {}
+    user_id = str(uuid.uuid4())
+    request_id = str(uuid.uuid4())
+
+    tracker = FaceTracker()
+    latest = {"frame": None, "dropped": 0}
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            data = message.get("bytes")
+            if not data or len(data) > settings.STREAM_MAX_FRAME_BYTES:
+                continue
+
+            # فریم قبلی اگر هنوز پردازش نشده باشد کنار گذاشته می‌شود
+            if latest["frame"] is not None:
+                latest["dropped"] += 1
+            latest["frame"] = data
+            frame_ready.set()
+
+    def process_frame_bytes(data: bytes) -> Optional[dict]:
+        # دیکد و ردیابی هر دو خارج از event loop انجام می‌شوند
+        image, scale = decode_image_bytes(data)
+        if image is None:
+            return None
+
+        status = tracker.process_frame(image)
+        if scale != 1.0 and status.get("face_coordinates"):
+            original_shape = (int(round(image.shape[0] / scale)),
+                              int(round(image.shape[1] / scale)))
+            status["face_coordinates"] = project_face_coordinates(
+                status["face_coordinates"], scale, original_shape)
+        return status
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            waiter = asyncio.create_task(frame_ready.wait())
+            done, _ = await asyncio.wait(
+                {receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                waiter.cancel()
+                receiver.result()
+                break
+
+            frame_ready.clear()
+            data, latest["frame"] = latest["frame"], None
+
+            status = await asyncio.to_thread(process_frame_bytes, data)
+            if status is None:
+                await websocket.send_json({
+                    "type": "status",
+                    "tracking": "error",
+                    "message": "خطا در خواندن فریم"
+                })
+                continue
+
+            status["dropped_frames"] = latest["dropped"]
+
+            await websocket.send_json({"type": "status", **status})
+
+            if status["stable"]:
+                result = await _build_stream_result(
+                    status, user_id, request_id, client_info_dict,
+                    include_frames, min_price, max_price, limit)
+                await websocket.send_json(result)
+
+    except WebSocketDisconnect:
+        logger.info(
+            f"جریان دوربین بسته شد ({tracker.frames} فریم، {tracker.keyframes} فریم کلیدی)")
+    except Exception as e:
+        logger.error(f"خطا در پردازش جریان دوربین: {str(e)}")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            # اتصال ممکن است پیش‌تر بسته شده باشد
+            pass
+    finally:
+        receiver.cancel()
+
+
+async def _build_stream_result(
+    status: dict,
+    user_id: str,
+    request_id: str,
+    client_info_dict: dict,
+    include_frames: bool,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    limit: int
+) -> dict:
+    """ساخت و ذخیره نتیجه پایدار شده جریان دوربین"""
+    face_shape = status["face_shape"]
+    confidence = status["confidence"]
+
+    face_shape_info = load_face_shape_data().get(
+        "face_shapes", {}).get(face_shape, {})
+    result = {
+        "type": "result",
+        "success": True,
+        "message": "تحلیل چهره با موفقیت انجام شد",
+        "frame": status["frame"],
+        "face_coordinates": status["face_coordinates"],
+        "face_shape": face_shape,
+        "confidence": confidence,
+        "description": face_shape_info.get("description", ""),
+        "recommendation": face_shape_info.get("recommendation", ""),
+        "recommended_frame_types": get_recommended_frame_types(face_shape),
+        "recommended_frames": []
+    }
+
+    analysis_id = await save_analysis_result(
+        user_id=user_id,
+        request_id=request_id,
+        face_shape=face_shape,
+        confidence=confidence,
+        client_info=client_info_dict
+    )
+
+    if include_frames:
+        frames_result = await get_combined_result(
+            face_shape=face_shape,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit
+        )
+
+        if frames_result.get("success", False):
+            result["recommended_frames"] = frames_result.get(
+                "recommended_frames", [])
+            await save_recommendation(
+                user_id=user_id,
+                face_shape=face_shape,
+                recommended_frame_types=frames_result.get(
+                    "recommended_frame_types", []),
+                recommended_frames=result["recommended_frames"],
+                client_info=client_info_dict,
+                analysis_id=analysis_id
+            )
+        else:
+            logger.warning(
+                f"خطا در دریافت فریم‌های پیشنهادی: {frames_result.get('message')}")
+
+    return result
+
+
 @router.get("/analyze/{task_id}", response_model=FaceAnalysisResponse)
 async def get_analysis_status(task_id: str):
     """
@@ -199,10 +662,18 @@ async def get_analysis_status(task_id: str):
 
         # اگر وظیفه هنوز کامل نشده است
         if not task_result.ready():
+            # در حالت یکپارچه مرحله فعلی و نتایج جزئی در دسترس است
+            progress = task_result.info if isinstance(
+                task_result.info, dict) else {}
+            stage = progress.get("stage")
+            status = f"{task_result.state} ({stage})" if stage else task_result.state
             return FaceAnalysisResponse(
                 success=True,
-                message=f"پردازش در حال انجام است. وضعیت: {task_result.state}",
-                task_id=task_id
+                message=f"پردازش در حال انجام است. وضعیت: {status}",
+                task_id=task_id,
+                face_coordinates=progress.get("face_coordinates"),
+                face_shape=progress.get("face_shape"),
+                confidence=progress.get("confidence")
             )
 
         # اگر وظیفه با خطا مواجه شده است
@@ -229,8 +700,11 @@ async def get_analysis_status(task_id: str):
             success=True,
             message="پردازش تصویر با موفقیت انجام شد",
             task_id=task_id,
+            face_coordinates=result.get("face_coordinates"),
             face_shape=result.get("face_shape"),
             confidence=result.get("confidence"),
+            description=result.get("description"),
+            recommendation=result.get("recommendation"),
             recommended_frame_types=result.get("recommended_frame_types", []),
             recommended_frames=result.get("recommended_frames", [])
         )
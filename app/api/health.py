@@ -47,3 +47,55 @@ async def health_check(config: settings = Depends(get_settings)):
         database_status=db_status,
         celery_status=celery_status
     )
+
+
+@router.get("/health/models")
+async def models_status():
+    """
+    وضعیت مدل‌های بارگیری شده در این پروسه.
+
+    زمان بارگیری و حافظه هر مدل و آمار استفاده از استخر نشست‌های MediaPipe
+    (hit/miss) را برمی‌گرداند.
+    """
+    from app.core.mediapipe_pool import get_session_pool_stats
+    from app.core.model_registry import get_model_stats
+
+    return {
+        "success": True,
+        "models": get_model_stats(),
+        "mediapipe_pools": get_session_pool_stats()
+    }
+
+
+@router.get("/health/detectors")
+async def detectors_status():
+    """
+    آمار روش‌های تشخیص چهره در این پروسه.
+
+    نرخ موفقیت، میانگین زمان پاسخ و تعداد درخواست‌های پاسخ داده شده توسط هر روش
+    را به تفکیک کلاس اندازه تصویر برمی‌گرداند.
+    """
+    from app.core.detector_cascade import get_detector_stats
+
+    return {
+        "success": True,
+        "detectors": get_detector_stats()
+    }
+
+
+@router.get("/health/vision-pool")
+async def vision_pool_status():
+    """
+    وضعیت استخر پروسه‌های پردازش تصویر.
+
+    عمق صف، تعداد درخواست‌های در حال اجرا و میزان استفاده از هر ورکر را
+    برمی‌گرداند.
+    """
+    from app.core.vision_pool import get_vision_pool_stats
+    from app.services.result_cache import get_result_cache_stats
+
+    return {
+        "success": True,
+        "vision_pool": get_vision_pool_stats(),
+        "result_cache": get_result_cache_stats()
+    }
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Request
+import json
+import logging
+
+from app.config import settings
+from app.services.woocommerce import verify_webhook_signature, apply_product_webhook
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# تعریف روتر
+router = APIRouter()
+
+# موضوعات وب‌هوک محصول که روی کش اعمال می‌شوند
+PRODUCT_TOPICS = {"product.created", "product.updated", "product.deleted", "product.restored"}
+
+
+@router.post("/webhooks/woocommerce")
+async def woocommerce_webhook(request: Request):
+    """
+    دریافت وب‌هوک‌های محصول WooCommerce.
+
+    تغییرات محصول (ایجاد، ویرایش، حذف و بازیابی) پس از بررسی امضای
+    X-WC-Webhook-Signature بلافاصله روی کش محصولات اعمال و در دیتابیس ذخیره
+    می‌شوند، بنابراین تغییر موجودی و قیمت بدون دانلود دوباره کاتالوگ دیده
+    می‌شود.
+    """
+    body = await request.body()
+    topic = request.headers.get("X-WC-Webhook-Topic", "")
+
+    # WooCommerce هنگام ساخت وب‌هوک یک درخواست آزمایشی بدون موضوع می‌فرستد
+    if not topic and body.startswith(b"webhook_id="):
+        return {"success": True, "message": "وب‌هوک ثبت شد"}
+
+    if not settings.WOOCOMMERCE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="دریافت وب‌هوک پیکربندی نشده است")
+
+    if not verify_webhook_signature(body, request.headers.get("X-WC-Webhook-Signature")):
+        logger.warning(
+            f"امضای نامعتبر وب‌هوک WooCommerce (تحویل {request.headers.get('X-WC-Webhook-Delivery-ID')})")
+        raise HTTPException(status_code=401, detail="امضای وب‌هوک نامعتبر است")
+
+    if topic not in PRODUCT_TOPICS:
+        return {"success": True, "message": f"موضوع {topic} پردازش نمی‌شود", "action": "ignored"}
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="بدنه وب‌هوک JSON معتبر نیست")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="بدنه وب‌هوک JSON معتبر نیست")
+
+    result = await apply_product_webhook(topic, payload)
+    return {
+        "success": True,
+        "message": "وب‌هوک محصول اعمال شد",
+        **result
+    }
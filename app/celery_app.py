@@ -1,6 +1,12 @@
+import logging
+
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.config import settings
 
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
 # تنظیمات Celery
 app = Celery(
     "eyeglass_recommendation",
@@ -13,12 +19,14 @@ app.conf.task_routes = {
     "app.services.tasks.detect_face": {"queue": "face_detection"},
     "app.services.tasks.analyze_face_shape": {"queue": "face_analysis"},
     "app.services.tasks.match_frames": {"queue": "frame_matching"},
+    "app.services.tasks.analyze_pipeline": {"queue": "face_analysis"},
 }
 
 # تنظیمات اضافی
 app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
+    # پیام وظایف با msgpack؛ json برای پیام‌های قدیمی در صف پذیرفته می‌شود
+    task_serializer=settings.CELERY_TASK_SERIALIZER,
+    accept_content=["msgpack", "json"],
     result_serializer="json",
     task_track_started=True,
     task_time_limit=180,  # 3 دقیقه حداکثر زمان اجرای هر وظیفه
@@ -27,4 +35,33 @@ app.conf.update(
 )
 
 # ایمپورت تسک‌ها برای دسترسی
-app.autodiscover_tasks(["app.services.tasks"])
\ No newline at end of file
+app.autodiscover_tasks(["app.services.tasks"])
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """آماده‌سازی event loop، اتصال دیتابیس و مدل‌ها در هر پروسه ورکر پیش از دریافت اولین وظیفه"""
+    from app.worker_runtime import start_worker_runtime
+    start_worker_runtime()
+
+    if settings.MODEL_WARMUP:
+        try:
+            # واردسازی ماژول‌ها برای ثبت مدل‌ها در رجیستری
+            import app.core.face_detection  # noqa: F401
+            import app.services.classifier  # noqa: F401
+            from app.core.model_registry import warmup_models
+            warmup_models()
+        except Exception as e:
+            logger.warning(f"خطا در گرم کردن مدل‌ها در ورکر: {str(e)}")
+
+    from app.services.classifier import start_model_watcher
+    start_model_watcher()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    """بستن اتصال دیتابیس و توقف event loop پروسه ورکر"""
+    from app.worker_runtime import stop_worker_runtime
+    from app.services.classifier import stop_model_watcher
+    stop_model_watcher()
+    stop_worker_runtime()
@@ -27,6 +27,15 @@ class Settings(BaseSettings):
     # تنظیمات Celery
     CELERY_BROKER_URL: str = Field(default="redis://redis:6379/0", env="CELERY_BROKER_URL")
     CELERY_RESULT_BACKEND: str = Field(default="redis://redis:6379/0", env="CELERY_RESULT_BACKEND")
+    CELERY_TASK_SERIALIZER: str = Field(default="msgpack", env="CELERY_TASK_SERIALIZER")
+    # حالت پردازش غیرهمزمان: fused (یک وظیفه برای همه مراحل) یا chained (زنجیره سه وظیفه)
+    CELERY_PIPELINE_MODE: str = Field(default="fused", env="CELERY_PIPELINE_MODE")
+    
+    # مخزن داده‌های باینری بین مراحل Celery (redis یا local)
+    BLOB_STORE_BACKEND: str = Field(default="redis", env="BLOB_STORE_BACKEND")
+    BLOB_STORE_REDIS_URL: str = Field(default="", env="BLOB_STORE_REDIS_URL")
+    BLOB_STORE_DIR: str = Field(default="uploads/blobs", env="BLOB_STORE_DIR")
+    BLOB_STORE_TTL_SECONDS: int = Field(default=900, env="BLOB_STORE_TTL_SECONDS")
     
     # تنظیمات WooCommerce API
     WOOCOMMERCE_API_URL: str = Field(
@@ -42,6 +51,14 @@ class Settings(BaseSettings):
         env="WOOCOMMERCE_CONSUMER_SECRET"
     )
     WOOCOMMERCE_PER_PAGE: int = Field(default=100, env="WOOCOMMERCE_PER_PAGE")
+    # تعداد درخواست‌های هم‌زمان دانلود کاتالوگ و تعداد تلاش مجدد هر صفحه
+    WOOCOMMERCE_MAX_CONCURRENCY: int = Field(default=6, env="WOOCOMMERCE_MAX_CONCURRENCY")
+    WOOCOMMERCE_MAX_RETRIES: int = Field(default=3, env="WOOCOMMERCE_MAX_RETRIES")
+    # همگام‌سازی تغییرات محصولات (0 یعنی غیرفعال) و حداکثر فاصله بروزرسانی کامل
+    WOOCOMMERCE_SYNC_INTERVAL_MINUTES: int = Field(default=15, env="WOOCOMMERCE_SYNC_INTERVAL_MINUTES")
+    WOOCOMMERCE_FULL_REFRESH_HOURS: float = Field(default=96.0, env="WOOCOMMERCE_FULL_REFRESH_HOURS")
+    # کلید امضای وب‌هوک‌های محصول (خالی یعنی پذیرش وب‌هوک غیرفعال است)
+    WOOCOMMERCE_WEBHOOK_SECRET: str = Field(default="", env="WOOCOMMERCE_WEBHOOK_SECRET")
     
     # تنظیمات تشخیص چهره
     FACE_DETECTION_MODEL: str = Field(
@@ -50,6 +67,80 @@ class Settings(BaseSettings):
     )
     CONFIDENCE_THRESHOLD: float = Field(default=0.5, env="CONFIDENCE_THRESHOLD")
     
+    # حداقل اندازه بزرگ‌ترین بعد تصویر آپلودی پس از دیکد با وضوح کاهش یافته (0 یعنی وضوح کامل)
+    UPLOAD_DECODE_MAX_DIM: int = Field(default=1600, env="UPLOAD_DECODE_MAX_DIM")
+    
+    # حالت تشخیص چهره: downscale (تشخیص روی تصویر کوچک) یا legacy (حذف نویز روی 1200 پیکسل)
+    FACE_DETECTION_MODE: str = Field(default="downscale", env="FACE_DETECTION_MODE")
+    FACE_DETECTION_MAX_DIM: int = Field(default=480, env="FACE_DETECTION_MAX_DIM")
+    
+    # ترتیب‌دهی تطبیقی روش‌های تشخیص چهره براساس آمار زنده
+    DETECTOR_ADAPTIVE: bool = Field(default=True, env="DETECTOR_ADAPTIVE")
+    DETECTOR_STATS_WINDOW: int = Field(default=200, env="DETECTOR_STATS_WINDOW")
+    DETECTOR_MIN_SAMPLES: int = Field(default=20, env="DETECTOR_MIN_SAMPLES")
+    DETECTOR_SKIP_HIT_RATE: float = Field(default=0.02, env="DETECTOR_SKIP_HIT_RATE")
+    DETECTOR_EXPLORE_EVERY: int = Field(default=50, env="DETECTOR_EXPLORE_EVERY")
+    
+    # تنظیمات استخر نشست‌های MediaPipe
+    MEDIAPIPE_POOL_SIZE: int = Field(default=2, env="MEDIAPIPE_POOL_SIZE")
+    
+    # تعداد پروسه‌های پردازش تصویر برای مسیر همزمان API (0 یعنی اجرا در ترد همین پروسه)
+    VISION_POOL_WORKERS: int = Field(default=2, env="VISION_POOL_WORKERS")
+    
+    # تحلیل دسته‌ای: حداکثر تعداد تصاویر هر درخواست و تعداد پردازش همزمان آن‌ها
+    BATCH_MAX_FILES: int = Field(default=50, env="BATCH_MAX_FILES")
+    BATCH_MAX_PARALLEL: int = Field(default=4, env="BATCH_MAX_PARALLEL")
+    
+    # جریان زنده دوربین: فاصله فریم‌های کلیدی، حداقل امتیاز ردیابی و رأی‌گیری شکل چهره
+    STREAM_KEYFRAME_INTERVAL: int = Field(default=15, env="STREAM_KEYFRAME_INTERVAL")
+    STREAM_TRACKING_MIN_SCORE: float = Field(default=0.6, env="STREAM_TRACKING_MIN_SCORE")
+    STREAM_VOTE_WINDOW: int = Field(default=15, env="STREAM_VOTE_WINDOW")
+    STREAM_MIN_VOTES: int = Field(default=8, env="STREAM_MIN_VOTES")
+    STREAM_STABLE_AGREEMENT: float = Field(default=0.7, env="STREAM_STABLE_AGREEMENT")
+    STREAM_MAX_FRAME_BYTES: int = Field(default=2097152, env="STREAM_MAX_FRAME_BYTES")
+    
+    # تحلیل ویدیو: فاصله نمونه‌برداری، محدودیت‌ها و آستانه توقف زودهنگام (درصد اطمینان)
+    VIDEO_SAMPLE_INTERVAL_SECONDS: float = Field(default=0.5, env="VIDEO_SAMPLE_INTERVAL_SECONDS")
+    VIDEO_MAX_SAMPLES: int = Field(default=20, env="VIDEO_MAX_SAMPLES")
+    VIDEO_MIN_SAMPLES: int = Field(default=3, env="VIDEO_MIN_SAMPLES")
+    VIDEO_CONFIDENCE_THRESHOLD: float = Field(default=75.0, env="VIDEO_CONFIDENCE_THRESHOLD")
+    VIDEO_MAX_DURATION_SECONDS: float = Field(default=30.0, env="VIDEO_MAX_DURATION_SECONDS")
+    VIDEO_MAX_UPLOAD_MB: int = Field(default=50, env="VIDEO_MAX_UPLOAD_MB")
+    
+    # بارگیری و گرم کردن مدل‌ها در شروع برنامه و ورکرها
+    MODEL_WARMUP: bool = Field(default=True, env="MODEL_WARMUP")
+    
+    # بارگیری مجدد مدل شکل چهره پس از تغییر فایل آن (فاصله بررسی برحسب ثانیه)
+    MODEL_RELOAD_ENABLED: bool = Field(default=True, env="MODEL_RELOAD_ENABLED")
+    MODEL_RELOAD_INTERVAL: float = Field(default=10.0, env="MODEL_RELOAD_INTERVAL")
+    
+    # ارزیاب مدل شکل چهره: numpy (خروجی آرایه‌ای .npz بدون scikit-learn) یا sklearn
+    CLASSIFIER_BACKEND: str = Field(default="numpy", env="CLASSIFIER_BACKEND")
+    
+    # تصاویر عیب‌یابی: نرخ نمونه‌برداری (0 یعنی غیرفعال) و محدودیت‌های دایرکتوری
+    DEBUG_ARTIFACTS_SAMPLE_RATE: float = Field(default=0.0, env="DEBUG_ARTIFACTS_SAMPLE_RATE")
+    DEBUG_ARTIFACTS_DIR: str = Field(default="debug_images", env="DEBUG_ARTIFACTS_DIR")
+    DEBUG_ARTIFACTS_QUEUE_SIZE: int = Field(default=16, env="DEBUG_ARTIFACTS_QUEUE_SIZE")
+    DEBUG_ARTIFACTS_JPEG_QUALITY: int = Field(default=85, env="DEBUG_ARTIFACTS_JPEG_QUALITY")
+    DEBUG_ARTIFACTS_MAX_DIR_MB: int = Field(default=200, env="DEBUG_ARTIFACTS_MAX_DIR_MB")
+    DEBUG_ARTIFACTS_MAX_AGE_HOURS: int = Field(default=72, env="DEBUG_ARTIFACTS_MAX_AGE_HOURS")
+    
+    # ثبت آمار نسبت‌های چهره: نوشتن دسته‌ای در پس‌زمینه با چرخش روزانه و حجمی
+    METRICS_DIR: str = Field(default="logs/metrics", env="METRICS_DIR")
+    METRICS_FLUSH_INTERVAL: float = Field(default=10.0, env="METRICS_FLUSH_INTERVAL")
+    METRICS_FLUSH_ROWS: int = Field(default=200, env="METRICS_FLUSH_ROWS")
+    METRICS_MAX_BUFFERED_ROWS: int = Field(default=10000, env="METRICS_MAX_BUFFERED_ROWS")
+    METRICS_MAX_FILE_MB: int = Field(default=50, env="METRICS_MAX_FILE_MB")
+    METRICS_FORMAT: str = Field(default="csv", env="METRICS_FORMAT")
+    
+    # کش نتایج تحلیل براساس هش محتوای تصویر و هش ادراکی چهره
+    RESULT_CACHE_ENABLED: bool = Field(default=True, env="RESULT_CACHE_ENABLED")
+    RESULT_CACHE_SIZE: int = Field(default=512, env="RESULT_CACHE_SIZE")
+    RESULT_CACHE_TTL_SECONDS: int = Field(default=3600, env="RESULT_CACHE_TTL_SECONDS")
+    RESULT_CACHE_PHASH: bool = Field(default=False, env="RESULT_CACHE_PHASH")
+    RESULT_CACHE_PHASH_MAX_DISTANCE: int = Field(default=0, env="RESULT_CACHE_PHASH_MAX_DISTANCE")
+    RESULT_CACHE_REDIS_URL: str = Field(default="", env="RESULT_CACHE_REDIS_URL")
+    
     # مسیر فایل داده‌های مرجع
     FACE_SHAPE_DATA_PATH: str = Field(
         default="data/face_shape_frames.json",
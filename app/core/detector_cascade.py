@@ -0,0 +1,189 @@
+# app/core/detector_cascade.py
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Tuple
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# ترتیب پیش‌فرض روش‌های تشخیص برای هر کلاس اندازه تصویر
+# در تصاویر کوچک (سلفی و وب‌کم) چهره نزدیک دوربین است و مدل کوتاه‌برد MediaPipe مناسب‌تر است
+DEFAULT_BACKEND_ORDER: Dict[str, List[str]] = {
+    "small": ["mediapipe_short", "mediapipe", "dnn", "haarcascade"],
+    "medium": ["mediapipe", "mediapipe_short", "dnn", "haarcascade"],
+    "large": ["mediapipe", "mediapipe_short", "dnn", "haarcascade"],
+}
+
+
+def classify_image_size(image_shape: Tuple[int, ...]) -> str:
+    """
+    تعیین کلاس اندازه تصویر براساس تعداد پیکسل‌ها.
+
+    Args:
+        image_shape: ابعاد تصویر اصلی
+
+    Returns:
+        str: کلاس اندازه (small, medium, large)
+    """
+    h, w = image_shape[:2]
+    megapixels = (h * w) / 1_000_000
+
+    if megapixels < 1:
+        return "small"
+    if megapixels < 6:
+        return "medium"
+    return "large"
+
+
+class DetectorCascadeStats:
+    """
+    آمار نرخ موفقیت و زمان پاسخ هر روش تشخیص چهره در یک پنجره متحرک
+    به تفکیک کلاس اندازه تصویر، و تعیین ترتیب اجرای روش‌ها براساس آن.
+
+    روش‌های بعدی آبشار فقط وقتی اجرا می‌شوند که روش‌های قبلی ناموفق بوده‌اند،
+    پس نرخ موفقیت آن‌ها شرطی است. برای مقایسه فقط نمونه‌های بدون شرط
+    (تلاش‌هایی که روش اولین روش اجرا شده بوده) استفاده می‌شود.
+    """
+
+    def __init__(self, window: int):
+        self._window = max(1, window)
+        self._lock = threading.Lock()
+        # (کلاس اندازه، روش) -> [(موفق، زمان به میلی‌ثانیه)]
+        self._samples: Dict[Tuple[str, str], Deque[Tuple[bool, float]]] = defaultdict(
+            lambda: deque(maxlen=self._window))
+        # نمونه‌های بدون شرط (روش اولین روش اجرا شده بوده است)
+        self._probes: Dict[Tuple[str, str], Deque[Tuple[bool, float]]] = defaultdict(
+            lambda: deque(maxlen=self._window))
+        # (کلاس اندازه، روش) -> شماره آخرین درخواستی که روش در آن اول اجرا شد
+        self._last_probe: Dict[Tuple[str, str], int] = {}
+        self._attempts: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._served: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._requests: Dict[str, int] = defaultdict(int)
+        self._unserved: Dict[str, int] = defaultdict(int)
+
+    def record(self, size_class: str, backend: str, hit: bool, latency_ms: float,
+               unconditional: bool = False):
+        """ثبت نتیجه یک تلاش تشخیص (unconditional: روش اولین روش اجرا شده بوده است)"""
+        key = (size_class, backend)
+        with self._lock:
+            self._samples[key].append((hit, latency_ms))
+            if unconditional:
+                self._probes[key].append((hit, latency_ms))
+                self._last_probe[key] = self._requests[size_class]
+            self._attempts[key] += 1
+            if hit:
+                self._served[key] += 1
+
+    def record_unserved(self, size_class: str):
+        """ثبت درخواستی که هیچ روشی چهره را پیدا نکرد"""
+        with self._lock:
+            self._unserved[size_class] += 1
+
+    def _window_stats(self, key: Tuple[str, str], probes: bool = False) -> Tuple[int, float, float]:
+        samples = (self._probes if probes else self._samples).get(key)
+        if not samples:
+            return 0, 0.0, 0.0
+        count = len(samples)
+        hits = sum(1 for hit, _ in samples if hit)
+        avg_latency = sum(latency for _, latency in samples) / count
+        return count, hits / count, avg_latency
+
+    def order(self, size_class: str, default_order: List[str]) -> List[str]:
+        """
+        تعیین ترتیب اجرای روش‌ها برای یک درخواست.
+
+        تا وقتی همه روش‌ها به حداقل نمونه بدون شرط نرسیده‌اند، هر درخواست با
+        روشی که کمترین نمونه بدون شرط را دارد شروع می‌شود و بقیه به ترتیب
+        پیش‌فرض اجرا می‌شوند. پس از آن روش‌ها براساس هزینه مورد انتظار
+        (زمان / نرخ موفقیت بدون شرط) مرتب و روش‌هایی که تقریباً هرگز موفق
+        نمی‌شوند حذف می‌شوند. هر چند درخواست یک بار روشی که بیشترین زمان از
+        آخرین اجرای اولش گذشته (از جمله روش‌های حذف شده) اول اجرا می‌شود تا
+        آمار همه روش‌ها به‌روز بماند.
+        """
+        with self._lock:
+            self._requests[size_class] += 1
+            request_number = self._requests[size_class]
+
+            if not settings.DETECTOR_ADAPTIVE:
+                return list(default_order)
+
+            min_samples = settings.DETECTOR_MIN_SAMPLES
+            stats = {backend: self._window_stats((size_class, backend), probes=True)
+                     for backend in default_order}
+
+            explore_every = settings.DETECTOR_EXPLORE_EVERY
+            explore = explore_every > 0 and request_number % explore_every == 0
+            if explore or any(count < min_samples for count, _, _ in stats.values()):
+                # اولویت با روش کم‌نمونه‌تر و سپس روشی که دیرتر اول اجرا شده است
+                lead = min(default_order, key=lambda backend: (
+                    min(stats[backend][0], min_samples),
+                    self._last_probe.get((size_class, backend), -1)))
+                return [lead] + [backend for backend in default_order if backend != lead]
+
+        candidates = [backend for backend in default_order
+                      if stats[backend][1] >= settings.DETECTOR_SKIP_HIT_RATE]
+
+        # اگر همه روش‌ها حذف شوند، ترتیب پیش‌فرض را نگه می‌داریم
+        if not candidates:
+            return list(default_order)
+
+        def expected_cost(backend: str) -> float:
+            _, hit_rate, avg_latency = stats[backend]
+            return avg_latency / max(hit_rate, 1e-6)
+
+        return sorted(candidates, key=expected_cost)
+
+    def snapshot(self, default_orders: Dict[str, List[str]]) -> Dict[str, Any]:
+        """دریافت آمار فعلی به تفکیک کلاس اندازه و روش"""
+        with self._lock:
+            size_classes = set(self._requests.keys()) | {
+                size_class for size_class, _ in self._samples.keys()}
+            result = {}
+            for size_class in sorted(size_classes):
+                backends = {}
+                for (cls, backend) in list(self._samples.keys()):
+                    if cls != size_class:
+                        continue
+                    count, hit_rate, avg_latency = self._window_stats(
+                        (cls, backend))
+                    probe_count, probe_hit_rate, probe_latency = self._window_stats(
+                        (cls, backend), probes=True)
+                    backends[backend] = {
+                        "window_attempts": count,
+                        "hit_rate": round(hit_rate, 4),
+                        "avg_latency_ms": round(avg_latency, 2),
+                        "unconditional_attempts": probe_count,
+                        "unconditional_hit_rate": round(probe_hit_rate, 4),
+                        "unconditional_latency_ms": round(probe_latency, 2),
+                        "total_attempts": self._attempts[(cls, backend)],
+                        "served": self._served[(cls, backend)]
+                    }
+
+                default_order = default_orders.get(size_class, [])
+                result[size_class] = {
+                    "requests": self._requests[size_class],
+                    "unserved": self._unserved[size_class],
+                    "default_order": default_order,
+                    "window_ready": bool(default_order) and all(
+                        self._window_stats((size_class, backend), probes=True)[0] >= settings.DETECTOR_MIN_SAMPLES
+                        for backend in default_order),
+                    "backends": backends
+                }
+            return result
+
+
+# آمار مشترک در این پروسه
+cascade_stats = DetectorCascadeStats(settings.DETECTOR_STATS_WINDOW)
+
+
+def get_detector_stats() -> Dict[str, Any]:
+    """
+    دریافت آمار روش‌های تشخیص چهره به تفکیک کلاس اندازه تصویر.
+
+    Returns:
+        dict: آمار هر کلاس اندازه تصویر
+    """
+    return cascade_stats.snapshot(DEFAULT_BACKEND_ORDER)
@@ -1,28 +1,89 @@
-import cv2
 import numpy as np
 import logging
 import os
 from typing import Dict, Any, Tuple, List, Optional
 import math
 from datetime import datetime
-import csv
 
 from app.config import settings
 from app.core.face_detection import detect_face_landmarks, visualize_landmarks
-from app.services.classifier import predict_face_shape
+from app.services.classifier import predict_face_shape, extract_features_from_landmarks
 # واردسازی از فایل جدید
 from app.core.face_shape_data import load_face_shape_data, get_recommended_frame_types
+from app.utils.debug_artifacts import save_debug_image
+from app.utils.metrics_sink import MetricsSink, load_metrics
 
 # تنظیمات لاگر
 logger = logging.getLogger(__name__)
 
+# ذخیره‌ساز نسبت‌های چهره برای تحلیل آماری
+FACE_METRICS_SINK_NAME = "face_metrics"
+face_metrics_sink = MetricsSink(FACE_METRICS_SINK_NAME, [
+    "timestamp",
+    "face_shape",
+    "width_to_length_ratio",
+    "cheekbone_to_jaw_ratio",
+    "forehead_to_cheekbone_ratio",
+    "jaw_angle"
+])
+
+
+def build_analysis_context(
+    image: np.ndarray,
+    face_coordinates: Dict[str, int],
+    face_image: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    محاسبه یک‌باره نقاط کلیدی و بردار ویژگی‌ها برای یک درخواست.
+
+    اگر تصویر برش خورده چهره (خروجی get_face_image) موجود باشد، نقاط کلیدی
+    روی همان برش محاسبه و به مختصات تصویر اصلی منتقل می‌شوند.
+
+    Args:
+        image: تصویر OpenCV
+        face_coordinates: مختصات چهره (در صورت وجود برش، مختصات همان برش)
+        face_image: تصویر برش خورده چهره (اختیاری)
+
+    Returns:
+        dict: نقاط کلیدی (landmarks) و بردار ویژگی‌ها (features)
+    """
+    if face_image is not None and face_image.size > 0:
+        crop_height, crop_width = face_image.shape[:2]
+        landmarks = detect_face_landmarks(face_image, {
+            "x": 0,
+            "y": 0,
+            "width": crop_width,
+            "height": crop_height
+        })
+        if landmarks is not None:
+            # انتقال نقاط کلیدی به مختصات تصویر اصلی
+            landmarks = landmarks + np.array(
+                [face_coordinates["x"], face_coordinates["y"]], dtype=landmarks.dtype)
+    else:
+        landmarks = detect_face_landmarks(image, face_coordinates)
 
-def analyze_face_shape(image: np.ndarray, face_coordinates: Dict[str, int]) -> Dict[str, Any]:
+    features = None
+    if landmarks is not None:
+        features = extract_features_from_landmarks(landmarks)
+
+    return {
+        "landmarks": landmarks,
+        "features": features
+    }
+
+
+def analyze_face_shape(
+    image: np.ndarray,
+    face_coordinates: Dict[str, int],
+    landmarks: Optional[np.ndarray] = None,
+    log_metrics: bool = True
+) -> Dict[str, Any]:
     """تحلیل شکل چهره با استفاده از نسبت‌های هندسی دقیق‌تر"""
     try:
         logger.info("شروع تحلیل شکل چهره با روش هندسی...")
-        # دریافت نقاط کلیدی چهره
-        landmarks = detect_face_landmarks(image, face_coordinates)
+        # دریافت نقاط کلیدی چهره در صورتی که از قبل محاسبه نشده باشند
+        if landmarks is None:
+            landmarks = detect_face_landmarks(image, face_coordinates)
 
         if landmarks is None:
             logger.error("امکان تشخیص نقاط کلیدی چهره وجود ندارد")
@@ -150,7 +211,8 @@ def analyze_face_shape(image: np.ndarray, face_coordinates: Dict[str, int]) -> D
         face_shape = _determine_face_shape(shape_metrics)
 
         # ثبت لاگ با شکل چهره تشخیص داده شده
-        log_face_metrics(shape_metrics, face_shape)
+        if log_metrics:
+            log_face_metrics(shape_metrics, face_shape)
 
         # محاسبه میزان اطمینان
         confidence = _calculate_confidence(shape_metrics, face_shape)
@@ -166,18 +228,10 @@ def analyze_face_shape(image: np.ndarray, face_coordinates: Dict[str, int]) -> D
         logger.info(
             f"تحلیل شکل چهره با روش هندسی انجام شد: {face_shape} با اطمینان {confidence:.1f}%")
 
-        # ذخیره تصویر با نقاط کلیدی و شکل چهره برای عیب‌یابی
-        try:
-            visualized_img = visualize_landmarks(image, landmarks, face_shape)
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            debug_dir = "debug_images"
-            os.makedirs(debug_dir, exist_ok=True)
-            cv2.imwrite(
-                f"{debug_dir}/result_{face_shape}_{timestamp}.jpg", visualized_img)
-            logger.info(
-                f"تصویر نتیجه نهایی در فایل {debug_dir}/result_{face_shape}_{timestamp}.jpg ذخیره شد")
-        except Exception as vis_error:
-            logger.warning(f"خطا در ذخیره تصویر نتیجه: {str(vis_error)}")
+        # ذخیره نمونه‌ای تصویر با نقاط کلیدی و شکل چهره برای عیب‌یابی (در پس‌زمینه)
+        save_debug_image(
+            f"result_{face_shape}",
+            lambda: visualize_landmarks(image, landmarks, face_shape))
 
         return {
             "success": True,
@@ -269,13 +323,18 @@ def _calculate_confidence(metrics: Dict[str, float], face_shape: str) -> float:
     return round(confidence, 1)
 
 
-def generate_full_analysis(image: np.ndarray, face_coordinates: Dict[str, int]) -> Dict[str, Any]:
+def generate_full_analysis(
+    image: np.ndarray,
+    face_coordinates: Dict[str, int],
+    face_image: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
     """
     تحلیل کامل شکل چهره با استفاده از ترکیب روش‌های هندسی و یادگیری ماشین.
 
     Args:
         image: تصویر OpenCV
         face_coordinates: مختصات چهره
+        face_image: تصویر برش خورده چهره (اختیاری)
 
     Returns:
         dict: نتیجه تحلیل شکل چهره
@@ -283,8 +342,17 @@ def generate_full_analysis(image: np.ndarray, face_coordinates: Dict[str, int])
     try:
         logger.info("شروع تحلیل کامل شکل چهره...")
 
+        # محاسبه یک‌باره نقاط کلیدی برای هر دو روش
+        context = build_analysis_context(image, face_coordinates, face_image)
+        if context["landmarks"] is None:
+            return {
+                "success": False,
+                "message": "امکان تشخیص نقاط کلیدی چهره وجود ندارد"
+            }
+
         # 1. استفاده از روش هندسی (قابل اعتمادتر)
-        geometric_result = analyze_face_shape(image, face_coordinates)
+        geometric_result = analyze_face_shape(
+            image, face_coordinates, landmarks=context["landmarks"])
         geometric_success = geometric_result.get("success", False)
 
         # 2. تلاش برای استفاده از مدل ML (به عنوان کمکی)
@@ -294,7 +362,7 @@ def generate_full_analysis(image: np.ndarray, face_coordinates: Dict[str, int])
 
         try:
             ml_face_shape, ml_confidence, shape_details = predict_face_shape(
-                image, face_coordinates)
+                image, face_coordinates, features=context["features"])
             ml_success = True
             logger.info(
                 f"تشخیص شکل چهره با مدل ML: {ml_face_shape} با میزان اطمینان {ml_confidence:.1f}%")
@@ -451,44 +519,51 @@ def _determine_face_shape(metrics: Dict[str, float]) -> str:
     return "OVAL"
 
 
-def log_face_metrics(metrics: Dict[str, float], face_shape: str = None, metrics_log_file: str = "face_metrics_log.csv"):
-    """ثبت نسبت‌های چهره در فایل لاگ برای تحلیل آماری"""
-    import os
-    import csv
-
+def log_face_metrics(metrics: Dict[str, float], face_shape: str = None):
+    """ثبت نسبت‌های چهره برای تحلیل آماری (نوشتن در پس‌زمینه)"""
     try:
-        file_exists = os.path.exists(metrics_log_file)
-
-        with open(metrics_log_file, 'a', newline='') as f:
-            writer = csv.DictWriter(
-                f, fieldnames=["timestamp", "face_shape"] + list(metrics.keys()))
+        face_metrics_sink.write({
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "face_shape": face_shape or "",
+            **metrics
+        })
+    except Exception as e:
+        logger.warning(f"خطا در ثبت نسبت‌های چهره: {str(e)}")
 
-            if not file_exists:
-                writer.writeheader()
 
-            row_data = {
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "face_shape": face_shape or "",
-                **metrics
-            }
+def load_face_metrics(start=None, end=None, columns: Optional[List[str]] = None):
+    """
+    خواندن نسبت‌های چهره ثبت شده در یک بازه زمانی.
 
-            writer.writerow(row_data)
+    Args:
+        start: تاریخ شروع (اختیاری)
+        end: تاریخ پایان (اختیاری)
+        columns: ستون‌های مورد نیاز (اختیاری)
 
-        logger.debug(
-            f"نسبت‌های چهره با موفقیت در فایل {metrics_log_file} ثبت شد")
-    except Exception as e:
-        logger.warning(f"خطا در ثبت نسبت‌های چهره: {str(e)}")
+    Returns:
+        pandas.DataFrame: نسبت‌های چهره ثبت شده
+    """
+    return load_metrics(FACE_METRICS_SINK_NAME, start, end, columns)
 
 
-def analyze_detection_statistics(metrics_log_file: str = "face_metrics_log.csv"):
+def analyze_detection_statistics(start=None, end=None, metrics_log_file: Optional[str] = None):
     """
     تحلیل آماری داده‌های نسبت‌های چهره برای بهبود تشخیص
     """
     try:
         import pandas as pd
 
-        # خواندن فایل لاگ
-        metrics_df = pd.read_csv(metrics_log_file)
+        # خواندن داده‌ها (فایل CSV قدیمی در صورت تعیین)
+        if metrics_log_file:
+            metrics_df = pd.read_csv(metrics_log_file)
+        else:
+            metrics_df = load_face_metrics(start, end)
+
+        if metrics_df.empty:
+            logger.warning("داده‌ای برای تحلیل آماری وجود ندارد")
+            return False
+
+        metrics_df = metrics_df.drop(columns=["timestamp"], errors="ignore")
 
         # آمارهای توصیفی
         stats = metrics_df.describe()
@@ -522,8 +597,7 @@ def improve_face_shape_detection():
         analyze_detection_statistics()
 
         # ایجاد دایرکتوری برای تصاویر عیب‌یابی
-        debug_dir = "debug_images"
-        os.makedirs(debug_dir, exist_ok=True)
+        os.makedirs(settings.DEBUG_ARTIFACTS_DIR, exist_ok=True)
 
         logger.info("فرآیند بهبود سیستم تشخیص شکل چهره با موفقیت اجرا شد")
         return True
@@ -2,19 +2,84 @@ import cv2
 import numpy as np
 import logging
 import os
+import threading
+import time
 from typing import Dict, Any, Tuple, List, Optional
-import mediapipe as mp
 from datetime import datetime
 
 from app.config import settings
+from app.core.mediapipe_pool import get_session_pool
+from app.core.model_registry import register_model, get_model
+from app.core.detector_cascade import DEFAULT_BACKEND_ORDER, cascade_stats, classify_image_size
 
 # تنظیمات لاگر
 logger = logging.getLogger(__name__)
 
 # متغیرهای سراسری برای کش مدل‌ها
-_face_cascade = None
 _landmark_detector = None
 
+# مسیرهای مدل DNN
+DNN_MODEL_PATH = "data/face_detection_models/opencv_face_detector_uint8.pb"
+DNN_CONFIG_PATH = "data/face_detection_models/opencv_face_detector.pbtxt"
+
+# شبکه DNN بین تردها مشترک است و setInput/forward آن thread-safe نیست
+_dnn_lock = threading.Lock()
+
+
+def _load_haar_cascade() -> cv2.CascadeClassifier:
+    """بارگیری مدل Haar Cascade از مسیر OpenCV"""
+    # مسیر فایل مدل haarcascade
+    cascade_path = cv2.data.haarcascades + settings.FACE_DETECTION_MODEL
+
+    # بررسی وجود فایل
+    if not os.path.exists(cascade_path):
+        logger.error(f"فایل مدل تشخیص چهره یافت نشد: {cascade_path}")
+        raise FileNotFoundError(
+            f"فایل مدل تشخیص چهره یافت نشد: {cascade_path}")
+
+    face_cascade = cv2.CascadeClassifier(cascade_path)
+    if face_cascade.empty():
+        raise ValueError(f"فایل مدل تشخیص چهره معتبر نیست: {cascade_path}")
+
+    return face_cascade
+
+
+def _warmup_haar_cascade(face_cascade: cv2.CascadeClassifier):
+    face_cascade.detectMultiScale(np.zeros((120, 120), dtype=np.uint8))
+
+
+def _load_dnn_face_detector():
+    """بارگیری شبکه OpenCV DNN؛ وجود فایل‌ها فقط یک بار بررسی می‌شود"""
+    if not (os.path.exists(DNN_MODEL_PATH) and os.path.exists(DNN_CONFIG_PATH)):
+        raise FileNotFoundError("فایل‌های مدل DNN یافت نشدند")
+
+    return cv2.dnn.readNetFromTensorflow(DNN_MODEL_PATH, DNN_CONFIG_PATH)
+
+
+def _warmup_dnn_face_detector(net):
+    blob = cv2.dnn.blobFromImage(np.zeros((300, 300, 3), dtype=np.uint8), 1.0, (300, 300), [
+                                 104, 117, 123], False, False)
+    with _dnn_lock:
+        net.setInput(blob)
+        net.forward()
+
+
+def _warmup_session_pool(pool):
+    pool.warmup()
+
+
+# ثبت مدل‌های تشخیص چهره در رجیستری
+register_model("haar_cascade", _load_haar_cascade, _warmup_haar_cascade,
+               files=[cv2.data.haarcascades + settings.FACE_DETECTION_MODEL])
+register_model("dnn_face_detector", _load_dnn_face_detector, _warmup_dnn_face_detector,
+               files=[DNN_MODEL_PATH, DNN_CONFIG_PATH])
+register_model("mediapipe_face_detection",
+               lambda: get_session_pool("face_detection"), _warmup_session_pool)
+register_model("mediapipe_face_detection_short",
+               lambda: get_session_pool("face_detection_short"), _warmup_session_pool)
+register_model("mediapipe_face_mesh",
+               lambda: get_session_pool("face_mesh"), _warmup_session_pool)
+
 
 def load_face_detector():
     """
@@ -23,30 +88,22 @@ def load_face_detector():
     Returns:
         cv2.CascadeClassifier: مدل تشخیص چهره
     """
-    global _face_cascade
-
-    if _face_cascade is not None:
-        return _face_cascade
+    face_cascade = get_model("haar_cascade")
 
-    try:
-        # مسیر فایل مدل haarcascade
-        cascade_path = cv2.data.haarcascades + settings.FACE_DETECTION_MODEL
+    if face_cascade is None:
+        raise FileNotFoundError("مدل تشخیص چهره Haar Cascade در دسترس نیست")
 
-        # بررسی وجود فایل
-        if not os.path.exists(cascade_path):
-            logger.error(f"فایل مدل تشخیص چهره یافت نشد: {cascade_path}")
-            raise FileNotFoundError(
-                f"فایل مدل تشخیص چهره یافت نشد: {cascade_path}")
+    return face_cascade
 
-        # بارگیری مدل
-        _face_cascade = cv2.CascadeClassifier(cascade_path)
 
-        logger.info("مدل تشخیص چهره با موفقیت بارگیری شد")
-        return _face_cascade
+def get_dnn_face_detector():
+    """
+    دریافت شبکه OpenCV DNN از رجیستری مدل‌ها.
 
-    except Exception as e:
-        logger.error(f"خطا در بارگیری مدل تشخیص چهره: {str(e)}")
-        raise
+    Returns:
+        cv2.dnn.Net: شبکه تشخیص چهره یا None اگر فایل‌های مدل موجود نباشند
+    """
+    return get_model("dnn_face_detector")
 
 
 def load_landmark_detector():
@@ -85,246 +142,247 @@ def load_landmark_detector():
         return None
 
 
-# app/core/face_detection.py را با این کد بهبود یافته جایگزین کنید (بخش detect_face)
+def _build_face_coordinates(x: int, y: int, width: int, height: int, source: str) -> Dict[str, Any]:
+    """ساخت دیکشنری مختصات چهره"""
+    # محاسبه مرکز چهره
+    center_x = x + width // 2
+    center_y = y + height // 2
 
-def detect_face(image: np.ndarray) -> Dict[str, Any]:
-    """
-    تشخیص چهره در تصویر با استفاده از روش‌های متعدد.
+    # محاسبه نسبت عرض به ارتفاع
+    aspect_ratio = width / height if height > 0 else 0
 
-    Args:
-        image: تصویر OpenCV
+    return {
+        "x": int(x),
+        "y": int(y),
+        "width": int(width),
+        "height": int(height),
+        "center_x": int(center_x),
+        "center_y": int(center_y),
+        "aspect_ratio": float(aspect_ratio),
+        "source": source
+    }
 
-    Returns:
-        dict: نتیجه تشخیص چهره
-    """
-    try:
-        # 1. ابتدا از Mediapipe استفاده می‌کنیم (دقیق‌تر اما کندتر)
-        try:
-            import mediapipe as mp
-            mp_face_detection = mp.solutions.face_detection
 
-            # تبدیل به RGB
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-            with mp_face_detection.FaceDetection(
-                model_selection=1,  # مدل با دقت بیشتر
-                min_detection_confidence=0.5
-            ) as face_detection:
-                results = face_detection.process(rgb_image)
-
-                if results.detections and len(results.detections) > 0:
-                    # از اولین چهره تشخیص داده شده استفاده می‌کنیم
-                    detection = results.detections[0]
-
-                    # تبدیل مختصات نسبی به مختصات تصویر
-                    bbox = detection.location_data.relative_bounding_box
-                    h, w, _ = image.shape
-
-                    x = int(bbox.xmin * w)
-                    y = int(bbox.ymin * h)
-                    width = int(bbox.width * w)
-                    height = int(bbox.height * h)
-
-                    # اطمینان از اینکه مختصات در محدوده تصویر هستند
-                    x = max(0, x)
-                    y = max(0, y)
-                    width = min(width, w - x)
-                    height = min(height, h - y)
-
-                    # محاسبه مرکز چهره
-                    center_x = x + width // 2
-                    center_y = y + height // 2
-
-                    # محاسبه نسبت عرض به ارتفاع
-                    aspect_ratio = width / height if height > 0 else 0
-
-                    # ساخت دیکشنری مختصات چهره
-                    face_coordinates = {
-                        "x": int(x),
-                        "y": int(y),
-                        "width": int(width),
-                        "height": int(height),
-                        "center_x": int(center_x),
-                        "center_y": int(center_y),
-                        "aspect_ratio": float(aspect_ratio),
-                        "source": "mediapipe"
-                    }
+def _detect_with_mediapipe(image: np.ndarray, pool_name: str, source: str) -> Optional[Dict[str, Any]]:
+    """تشخیص چهره با MediaPipe (دقیق‌تر اما کندتر)"""
+    # تبدیل به RGB
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-                    logger.info("چهره با MediaPipe با موفقیت تشخیص داده شد")
-                    return {
-                        "success": True,
-                        "message": "چهره با MediaPipe با موفقیت تشخیص داده شد",
-                        "face": face_coordinates
-                    }
-        except Exception as mp_error:
-            logger.warning(f"خطا در تشخیص چهره با MediaPipe: {str(mp_error)}")
+    # استفاده از نشست آماده در استخر به جای ساخت گراف جدید
+    with get_session_pool(pool_name).acquire() as face_detection:
+        results = face_detection.process(rgb_image)
 
-        # 2. استفاده از OpenCV DNN Face Detector
-        try:
-            # مسیرهای مدل DNN
-            model_path = "data/face_detection_models/opencv_face_detector_uint8.pb"
-            config_path = "data/face_detection_models/opencv_face_detector.pbtxt"
-
-            # بررسی وجود فایل‌های مدل
-            if os.path.exists(model_path) and os.path.exists(config_path):
-                logger.info("در حال استفاده از OpenCV DNN برای تشخیص چهره...")
-                net = cv2.dnn.readNetFromTensorflow(model_path, config_path)
-
-                # پیش‌پردازش تصویر برای مدل DNN
-                blob = cv2.dnn.blobFromImage(image, 1.0, (300, 300), [
-                                             104, 117, 123], False, False)
-                net.setInput(blob)
-
-                # تشخیص چهره
-                detections = net.forward()
-
-                max_confidence_idx = -1
-                max_confidence = 0
-
-                # یافتن چهره با بیشترین اطمینان
-                for i in range(detections.shape[2]):
-                    confidence = detections[0, 0, i, 2]
-
-                    if confidence > 0.7:  # حد آستانه بالاتر برای دقت بیشتر
-                        if confidence > max_confidence:
-                            max_confidence = confidence
-                            max_confidence_idx = i
-
-                if max_confidence_idx >= 0:
-                    # استخراج مختصات چهره
-                    box = detections[0, 0, max_confidence_idx, 3:7] * np.array(
-                        [image.shape[1], image.shape[0], image.shape[1], image.shape[0]])
-                    x, y, x2, y2 = box.astype(int)
-
-                    width = x2 - x
-                    height = y2 - y
-
-                    # اطمینان از معتبر بودن مختصات
-                    if width <= 0 or height <= 0:
-                        raise ValueError("مختصات چهره نامعتبر است")
-
-                    # محاسبه مرکز چهره
-                    center_x = x + width // 2
-                    center_y = y + height // 2
-
-                    # محاسبه نسبت عرض به ارتفاع
-                    aspect_ratio = width / height if height > 0 else 0
-
-                    # ساخت دیکشنری مختصات چهره
-                    face_coordinates = {
-                        "x": int(x),
-                        "y": int(y),
-                        "width": int(width),
-                        "height": int(height),
-                        "center_x": int(center_x),
-                        "center_y": int(center_y),
-                        "aspect_ratio": float(aspect_ratio),
-                        "source": "dnn"
-                    }
+    if not results.detections:
+        return None
 
-                    logger.info("چهره با DNN با موفقیت تشخیص داده شد")
-                    return {
-                        "success": True,
-                        "message": "چهره با DNN با موفقیت تشخیص داده شد",
-                        "face": face_coordinates
-                    }
-                else:
-                    logger.warning(
-                        "با DNN هیچ چهره‌ای با اطمینان کافی تشخیص داده نشد")
-            else:
-                logger.warning(
-                    "فایل‌های مدل DNN یافت نشدند، استفاده از روش Haar Cascade")
-        except Exception as dnn_error:
-            logger.warning(f"خطا در تشخیص چهره با DNN: {str(dnn_error)}")
+    # از اولین چهره تشخیص داده شده استفاده می‌کنیم
+    detection = results.detections[0]
+
+    # تبدیل مختصات نسبی به مختصات تصویر
+    bbox = detection.location_data.relative_bounding_box
+    h, w = image.shape[:2]
+
+    x = int(bbox.xmin * w)
+    y = int(bbox.ymin * h)
+    width = int(bbox.width * w)
+    height = int(bbox.height * h)
+
+    # اطمینان از اینکه مختصات در محدوده تصویر هستند
+    x = max(0, x)
+    y = max(0, y)
+    width = min(width, w - x)
+    height = min(height, h - y)
+
+    if width <= 0 or height <= 0:
+        return None
+
+    return _build_face_coordinates(x, y, width, height, source)
+
+
+def _detect_with_mediapipe_full(image: np.ndarray) -> Optional[Dict[str, Any]]:
+    # مدل دوربرد (model_selection=1)
+    return _detect_with_mediapipe(image, "face_detection", "mediapipe")
+
+
+def _detect_with_mediapipe_short(image: np.ndarray) -> Optional[Dict[str, Any]]:
+    # مدل کوتاه‌برد (model_selection=0) برای چهره‌های نزدیک دوربین
+    return _detect_with_mediapipe(image, "face_detection_short", "mediapipe_short")
+
+
+def _select_dnn_face(detections: np.ndarray, image_index: float, image_shape: Tuple[int, ...]) -> Optional[Dict[str, Any]]:
+    """انتخاب چهره با بیشترین اطمینان از خروجی شبکه DNN برای یک تصویر"""
+    max_confidence_idx = -1
+    max_confidence = 0
+
+    # یافتن چهره با بیشترین اطمینان
+    for i in range(detections.shape[2]):
+        if detections[0, 0, i, 0] != image_index:
+            continue
+
+        confidence = detections[0, 0, i, 2]
+
+        if confidence > 0.7:  # حد آستانه بالاتر برای دقت بیشتر
+            if confidence > max_confidence:
+                max_confidence = confidence
+                max_confidence_idx = i
+
+    if max_confidence_idx < 0:
+        return None
+
+    # استخراج مختصات چهره
+    box = detections[0, 0, max_confidence_idx, 3:7] * np.array(
+        [image_shape[1], image_shape[0], image_shape[1], image_shape[0]])
+    x, y, x2, y2 = box.astype(int)
+
+    width = x2 - x
+    height = y2 - y
 
-        # 3. در نهایت از Haar Cascade استفاده می‌کنیم (روش قبلی)
-        logger.info("در حال استفاده از Haar Cascade برای تشخیص چهره...")
+    # اطمینان از معتبر بودن مختصات
+    if width <= 0 or height <= 0:
+        return None
+
+    return _build_face_coordinates(x, y, width, height, "dnn")
 
-        # بارگیری مدل تشخیص چهره
-        face_cascade = load_face_detector()
 
-        # بهبود پیش‌پردازش تصویر
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+def _detect_with_dnn(image: np.ndarray) -> Optional[Dict[str, Any]]:
+    """تشخیص چهره با OpenCV DNN Face Detector"""
+    net = get_dnn_face_detector()
 
-        # افزایش کنتراست
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced_gray = clahe.apply(gray)
+    if net is None:
+        return None
 
-        # کاهش نویز
-        enhanced_gray = cv2.GaussianBlur(enhanced_gray, (5, 5), 0)
+    # پیش‌پردازش تصویر برای مدل DNN
+    blob = cv2.dnn.blobFromImage(image, 1.0, (300, 300), [
+                                 104, 117, 123], False, False)
 
-        # تشخیص چهره با پارامترهای بهبود یافته
+    # تشخیص چهره
+    with _dnn_lock:
+        net.setInput(blob)
+        detections = net.forward()
+
+    return _select_dnn_face(detections, 0, image.shape)
+
+
+def _detect_with_haar(image: np.ndarray) -> Optional[Dict[str, Any]]:
+    """تشخیص چهره با Haar Cascade (روش قبلی)"""
+    # بارگیری مدل تشخیص چهره
+    face_cascade = load_face_detector()
+
+    # بهبود پیش‌پردازش تصویر
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # افزایش کنتراست
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    enhanced_gray = clahe.apply(gray)
+
+    # کاهش نویز
+    enhanced_gray = cv2.GaussianBlur(enhanced_gray, (5, 5), 0)
+
+    # تشخیص چهره با پارامترهای بهبود یافته
+    faces = face_cascade.detectMultiScale(
+        enhanced_gray,
+        scaleFactor=1.05,       # کاهش مقدار برای تشخیص بیشتر
+        minNeighbors=3,         # کاهش مقدار برای تشخیص بیشتر
+        minSize=(30, 30),       # ابعاد حداقل معقول
+        flags=cv2.CASCADE_SCALE_IMAGE
+    )
+
+    # اگر چهره‌ای تشخیص داده نشد، با پارامترهای سهل‌گیرانه‌تر تلاش کنیم
+    if len(faces) == 0:
+        logger.info("تلاش مجدد با پارامترهای سهل‌گیرانه‌تر...")
         faces = face_cascade.detectMultiScale(
             enhanced_gray,
-            scaleFactor=1.05,       # کاهش مقدار برای تشخیص بیشتر
-            minNeighbors=3,         # کاهش مقدار برای تشخیص بیشتر
-            minSize=(30, 30),       # ابعاد حداقل معقول
+            scaleFactor=1.01,
+            minNeighbors=1,     # کاهش بیشتر مقدار برای تشخیص بیشتر
+            minSize=(20, 20),   # کاهش بیشتر حداقل اندازه چهره
             flags=cv2.CASCADE_SCALE_IMAGE
         )
 
-        # اگر چهره‌ای تشخیص داده نشد، با پارامترهای سهل‌گیرانه‌تر تلاش کنیم
-        if len(faces) == 0:
-            logger.info("تلاش مجدد با پارامترهای سهل‌گیرانه‌تر...")
-            faces = face_cascade.detectMultiScale(
-                enhanced_gray,
-                scaleFactor=1.01,
-                minNeighbors=1,     # کاهش بیشتر مقدار برای تشخیص بیشتر
-                minSize=(20, 20),   # کاهش بیشتر حداقل اندازه چهره
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
-
-        # اگر همچنان چهره‌ای تشخیص داده نشد
-        if len(faces) == 0:
-            logger.warning("هیچ چهره‌ای در تصویر تشخیص داده نشد")
-            return {
-                "success": False,
-                "message": "هیچ چهره‌ای در تصویر تشخیص داده نشد"
-            }
+    if len(faces) == 0:
+        return None
 
-        # اگر بیش از یک چهره تشخیص داده شد
-        if len(faces) > 1:
-            logger.info(
-                f"{len(faces)} چهره تشخیص داده شد. انتخاب بزرگترین چهره...")
-            # انتخاب بزرگترین چهره (احتمالاً نزدیک‌ترین چهره)
-            largest_face = max(faces, key=lambda f: f[2] * f[3])
-        else:
-            largest_face = faces[0]
+    # اگر بیش از یک چهره تشخیص داده شد
+    if len(faces) > 1:
+        logger.info(
+            f"{len(faces)} چهره تشخیص داده شد. انتخاب بزرگترین چهره...")
+        # انتخاب بزرگترین چهره (احتمالاً نزدیک‌ترین چهره)
+        largest_face = max(faces, key=lambda f: f[2] * f[3])
+    else:
+        largest_face = faces[0]
+
+    # استخراج مختصات چهره
+    x, y, w, h = largest_face
+
+    # بررسی معتبر بودن ابعاد
+    if w <= 0 or h <= 0:
+        logger.warning("مختصات چهره نامعتبر است")
+        return None
 
-        # استخراج مختصات چهره
-        x, y, w, h = largest_face
+    return _build_face_coordinates(x, y, w, h, "haarcascade")
 
-        # بررسی معتبر بودن ابعاد
-        if w <= 0 or h <= 0:
-            logger.warning("مختصات چهره نامعتبر است")
-            return {
-                "success": False,
-                "message": "مختصات چهره نامعتبر است"
-            }
 
-        # محاسبه مرکز چهره
-        center_x = x + w // 2
-        center_y = y + h // 2
+# روش‌های تشخیص چهره و پیام موفقیت هر کدام
+_DETECTION_BACKENDS = {
+    "mediapipe": (_detect_with_mediapipe_full, "چهره با MediaPipe با موفقیت تشخیص داده شد"),
+    "mediapipe_short": (_detect_with_mediapipe_short, "چهره با MediaPipe با موفقیت تشخیص داده شد"),
+    "dnn": (_detect_with_dnn, "چهره با DNN با موفقیت تشخیص داده شد"),
+    "haarcascade": (_detect_with_haar, "چهره با موفقیت تشخیص داده شد"),
+}
 
-        # محاسبه نسبت عرض به ارتفاع
-        aspect_ratio = w / h if h > 0 else 0
 
-        # ساخت دیکشنری مختصات چهره
-        face_coordinates = {
-            "x": int(x),
-            "y": int(y),
-            "width": int(w),
-            "height": int(h),
-            "center_x": int(center_x),
-            "center_y": int(center_y),
-            "aspect_ratio": float(aspect_ratio),
-            "source": "haarcascade"
-        }
+def detect_face(image: np.ndarray, size_class: Optional[str] = None) -> Dict[str, Any]:
+    """
+    تشخیص چهره در تصویر با استفاده از روش‌های متعدد.
+
+    ترتیب اجرای روش‌ها براساس نرخ موفقیت و زمان پاسخ اخیر هر روش
+    در کلاس اندازه تصویر تعیین می‌شود.
+
+    Args:
+        image: تصویر OpenCV
+        size_class: کلاس اندازه تصویر اصلی (اختیاری، پیش‌فرض از ابعاد همین تصویر)
+
+    Returns:
+        dict: نتیجه تشخیص چهره
+    """
+    try:
+        if size_class is None:
+            size_class = classify_image_size(image.shape)
 
-        logger.info("چهره با Haar Cascade با موفقیت تشخیص داده شد")
+        default_order = DEFAULT_BACKEND_ORDER.get(
+            size_class, DEFAULT_BACKEND_ORDER["medium"])
+        backend_order = cascade_stats.order(size_class, default_order)
+
+        for position, backend in enumerate(backend_order):
+            detector, success_message = _DETECTION_BACKENDS[backend]
+            start_time = time.perf_counter()
+
+            try:
+                face_coordinates = detector(image)
+            except Exception as backend_error:
+                logger.warning(
+                    f"خطا در تشخیص چهره با {backend}: {str(backend_error)}")
+                face_coordinates = None
+
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            cascade_stats.record(size_class, backend,
+                                 face_coordinates is not None, latency_ms,
+                                 unconditional=position == 0)
+
+            if face_coordinates is not None:
+                logger.info(success_message)
+                return {
+                    "success": True,
+                    "message": success_message,
+                    "face": face_coordinates
+                }
+
+            logger.info(f"با روش {backend} چهره‌ای تشخیص داده نشد")
+
+        cascade_stats.record_unserved(size_class)
+        logger.warning("هیچ چهره‌ای در تصویر تشخیص داده نشد")
         return {
-            "success": True,
-            "message": "چهره با موفقیت تشخیص داده شد",
-            "face": face_coordinates
+            "success": False,
+            "message": "هیچ چهره‌ای در تصویر تشخیص داده نشد"
         }
 
     except Exception as e:
@@ -335,6 +393,88 @@ def detect_face(image: np.ndarray) -> Dict[str, Any]:
         }
 
 
+def detect_faces_batch(images: List[np.ndarray], batch_size: int = 16, fallback: bool = True) -> List[Dict[str, Any]]:
+    """
+    تشخیص چهره در چند تصویر با یک اجرای شبکه DNN برای هر دسته.
+
+    تصاویر با cv2.dnn.blobFromImages در یک blob قرار می‌گیرند و با یک فراخوانی
+    forward پردازش می‌شوند. برای تصاویری که DNN در آن‌ها چهره‌ای نیافت (یا شبکه
+    در دسترس نبود)، در صورت فعال بودن fallback از detect_face استفاده می‌شود.
+
+    Args:
+        images: لیست تصاویر OpenCV
+        batch_size: حداکثر تعداد تصاویر در هر اجرای شبکه
+        fallback: استفاده از detect_face برای تصاویر بدون نتیجه
+
+    Returns:
+        list: نتیجه تشخیص هر تصویر به ترتیب ورودی، با ساختار خروجی detect_face
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+    valid_indices = []
+
+    for i, image in enumerate(images):
+        if image is not None and image.size > 0:
+            valid_indices.append(i)
+        else:
+            results[i] = {
+                "success": False,
+                "message": "تصویر نامعتبر است"
+            }
+
+    net = None
+    try:
+        net = get_dnn_face_detector()
+    except Exception as e:
+        logger.warning(f"خطا در دریافت مدل DNN: {str(e)}")
+
+    if net is not None:
+        for start in range(0, len(valid_indices), max(1, batch_size)):
+            batch_indices = valid_indices[start:start + batch_size]
+            batch_images = [images[i] for i in batch_indices]
+
+            try:
+                # پیش‌پردازش همه تصاویر در یک blob
+                blob = cv2.dnn.blobFromImages(batch_images, 1.0, (300, 300), [
+                                              104, 117, 123], False, False)
+
+                # یک اجرای شبکه برای کل دسته
+                with _dnn_lock:
+                    net.setInput(blob)
+                    detections = net.forward()
+            except Exception as e:
+                logger.warning(f"خطا در تشخیص دسته‌ای چهره با DNN: {str(e)}")
+                continue
+
+            for batch_position, image_index in enumerate(batch_indices):
+                face_coordinates = _select_dnn_face(
+                    detections, batch_position, images[image_index].shape)
+
+                if face_coordinates is not None:
+                    results[image_index] = {
+                        "success": True,
+                        "message": "چهره با DNN با موفقیت تشخیص داده شد",
+                        "face": face_coordinates
+                    }
+
+        logger.info(
+            f"تشخیص دسته‌ای DNN برای {len(valid_indices)} تصویر انجام شد")
+
+    # تصاویری که نتیجه ندارند
+    for i in valid_indices:
+        if results[i] is not None:
+            continue
+
+        if fallback:
+            results[i] = detect_face(images[i])
+        else:
+            results[i] = {
+                "success": False,
+                "message": "هیچ چهره‌ای در تصویر تشخیص داده نشد"
+            }
+
+    return results
+
+
 def detect_face_landmarks(image: np.ndarray, face_coordinates: Dict[str, int]) -> Optional[np.ndarray]:
     """تشخیص نقاط کلیدی چهره"""
     try:
@@ -344,8 +484,6 @@ def detect_face_landmarks(image: np.ndarray, face_coordinates: Dict[str, int]) -
         x, y, w, h = face_coordinates["x"], face_coordinates["y"], face_coordinates["width"], face_coordinates["height"]
 
         try:
-            mp_face_mesh = mp.solutions.face_mesh
-
             # برش چهره با حاشیه بزرگتر
             padding = int(w * 0.3)  # افزایش حاشیه به 30%
             x1 = max(0, x - padding)
@@ -368,12 +506,8 @@ def detect_face_landmarks(image: np.ndarray, face_coordinates: Dict[str, int]) -
             except Exception as e:
                 logger.warning(f"خطا در بهبود کنتراست تصویر: {str(e)}")
 
-            with mp_face_mesh.FaceMesh(
-                    static_image_mode=True,
-                    max_num_faces=1,
-                    refine_landmarks=True,
-                    min_detection_confidence=0.6) as face_mesh:
-
+            # استفاده از نشست آماده در استخر به جای ساخت گراف جدید
+            with get_session_pool("face_mesh").acquire() as face_mesh:
                 results = face_mesh.process(rgb_face)
 
                 if results.multi_face_landmarks:
@@ -537,6 +671,64 @@ def preprocess_image_for_face_detection(image: np.ndarray) -> np.ndarray:
     return processed
 
 
+def downscale_image_for_face_detection(image: np.ndarray, max_dim: int) -> Tuple[np.ndarray, float]:
+    """
+    کوچک‌سازی سریع تصویر برای تشخیص چهره بدون حذف نویز.
+
+    Args:
+        image: تصویر OpenCV
+        max_dim: حداکثر ابعاد تصویر کوچک شده
+
+    Returns:
+        tuple: (تصویر_کوچک_شده، ضریب_مقیاس)
+    """
+    h, w = image.shape[:2]
+
+    if max(h, w) <= max_dim:
+        return image, 1.0
+
+    scale = max_dim / max(h, w)
+    new_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    resized = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+    return resized, scale
+
+
+def project_face_coordinates(face: Dict[str, Any], scale: float, image_shape: Tuple[int, ...]) -> Dict[str, Any]:
+    """
+    نگاشت مختصات چهره از تصویر کوچک شده به تصویر با وضوح کامل.
+
+    Args:
+        face: مختصات چهره در تصویر کوچک شده
+        scale: ضریب مقیاس تصویر کوچک شده نسبت به تصویر اصلی
+        image_shape: ابعاد تصویر اصلی
+
+    Returns:
+        dict: مختصات چهره در تصویر اصلی
+    """
+    if scale == 1.0:
+        return face
+
+    img_h, img_w = image_shape[:2]
+
+    x = max(0, int(round(face["x"] / scale)))
+    y = max(0, int(round(face["y"] / scale)))
+    width = min(int(round(face["width"] / scale)), img_w - x)
+    height = min(int(round(face["height"] / scale)), img_h - y)
+
+    projected = dict(face)
+    projected.update({
+        "x": x,
+        "y": y,
+        "width": width,
+        "height": height,
+        "center_x": x + width // 2,
+        "center_y": y + height // 2,
+        "aspect_ratio": float(width / height) if height > 0 else 0.0
+    })
+    return projected
+
+
 def get_face_image(image: np.ndarray) -> Tuple[bool, Dict[str, Any], Optional[np.ndarray]]:
     """
     تشخیص چهره و برش تصویر چهره.
@@ -556,17 +748,29 @@ def get_face_image(image: np.ndarray) -> Tuple[bool, Dict[str, Any], Optional[np
                 "message": "تصویر با کیفیت مناسبی برای تشخیص چهره ندارد (ابعاد خیلی کوچک)"
             }, None
 
-        # پیش‌پردازش تصویر برای تشخیص بهتر
-        processed_image = preprocess_image_for_face_detection(image)
+        # آماده‌سازی تصویر برای تشخیص چهره
+        if settings.FACE_DETECTION_MODE == "legacy":
+            # روش قبلی: تغییر اندازه به 1200 پیکسل و حذف نویز
+            processed_image = preprocess_image_for_face_detection(image)
+            scale = processed_image.shape[1] / width
+        else:
+            # تشخیص روی نسخه کوچک و نگاشت مختصات به وضوح کامل
+            processed_image, scale = downscale_image_for_face_detection(
+                image, settings.FACE_DETECTION_MAX_DIM)
 
-        # تشخیص چهره
-        detection_result = detect_face(processed_image)
+        # تشخیص چهره (کلاس اندازه براساس تصویر اصلی تعیین می‌شود)
+        detection_result = detect_face(
+            processed_image, size_class=classify_image_size(image.shape))
 
         if not detection_result.get("success", False):
             logger.warning(
                 f"تشخیص چهره ناموفق بود: {detection_result.get('message', 'دلیل نامشخص')}")
             return False, detection_result, None
 
+        # مختصات باید با تصویر اصلی که برش و نقاط کلیدی روی آن انجام می‌شود یکسان باشد
+        detection_result["face"] = project_face_coordinates(
+            detection_result["face"], scale, image.shape)
+
         # استخراج مختصات چهره
         face = detection_result.get("face")
         x, y, w, h = face["x"], face["y"], face["width"], face["height"]
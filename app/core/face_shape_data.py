@@ -2,7 +2,10 @@
 import json
 import logging
 import os
-from typing import Dict, Any, List
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.config import settings
 
@@ -12,6 +15,28 @@ logger = logging.getLogger(__name__)
 # دیکشنری اطلاعات شکل‌های چهره
 _face_shape_info = None
 
+# فاصله بررسی زمان تغییر فایل داده برای نقشه نوع فریم (ثانیه)
+_MAPPINGS_CHECK_INTERVAL = 5.0
+
+# نقشه پیش‌فرض نوع فریم به کلمات کلیدی
+_DEFAULT_FRAME_TYPE_MAPPINGS = {
+    "مستطیلی": ["مستطیل", "rectangular", "rectangle"],
+    "مربعی": ["مربع", "square"],
+    "گرد": ["گرد", "round", "circular"],
+    "بیضی": ["بیضی", "oval"],
+    "گربه‌ای": ["گربه", "cat eye", "cat-eye"],
+    "هشت‌ضلعی": ["هشت", "octagonal", "octagon"],
+    "هاوایی": ["هاوایی", "aviator"],
+    "بدون‌فریم": ["بدون فریم", "rimless"]
+}
+
+# الگوی ترکیبی کلمات کلیدی نوع فریم و زمان تغییر فایلی که از آن ساخته شده
+_frame_type_matcher: Optional[Tuple[Optional[re.Pattern], Dict[str, Tuple[int, str]]]] = None
+_frame_type_matcher_mtime = None
+_frame_type_matcher_checked_at = 0.0
+_frame_type_matcher_version = 0
+_frame_type_matcher_lock = threading.Lock()
+
 
 def load_face_shape_data() -> Dict[str, Any]:
     """
@@ -112,6 +137,102 @@ def _get_default_face_shape_info() -> Dict[str, Any]:
     }
 
 
+def _load_frame_type_mappings() -> Dict[str, List[str]]:
+    try:
+        with open(settings.FACE_SHAPE_DATA_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get('frame_type_mappings', {})
+    except Exception as e:
+        logger.error(f"خطا در بارگیری نقشه نوع فریم: {str(e)}")
+        return _DEFAULT_FRAME_TYPE_MAPPINGS
+
+
+def _build_frame_type_matcher(
+    mappings: Dict[str, List[str]]
+) -> Tuple[Optional[re.Pattern], Dict[str, Tuple[int, str]]]:
+    """
+    ساخت یک الگوی ترکیبی از همه کلمات کلیدی نوع فریم.
+
+    اولویت هر نوع فریم ترتیب آن در نقشه است. الگو به صورت lookahead ساخته
+    می‌شود تا تطابق‌های هم‌پوشان هم دیده شوند و گزینه‌ها به ترتیب اولویت
+    چیده می‌شوند، بنابراین نتیجه با بررسی تک‌تک کلمات کلیدی یکسان است.
+    """
+    keywords: Dict[str, Tuple[int, str]] = {}
+    for priority, (frame_type, words) in enumerate(mappings.items()):
+        for word in words:
+            if word and word not in keywords:
+                keywords[word] = (priority, frame_type)
+
+    if not keywords:
+        return None, keywords
+
+    ordered = sorted(keywords, key=lambda word: keywords[word][0])
+    pattern = re.compile("(?=(" + "|".join(re.escape(word) for word in ordered) + "))")
+    return pattern, keywords
+
+
+def _get_frame_type_matcher() -> Tuple[Optional[re.Pattern], Dict[str, Tuple[int, str]]]:
+    """الگوی نوع فریم؛ فقط پس از تغییر فایل داده دوباره ساخته می‌شود"""
+    global _frame_type_matcher, _frame_type_matcher_mtime
+    global _frame_type_matcher_checked_at, _frame_type_matcher_version
+
+    now = time.monotonic()
+    matcher = _frame_type_matcher
+    if matcher is not None and now - _frame_type_matcher_checked_at < _MAPPINGS_CHECK_INTERVAL:
+        return matcher
+
+    with _frame_type_matcher_lock:
+        try:
+            mtime = os.stat(settings.FACE_SHAPE_DATA_PATH).st_mtime_ns
+        except OSError:
+            mtime = None
+        _frame_type_matcher_checked_at = now
+
+        if _frame_type_matcher is None or mtime != _frame_type_matcher_mtime:
+            _frame_type_matcher = _build_frame_type_matcher(_load_frame_type_mappings())
+            _frame_type_matcher_mtime = mtime
+            _frame_type_matcher_version += 1
+            logger.info(
+                f"الگوی نوع فریم با {len(_frame_type_matcher[1])} کلمه کلیدی ساخته شد")
+
+        return _frame_type_matcher
+
+
+def get_frame_type_mappings_version() -> int:
+    """
+    شماره نسخه نقشه نوع فریم که با هر تغییر فایل داده افزایش می‌یابد.
+
+    Returns:
+        int: نسخه نقشه
+    """
+    _get_frame_type_matcher()
+    return _frame_type_matcher_version
+
+
+def infer_frame_type(name: str) -> Optional[str]:
+    """
+    استنباط نوع فریم از نام محصول با یک بار پیمایش نام.
+
+    Args:
+        name: نام محصول (با حروف کوچک)
+
+    Returns:
+        str: نوع فریم با بالاترین اولویت که کلمه کلیدی آن در نام آمده یا None
+    """
+    pattern, keywords = _get_frame_type_matcher()
+    if pattern is None:
+        return None
+
+    best = None
+    for match in pattern.finditer(name):
+        priority, frame_type = keywords[match.group(1)]
+        if best is None or priority < best[0]:
+            best = (priority, frame_type)
+            if priority == 0:
+                break
+
+    return best[1] if best else None
+
+
 def get_recommended_frame_types(face_shape: str) -> List[str]:
     """
     دریافت انواع فریم پیشنهادی براساس شکل چهره.
@@ -0,0 +1,180 @@
+# app/core/face_tracking.py
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.core.face_detection import get_face_image
+from app.core.face_analysis import build_analysis_context, analyze_face_shape
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# عرض الگوی چهره برای ردیابی (تطبیق الگو روی نسخه کوچک انجام می‌شود)
+_TEMPLATE_WIDTH = 80
+
+# حاشیه ناحیه جستجو اطراف آخرین موقعیت چهره (نسبت به ابعاد چهره)
+_SEARCH_MARGIN = 0.5
+
+
+class FaceTracker:
+    """
+    ردیاب چهره در جریان تصاویر دوربین.
+
+    تشخیص کامل چهره فقط روی فریم‌های کلیدی انجام می‌شود و در فریم‌های میانی
+    ناحیه چهره با تطبیق الگو در اطراف موقعیت قبلی دنبال می‌شود. نقاط کلیدی
+    فقط روی همین ناحیه محاسبه می‌شوند و شکل چهره با رأی‌گیری در یک پنجره
+    لغزان هموار می‌شود.
+    """
+
+    def __init__(self):
+        self._face: Optional[Dict[str, Any]] = None
+        self._template: Optional[np.ndarray] = None
+        self._template_scale = 1.0
+        self._frames_since_keyframe = 0
+        self._votes: deque = deque(maxlen=max(1, settings.STREAM_VOTE_WINDOW))
+        self._stable_shape: Optional[str] = None
+        self.frames = 0
+        self.keyframes = 0
+
+    def process_frame(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        پردازش یک فریم از جریان دوربین.
+
+        Args:
+            image: فریم OpenCV
+
+        Returns:
+            dict: وضعیت ردیابی، مختصات چهره، شکل چهره پیشرو در رأی‌گیری و در
+            صورت پایدار شدن نتیجه، کلید stable با مقدار True
+        """
+        start_time = time.perf_counter()
+        self.frames += 1
+
+        tracking = "tracked"
+        face = None
+        if self._face is not None and self._frames_since_keyframe < settings.STREAM_KEYFRAME_INTERVAL:
+            face = self._track(image)
+            if face is None:
+                tracking = "lost"
+
+        if face is None:
+            success, detection_result, _ = get_face_image(image)
+            if not success:
+                self._reset()
+                return self._status(tracking="no_face", start_time=start_time,
+                                    message=detection_result.get("message", "چهره‌ای تشخیص داده نشد"))
+            face = detection_result["face"]
+            self._set_keyframe(image, face)
+            tracking = "keyframe"
+        else:
+            self._frames_since_keyframe += 1
+
+        # نقاط کلیدی فقط روی ناحیه چهره محاسبه می‌شوند
+        x, y, w, h = face["x"], face["y"], face["width"], face["height"]
+        context = build_analysis_context(image, face, image[y:y + h, x:x + w])
+        if context["landmarks"] is None:
+            return self._status(tracking=tracking, face=face, start_time=start_time,
+                                message="امکان تشخیص نقاط کلیدی چهره وجود ندارد")
+
+        # آمار فریم‌های جریان در آمار نسبت‌های چهره ثبت نمی‌شود
+        analysis = analyze_face_shape(
+            image, face, landmarks=context["landmarks"], log_metrics=False)
+        if analysis.get("success", False):
+            self._votes.append(
+                (analysis["face_shape"], float(analysis["confidence"])))
+
+        return self._status(tracking=tracking, face=face, start_time=start_time)
+
+    def _set_keyframe(self, image: np.ndarray, face: Dict[str, Any]):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        x, y, w, h = face["x"], face["y"], face["width"], face["height"]
+        self._template_scale = min(1.0, _TEMPLATE_WIDTH / max(1, w))
+        self._template = cv2.resize(gray[y:y + h, x:x + w], None,
+                                    fx=self._template_scale, fy=self._template_scale,
+                                    interpolation=cv2.INTER_AREA)
+        self._face = face
+        self._frames_since_keyframe = 0
+        self.keyframes += 1
+
+    def _track(self, image: np.ndarray) -> Optional[Dict[str, Any]]:
+        """پیدا کردن چهره در اطراف موقعیت قبلی با تطبیق الگو"""
+        face, scale = self._face, self._template_scale
+        x, y, w, h = face["x"], face["y"], face["width"], face["height"]
+        height, width = image.shape[:2]
+
+        # ناحیه جستجو با حاشیه اطراف آخرین موقعیت
+        margin_x, margin_y = int(w * _SEARCH_MARGIN), int(h * _SEARCH_MARGIN)
+        x1, y1 = max(0, x - margin_x), max(0, y - margin_y)
+        x2, y2 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+
+        region = cv2.cvtColor(image[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        region = cv2.resize(region, None, fx=scale, fy=scale,
+                            interpolation=cv2.INTER_AREA)
+        if region.shape[0] < self._template.shape[0] or region.shape[1] < self._template.shape[1]:
+            return None
+
+        scores = cv2.matchTemplate(region, self._template, cv2.TM_CCOEFF_NORMED)
+        _, max_score, _, max_loc = cv2.minMaxLoc(scores)
+        if max_score < settings.STREAM_TRACKING_MIN_SCORE:
+            logger.debug(f"ردیابی چهره از دست رفت (امتیاز {max_score:.2f})")
+            return None
+
+        new_x = min(max(0, x1 + int(round(max_loc[0] / scale))), width - w)
+        new_y = min(max(0, y1 + int(round(max_loc[1] / scale))), height - h)
+        self._face = dict(face, x=new_x, y=new_y,
+                          center_x=new_x + w // 2, center_y=new_y + h // 2,
+                          source="tracking")
+        return self._face
+
+    def _reset(self):
+        self._face = None
+        self._template = None
+        self._frames_since_keyframe = 0
+
+    def _status(
+        self,
+        tracking: str,
+        start_time: float,
+        face: Optional[Dict[str, Any]] = None,
+        message: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """ساخت وضعیت فریم و بررسی پایدار شدن رأی‌گیری"""
+        status = {
+            "frame": self.frames,
+            "tracking": tracking,
+            "face_coordinates": face,
+            "face_shape": None,
+            "confidence": None,
+            "agreement": 0.0,
+            "votes": len(self._votes),
+            "stable": False,
+            "message": message,
+            "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 2)
+        }
+
+        if not self._votes:
+            return status
+
+        face_shape, count = Counter(
+            shape for shape, _ in self._votes).most_common(1)[0]
+        agreement = count / len(self._votes)
+        status.update({
+            "face_shape": face_shape,
+            "confidence": round(float(np.mean(
+                [confidence for shape, confidence in self._votes if shape == face_shape])), 2),
+            "agreement": round(agreement, 3)
+        })
+
+        # نتیجه فقط یک بار برای هر شکل پایدار شده اعلام می‌شود
+        if len(self._votes) >= settings.STREAM_MIN_VOTES \
+                and agreement >= settings.STREAM_STABLE_AGREEMENT \
+                and face_shape != self._stable_shape:
+            self._stable_shape = face_shape
+            status["stable"] = True
+
+        return status
@@ -0,0 +1,223 @@
+# app/core/mediapipe_pool.py
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+import numpy as np
+import mediapipe as mp
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+
+class MediaPipeSessionPool:
+    """
+    استخر نشست‌های MediaPipe برای جلوگیری از ساخت گراف در هر درخواست.
+
+    هر نشست در هر لحظه فقط در اختیار یک ترد است؛ نشست‌ها پس از استفاده
+    به استخر برمی‌گردند و در درخواست‌های بعدی دوباره استفاده می‌شوند.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], size: int):
+        self.name = name
+        self._factory = factory
+        self._size = max(1, size)
+        self._sessions: "queue.Queue[Any]" = queue.Queue(maxsize=self._size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._hits = 0
+        self._misses = 0
+        self._discarded = 0
+
+    def _create_session(self) -> Any:
+        session = self._factory()
+        with self._lock:
+            self._created += 1
+        return session
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """
+        گرفتن یک نشست از استخر و بازگرداندن آن پس از استفاده.
+
+        اگر استخر خالی باشد یک نشست جدید ساخته می‌شود (miss) و در صورت
+        وجود جای خالی، پس از استفاده به استخر اضافه می‌شود.
+        """
+        try:
+            session = self._sessions.get_nowait()
+            with self._lock:
+                self._hits += 1
+        except queue.Empty:
+            with self._lock:
+                self._misses += 1
+            session = self._create_session()
+
+        try:
+            yield session
+        finally:
+            try:
+                self._sessions.put_nowait(session)
+            except queue.Full:
+                # استخر پر است؛ نشست اضافه را می‌بندیم
+                with self._lock:
+                    self._discarded += 1
+                _close_session(session)
+
+    def warmup(self, sample: np.ndarray = None) -> int:
+        """
+        پر کردن استخر تا اندازه تعیین شده و اجرای یک استنتاج آزمایشی روی هر نشست.
+
+        Args:
+            sample: تصویر RGB نمونه برای گرم کردن گراف (اختیاری)
+
+        Returns:
+            int: تعداد نشست‌های آماده در استخر
+        """
+        if sample is None:
+            sample = np.zeros((192, 192, 3), dtype=np.uint8)
+
+        while not self._sessions.full():
+            session = self._create_session()
+            try:
+                session.process(sample)
+            except Exception as e:
+                logger.warning(
+                    f"خطا در گرم کردن نشست {self.name}: {str(e)}")
+            try:
+                self._sessions.put_nowait(session)
+            except queue.Full:
+                _close_session(session)
+                break
+
+        return self._sessions.qsize()
+
+    def close(self):
+        """بستن تمام نشست‌های موجود در استخر"""
+        while True:
+            try:
+                session = self._sessions.get_nowait()
+            except queue.Empty:
+                break
+            _close_session(session)
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار استفاده از استخر"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": self._size,
+                "available": self._sessions.qsize(),
+                "created": self._created,
+                "hits": self._hits,
+                "misses": self._misses,
+                "discarded": self._discarded,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0
+            }
+
+
+def _close_session(session: Any):
+    try:
+        session.close()
+    except Exception as e:
+        logger.debug(f"خطا در بستن نشست MediaPipe: {str(e)}")
+
+
+def _create_face_detection():
+    return mp.solutions.face_detection.FaceDetection(
+        model_selection=1,  # مدل با دقت بیشتر
+        min_detection_confidence=0.5
+    )
+
+
+def _create_face_detection_short():
+    return mp.solutions.face_detection.FaceDetection(
+        model_selection=0,  # مدل کوتاه‌برد برای چهره‌های نزدیک دوربین
+        min_detection_confidence=0.5
+    )
+
+
+def _create_face_mesh():
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.6
+    )
+
+
+# سازنده‌های نشست برای هر نوع استخر
+_POOL_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "face_detection": _create_face_detection,
+    "face_detection_short": _create_face_detection_short,
+    "face_mesh": _create_face_mesh,
+}
+
+# استخرهای ساخته شده در این پروسه
+_pools: Dict[str, MediaPipeSessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_session_pool(name: str) -> MediaPipeSessionPool:
+    """
+    دریافت استخر نشست‌های MediaPipe با نام مشخص.
+
+    Args:
+        name: نام استخر (face_detection، face_detection_short یا face_mesh)
+
+    Returns:
+        MediaPipeSessionPool: استخر نشست‌ها
+    """
+    pool = _pools.get(name)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            if name not in _POOL_FACTORIES:
+                raise KeyError(f"استخر MediaPipe ناشناخته: {name}")
+            pool = MediaPipeSessionPool(
+                name, _POOL_FACTORIES[name], settings.MEDIAPIPE_POOL_SIZE)
+            _pools[name] = pool
+        return pool
+
+
+def warmup_session_pools() -> Dict[str, int]:
+    """
+    ساخت و گرم کردن تمام استخرهای MediaPipe در شروع برنامه یا ورکر.
+
+    Returns:
+        dict: تعداد نشست‌های آماده در هر استخر
+    """
+    ready = {}
+    for name in _POOL_FACTORIES:
+        try:
+            ready[name] = get_session_pool(name).warmup()
+        except Exception as e:
+            logger.error(f"خطا در گرم کردن استخر {name}: {str(e)}")
+            ready[name] = 0
+
+    logger.info(f"استخرهای MediaPipe گرم شدند: {ready}")
+    return ready
+
+
+def get_session_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    دریافت آمار hit/miss استخرهای MediaPipe.
+
+    Returns:
+        dict: آمار هر استخر
+    """
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
+
+def close_session_pools():
+    """بستن تمام استخرهای MediaPipe"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,234 @@
+# app/core/model_registry.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+
+class _ModelEntry:
+    """اطلاعات یک مدل ثبت شده در رجیستری"""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        warmup: Optional[Callable[[Any], Any]] = None,
+        files: Optional[List[str]] = None,
+        version: Optional[Callable[[], Optional[str]]] = None
+    ):
+        self.name = name
+        self.loader = loader
+        self.warmup = warmup
+        self.files = files or []
+        self.version_fn = version
+        self.lock = threading.Lock()
+        self.model = None
+        self.loaded = False
+        self.warmed = False
+        self.error: Optional[str] = None
+        self.load_time_ms: Optional[float] = None
+        self.warmup_time_ms: Optional[float] = None
+        self.memory_bytes: Optional[int] = None
+        self.version: Optional[str] = None
+
+
+# مدل‌های ثبت شده در این پروسه
+_registry: Dict[str, _ModelEntry] = {}
+_registry_lock = threading.Lock()
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """حافظه مقیم فعلی پروسه (فقط لینوکس)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def register_model(
+    name: str,
+    loader: Callable[[], Any],
+    warmup: Optional[Callable[[Any], Any]] = None,
+    files: Optional[List[str]] = None,
+    version: Optional[Callable[[], Optional[str]]] = None
+):
+    """
+    ثبت یک مدل در رجیستری. مدل تا اولین درخواست یا گرم کردن بارگیری نمی‌شود.
+
+    Args:
+        name: نام یکتای مدل
+        loader: تابع بارگیری مدل
+        warmup: تابع اجرای یک استنتاج آزمایشی روی مدل (اختیاری)
+        files: فایل‌های مدل برای گزارش اندازه (اختیاری)
+        version: تابع محاسبه شناسه نسخه فایل‌های مدل (اختیاری)
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = _ModelEntry(name, loader, warmup, files, version)
+
+
+def _load_entry(entry: _ModelEntry):
+    """بارگیری مدل یک ورودی؛ باید با قفل ورودی فراخوانی شود"""
+    rss_before = _current_rss_bytes()
+    start_time = time.perf_counter()
+
+    try:
+        # نسخه پیش از بارگیری خوانده می‌شود ولی فقط پس از بارگیری موفق ثبت می‌شود
+        version = entry.version_fn() if entry.version_fn is not None else None
+        entry.model = entry.loader()
+        entry.version = version
+        entry.error = None
+        logger.info(f"مدل {entry.name} با موفقیت بارگیری شد")
+    except Exception as e:
+        # خطا را ذخیره می‌کنیم تا در هر درخواست دوباره تلاش نشود؛ بدون نسخه
+        # ثبت شده، بارگیری مجدد (reload) دوباره تلاش می‌کند
+        entry.model = None
+        entry.version = None
+        entry.error = str(e)
+        logger.error(f"خطا در بارگیری مدل {entry.name}: {str(e)}")
+
+    entry.load_time_ms = round((time.perf_counter() - start_time) * 1000, 2)
+    rss_after = _current_rss_bytes()
+    if rss_before is not None and rss_after is not None:
+        entry.memory_bytes = max(0, rss_after - rss_before)
+    entry.loaded = True
+
+
+def get_model(name: str) -> Any:
+    """
+    دریافت مدل از رجیستری؛ مدل فقط یک بار در هر پروسه بارگیری می‌شود.
+
+    Args:
+        name: نام مدل
+
+    Returns:
+        Any: مدل بارگیری شده یا None در صورت شکست بارگیری
+    """
+    entry = _registry.get(name)
+    if entry is None:
+        raise KeyError(f"مدل ثبت نشده است: {name}")
+
+    if entry.loaded:
+        return entry.model
+
+    with entry.lock:
+        if not entry.loaded:
+            _load_entry(entry)
+        return entry.model
+
+
+def replace_model(name: str, model: Any, version: Optional[str] = None):
+    """
+    جایگزینی اتمی مدل یک ورودی (برای بارگیری مجدد بدون ری‌استارت).
+
+    Args:
+        name: نام مدل
+        model: مدل جدید
+        version: شناسه نسخه مدل (اختیاری)
+    """
+    entry = _registry.get(name)
+    if entry is None:
+        raise KeyError(f"مدل ثبت نشده است: {name}")
+
+    with entry.lock:
+        entry.model = model
+        entry.version = version
+        entry.error = None
+        entry.loaded = True
+
+
+def get_model_version(name: str) -> Optional[str]:
+    """
+    دریافت شناسه نسخه مدل بارگیری شده.
+
+    Args:
+        name: نام مدل
+
+    Returns:
+        str: شناسه نسخه یا None
+    """
+    entry = _registry.get(name)
+    if entry is None:
+        raise KeyError(f"مدل ثبت نشده است: {name}")
+    return entry.version
+
+
+def warmup_models(names: Optional[List[str]] = None) -> Dict[str, bool]:
+    """
+    بارگیری و گرم کردن مدل‌ها با یک استنتاج آزمایشی.
+
+    Args:
+        names: نام مدل‌ها (پیش‌فرض: همه مدل‌های ثبت شده)
+
+    Returns:
+        dict: وضعیت آمادگی هر مدل
+    """
+    ready = {}
+    for name in names or list(_registry.keys()):
+        entry = _registry.get(name)
+        if entry is None:
+            ready[name] = False
+            continue
+
+        model = get_model(name)
+        if model is None:
+            ready[name] = False
+            continue
+
+        if entry.warmup is not None and not entry.warmed:
+            with entry.lock:
+                if not entry.warmed:
+                    rss_before = _current_rss_bytes()
+                    start_time = time.perf_counter()
+                    try:
+                        entry.warmup(model)
+                        entry.warmed = True
+                    except Exception as e:
+                        logger.warning(
+                            f"خطا در گرم کردن مدل {name}: {str(e)}")
+                    entry.warmup_time_ms = round(
+                        (time.perf_counter() - start_time) * 1000, 2)
+                    rss_after = _current_rss_bytes()
+                    if rss_before is not None and rss_after is not None:
+                        entry.memory_bytes = (entry.memory_bytes or 0) + \
+                            max(0, rss_after - rss_before)
+
+        ready[name] = True
+
+    logger.info(f"مدل‌ها گرم شدند: {ready}")
+    return ready
+
+
+def get_model_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    دریافت زمان بارگیری و حافظه مصرفی هر مدل.
+
+    Returns:
+        dict: آمار هر مدل ثبت شده
+    """
+    stats = {}
+    for name, entry in list(_registry.items()):
+        file_size = 0
+        for path in entry.files:
+            try:
+                file_size += os.path.getsize(path)
+            except OSError:
+                pass
+
+        stats[name] = {
+            "loaded": entry.loaded and entry.model is not None,
+            "warmed": entry.warmed,
+            "load_time_ms": entry.load_time_ms,
+            "warmup_time_ms": entry.warmup_time_ms,
+            "memory_bytes": entry.memory_bytes,
+            "file_size_bytes": file_size,
+            "version": entry.version,
+            "error": entry.error
+        }
+    return stats
@@ -0,0 +1,217 @@
+# app/core/video_analysis.py
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.core.face_detection import get_face_image
+from app.core.face_analysis import build_analysis_context, analyze_face_shape
+from app.core.face_shape_data import load_face_shape_data, get_recommended_frame_types
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+
+def _aggregate_votes(votes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    ترکیب نتایج فریم‌ها با رأی‌گیری وزن‌دار براساس اطمینان.
+
+    اطمینان نهایی میانگین اطمینان فریم‌های شکل برنده ضرب در نسبت توافق است،
+    بنابراین نتیجه‌ای با فریم‌های متناقض اطمینان کمتری دارد.
+    """
+    if not votes:
+        return None
+
+    scores = defaultdict(float)
+    confidences = defaultdict(list)
+    for vote in votes:
+        scores[vote["face_shape"]] += vote["confidence"]
+        confidences[vote["face_shape"]].append(vote["confidence"])
+
+    face_shape = max(scores, key=scores.get)
+    agreement = len(confidences[face_shape]) / len(votes)
+    return {
+        "face_shape": face_shape,
+        "confidence": round(float(np.mean(confidences[face_shape])) * agreement, 2),
+        "agreement": round(agreement, 3)
+    }
+
+
+def _analyze_frame(frame: np.ndarray) -> Dict[str, Any]:
+    """تشخیص چهره، نقاط کلیدی و تحلیل هندسی یک فریم"""
+    success, detection_result, face_image = get_face_image(frame)
+    if not success:
+        return {
+            "success": False,
+            "message": detection_result.get("message", "خطا در تشخیص چهره")
+        }
+
+    face_coordinates = detection_result["face"]
+    context = build_analysis_context(frame, face_coordinates, face_image)
+    if context["landmarks"] is None:
+        return {
+            "success": False,
+            "message": "امکان تشخیص نقاط کلیدی چهره وجود ندارد"
+        }
+
+    # فریم‌های ویدیو در آمار نسبت‌های چهره ثبت نمی‌شوند
+    result = analyze_face_shape(
+        frame, face_coordinates, landmarks=context["landmarks"], log_metrics=False)
+    result["face_coordinates"] = face_coordinates
+    return result
+
+
+def analyze_video_file(video_path: str) -> Dict[str, Any]:
+    """
+    تحلیل شکل چهره در یک فایل ویدیو با نمونه‌برداری از فریم‌ها.
+
+    فریم‌ها به صورت جریانی خوانده می‌شوند: فریم‌های بین نمونه‌ها فقط با
+    grab رد می‌شوند و دیکد نمی‌شوند. پس از اولین فریم ناموفق فاصله نمونه‌ها
+    نصف می‌شود تا چهره زودتر دوباره پیدا شود، در شکست‌های پیاپی فاصله دو برابر
+    می‌شود تا بخش‌های بدون چهره سریع رد شوند و پس از فریم موفق به مقدار پایه
+    برمی‌گردد. وقتی اطمینان تجمیعی از آستانه بگذرد خواندن متوقف می‌شود.
+
+    Args:
+        video_path: مسیر فایل ویدیو
+
+    Returns:
+        dict: شکل چهره تجمیعی، اطلاعات شکل چهره و زمان‌بندی هر فریم نمونه
+    """
+    start_time = time.perf_counter()
+    capture = cv2.VideoCapture(video_path)
+
+    try:
+        if not capture.isOpened():
+            return {
+                "success": False,
+                "message": "خطا در خواندن فایل ویدیو"
+            }
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        base_step = max(1, int(round(fps * settings.VIDEO_SAMPLE_INTERVAL_SECONDS)))
+        max_frames = int(fps * settings.VIDEO_MAX_DURATION_SECONDS)
+
+        step = base_step
+        consecutive_failures = 0
+        frame_index = -1
+        next_sample = 0
+        frames: List[Dict[str, Any]] = []
+        votes: List[Dict[str, Any]] = []
+        aggregate = None
+        stopped_early = False
+
+        while len(frames) < settings.VIDEO_MAX_SAMPLES:
+            read_start = time.perf_counter()
+
+            # رد شدن از فریم‌های بین نمونه‌ها بدون دیکد
+            while frame_index + 1 < next_sample:
+                if not capture.grab():
+                    break
+                frame_index += 1
+            if frame_index + 1 < next_sample:
+                break
+
+            if not capture.grab():
+                break
+            frame_index += 1
+            if max_frames > 0 and frame_index >= max_frames:
+                break
+
+            ok, frame = capture.retrieve()
+            if not ok or frame is None:
+                break
+            decode_ms = (time.perf_counter() - read_start) * 1000
+
+            analysis_start = time.perf_counter()
+            result = _analyze_frame(frame)
+            analysis_ms = (time.perf_counter() - analysis_start) * 1000
+
+            frame_result = {
+                "index": frame_index,
+                "timestamp": round(frame_index / fps, 3),
+                "success": result.get("success", False),
+                "message": result.get("message"),
+                "face_shape": result.get("face_shape"),
+                "confidence": result.get("confidence"),
+                "decode_ms": round(decode_ms, 2),
+                "analysis_ms": round(analysis_ms, 2)
+            }
+            frames.append(frame_result)
+
+            if frame_result["success"]:
+                votes.append({
+                    "face_shape": frame_result["face_shape"],
+                    "confidence": float(frame_result["confidence"])
+                })
+                step = base_step
+                consecutive_failures = 0
+            else:
+                # چهره در این فریم پیدا نشد؛ ابتدا زودتر و در ادامه با فاصله بیشتر نمونه‌برداری می‌شود
+                consecutive_failures += 1
+                if consecutive_failures == 1:
+                    step = max(1, base_step // 2)
+                else:
+                    step = min(base_step * 4, step * 2)
+
+            next_sample = frame_index + step
+
+            aggregate = _aggregate_votes(votes)
+            if aggregate is not None and len(votes) >= settings.VIDEO_MIN_SAMPLES \
+                    and aggregate["confidence"] >= settings.VIDEO_CONFIDENCE_THRESHOLD:
+                stopped_early = True
+                break
+
+        video_info = {
+            "fps": round(float(fps), 2),
+            "frame_count": frame_count,
+            "duration_seconds": round(frame_count / fps, 2) if frame_count else None,
+            "frames_read": frame_index + 1
+        }
+        elapsed_ms = round((time.perf_counter() - start_time) * 1000, 2)
+
+        if aggregate is None:
+            return {
+                "success": False,
+                "message": "چهره‌ای در فریم‌های ویدیو تشخیص داده نشد" if frames else "خطا در خواندن فریم‌های ویدیو",
+                "frames": frames,
+                "stopped_early": False,
+                "video": video_info,
+                "elapsed_ms": elapsed_ms
+            }
+
+        face_shape = aggregate["face_shape"]
+        face_shape_info = load_face_shape_data().get(
+            "face_shapes", {}).get(face_shape, {})
+
+        logger.info(
+            f"تحلیل ویدیو انجام شد: {face_shape} با اطمینان {aggregate['confidence']:.1f}% "
+            f"({len(votes)} از {len(frames)} فریم نمونه، {elapsed_ms:.0f} میلی‌ثانیه)")
+
+        return {
+            "success": True,
+            "message": "تحلیل ویدیو با موفقیت انجام شد",
+            "face_shape": face_shape,
+            "confidence": aggregate["confidence"],
+            "agreement": aggregate["agreement"],
+            "description": face_shape_info.get("description", ""),
+            "recommendation": face_shape_info.get("recommendation", ""),
+            "recommended_frame_types": get_recommended_frame_types(face_shape),
+            "frames": frames,
+            "stopped_early": stopped_early,
+            "video": video_info,
+            "elapsed_ms": elapsed_ms
+        }
+
+    except Exception as e:
+        logger.error(f"خطا در تحلیل ویدیو: {str(e)}")
+        return {
+            "success": False,
+            "message": f"خطا در تحلیل ویدیو: {str(e)}"
+        }
+    finally:
+        capture.release()
@@ -0,0 +1,285 @@
+# app/core/vision_pool.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+import cv2
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# استخر پروسه‌ها (فقط در پروسه اصلی API ساخته می‌شود)
+_executor: Optional[ProcessPoolExecutor] = None
+_started_at: Optional[float] = None
+
+# آمار صف و ورکرها
+_pending = 0
+_submitted = 0
+_completed = 0
+_failed = 0
+_worker_stats: Dict[int, Dict[str, float]] = {}
+_cache_stats: Dict[str, int] = {"exact": 0, "phash": 0, "miss": 0}
+
+
+def _init_vision_worker():
+    """
+    مقداردهی اولیه هر پروسه ورکر: بارگیری و گرم کردن مدل‌ها پیش از اولین کار.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    # هر ورکر یک هسته دارد؛ تردهای داخلی OpenCV فقط رقابت ایجاد می‌کنند
+    cv2.setNumThreads(1)
+
+    # واردسازی ماژول‌ها برای ثبت مدل‌ها در رجیستری
+    import app.core.face_detection  # noqa: F401
+    import app.services.classifier  # noqa: F401
+    from app.core.model_registry import warmup_models
+    from app.services.classifier import start_model_watcher
+
+    if settings.MODEL_WARMUP:
+        try:
+            warmup_models()
+        except Exception as e:
+            logger.warning(f"خطا در گرم کردن مدل‌های ورکر: {str(e)}")
+
+    # هر پروسه نسخه خود از مدل را دارد و تغییر فایل را جداگانه دنبال می‌کند
+    start_model_watcher()
+
+    logger.info(f"ورکر پردازش تصویر {os.getpid()} آماده شد")
+
+
+def run_vision_pipeline(image_bytes: bytes, cache_scope: Optional[str] = None) -> Dict[str, Any]:
+    """
+    اجرای کامل مراحل پردازش تصویر (خواندن، تشخیص چهره و تحلیل شکل چهره).
+
+    ورودی بایت‌های فشرده تصویر و خروجی یک دیکشنری کوچک است تا هیچ آرایه
+    تصویری بین پروسه‌ها جابه‌جا نشود.
+
+    Args:
+        image_bytes: محتوای فایل تصویر
+        cache_scope: محدوده کلاینت برای کش هش ادراکی (خروجی client_cache_scope)
+
+    Returns:
+        dict: نتیجه پردازش شامل stage (مرحله پایانی)، مختصات چهره و نتیجه تحلیل
+    """
+    from app.core.face_detection import get_face_image, project_face_coordinates
+    from app.core.face_analysis import generate_full_analysis
+    from app.utils.image_processing import decode_image_bytes
+    from app.services.result_cache import (
+        image_content_key, face_phash_key, get_cached_result, store_cached_result,
+        get_cached_pipeline_result, store_pipeline_result)
+
+    start_time = time.perf_counter()
+    result: Dict[str, Any] = {"success": False}
+
+    try:
+        # دیکد مستقیم با وضوح کاهش یافته
+        image, scale = decode_image_bytes(image_bytes)
+
+        if image is None:
+            result.update({
+                "stage": "decode",
+                "message": "خطا در خواندن فایل تصویر"
+            })
+            return _finish(result, start_time)
+
+        # جستجوی نتیجه تصویر یکسان در کش
+        content_key = image_content_key(image)
+        cached = get_cached_pipeline_result(content_key)
+        if cached is not None:
+            face_coordinates, analysis_result = cached
+            result.update({
+                "success": True,
+                "stage": "analysis",
+                "message": analysis_result.get("message"),
+                "face_coordinates": face_coordinates,
+                "analysis": analysis_result,
+                "cache": "exact"
+            })
+            return _finish(result, start_time)
+
+        success, detection_result, face_image = get_face_image(image)
+
+        if not success:
+            result.update({
+                "stage": "detection",
+                "message": detection_result.get("message", "خطا در تشخیص چهره")
+            })
+            return _finish(result, start_time)
+
+        face_coordinates = detection_result.get("face")
+
+        # جستجوی نسخه دوباره فشرده شده همین چهره با هش ادراکی
+        phash_key = face_phash_key(face_image, cache_scope)
+        analysis_result = get_cached_result(phash_key)
+        if analysis_result is not None:
+            result["cache"] = "phash"
+        else:
+            analysis_result = generate_full_analysis(
+                image, face_coordinates, face_image)
+            if analysis_result.get("success", False):
+                store_cached_result(phash_key, analysis_result)
+
+        # مختصات پاسخ در ابعاد تصویر اصلی برگردانده می‌شود
+        if scale != 1.0:
+            original_shape = (int(round(image.shape[0] / scale)),
+                              int(round(image.shape[1] / scale)))
+            face_coordinates = project_face_coordinates(
+                face_coordinates, scale, original_shape)
+
+        pipeline_result = {
+            "success": analysis_result.get("success", False),
+            "stage": "analysis",
+            "message": analysis_result.get("message"),
+            "face_coordinates": face_coordinates,
+            "analysis": analysis_result
+        }
+        store_pipeline_result(content_key, face_coordinates, analysis_result)
+        result.update(pipeline_result)
+    except Exception as e:
+        logger.error(f"خطا در پردازش تصویر: {str(e)}")
+        result.update({
+            "stage": "error",
+            "message": f"خطا در پردازش تصویر: {str(e)}"
+        })
+
+    return _finish(result, start_time)
+
+
+def _finish(result: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+    """افزودن اطلاعات ورکر به نتیجه"""
+    result.setdefault("cache", None)
+    result["worker"] = {
+        "pid": os.getpid(),
+        "busy_ms": round((time.perf_counter() - start_time) * 1000, 2)
+    }
+    return result
+
+
+def start_vision_pool():
+    """راه‌اندازی استخر پروسه‌های پردازش تصویر"""
+    global _executor, _started_at
+
+    if _executor is not None or settings.VISION_POOL_WORKERS <= 0:
+        return
+
+    # spawn از کپی شدن تردها و نشست‌های پروسه اصلی در ورکرها جلوگیری می‌کند
+    _executor = ProcessPoolExecutor(
+        max_workers=settings.VISION_POOL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_vision_worker
+    )
+    _started_at = time.time()
+    logger.info(
+        f"استخر پردازش تصویر با {settings.VISION_POOL_WORKERS} ورکر راه‌اندازی شد")
+
+
+def stop_vision_pool():
+    """توقف استخر پروسه‌های پردازش تصویر"""
+    global _executor
+
+    if _executor is None:
+        return
+
+    _executor.shutdown(wait=True, cancel_futures=True)
+    _executor = None
+    logger.info("استخر پردازش تصویر متوقف شد")
+
+
+async def run_vision_job(image_bytes: bytes, cache_scope: Optional[str] = None) -> Dict[str, Any]:
+    """
+    اجرای پردازش تصویر بدون مسدود کردن event loop.
+
+    در صورت غیرفعال بودن استخر (VISION_POOL_WORKERS=0) پردازش در یک ترد
+    از همین پروسه اجرا می‌شود.
+
+    Args:
+        image_bytes: محتوای فایل تصویر
+        cache_scope: محدوده کلاینت برای کش هش ادراکی
+
+    Returns:
+        dict: خروجی run_vision_pipeline
+    """
+    global _executor, _pending, _submitted, _completed, _failed
+
+    _pending += 1
+    _submitted += 1
+    try:
+        if _executor is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(_executor, run_vision_pipeline, image_bytes, cache_scope)
+            except BrokenProcessPool:
+                # یکی از ورکرها از بین رفته است؛ استخر را از نو می‌سازیم
+                logger.error("استخر پردازش تصویر از کار افتاد، راه‌اندازی مجدد...")
+                _failed += 1
+                broken, _executor = _executor, None
+                broken.shutdown(wait=False, cancel_futures=True)
+                start_vision_pool()
+                raise
+        else:
+            result = await asyncio.to_thread(run_vision_pipeline, image_bytes, cache_scope)
+    finally:
+        _pending -= 1
+
+    _completed += 1
+    if result.get("stage") == "analysis":
+        _cache_stats[result.get("cache") or "miss"] += 1
+
+    worker = result.get("worker", {})
+    stats = _worker_stats.setdefault(worker.get("pid", 0), {
+        "tasks": 0,
+        "busy_ms": 0.0,
+        "last_task_at": None
+    })
+    stats["tasks"] += 1
+    stats["busy_ms"] += worker.get("busy_ms", 0.0)
+    stats["last_task_at"] = time.time()
+
+    return result
+
+
+def get_vision_pool_stats() -> Dict[str, Any]:
+    """
+    دریافت عمق صف و میزان استفاده از هر ورکر.
+
+    Returns:
+        dict: آمار استخر پردازش تصویر
+    """
+    uptime = time.time() - _started_at if _started_at else 0.0
+    workers = {}
+    for pid, stats in _worker_stats.items():
+        workers[str(pid)] = {
+            "tasks": stats["tasks"],
+            "busy_ms": round(stats["busy_ms"], 2),
+            "avg_task_ms": round(stats["busy_ms"] / stats["tasks"], 2) if stats["tasks"] else 0.0,
+            "utilisation": round(stats["busy_ms"] / 1000 / uptime, 4) if uptime > 0 else None
+        }
+
+    max_workers = settings.VISION_POOL_WORKERS if _executor is not None else 0
+    analysed = sum(_cache_stats.values())
+    return {
+        "enabled": _executor is not None,
+        "max_workers": max_workers,
+        "uptime_seconds": round(uptime, 1),
+        "pending": _pending,
+        "queue_depth": max(0, _pending - max_workers) if max_workers else _pending,
+        "submitted": _submitted,
+        "completed": _completed,
+        "failed": _failed,
+        "workers": workers,
+        "result_cache": {
+            **_cache_stats,
+            "hit_rate": round((_cache_stats["exact"] + _cache_stats["phash"]) / analysed, 4) if analysed else 0.0
+        }
+    }
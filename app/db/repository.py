@@ -709,13 +709,18 @@ async def get_conversion_stats(period: str = "month") -> Dict[str, Any]:
         }
 
 
-async def save_woocommerce_cache(data: List[Dict[str, Any]], last_update: datetime) -> bool:
+async def save_woocommerce_cache(
+    data: List[Dict[str, Any]],
+    last_update: datetime,
+    last_full_refresh: Optional[datetime] = None
+) -> bool:
     """
     ذخیره کش محصولات WooCommerce در دیتابیس به صورت چانک شده.
 
     Args:
         data: لیست محصولات
         last_update: زمان آخرین بروزرسانی
+        last_full_refresh: زمان آخرین بروزرسانی کامل (پیش‌فرض: last_update)
 
     Returns:
         bool: نتیجه عملیات ذخیره‌سازی
@@ -735,6 +740,7 @@ async def save_woocommerce_cache(data: List[Dict[str, Any]], last_update: dateti
         await db.woocommerce_cache.insert_one({
             "type": "products_cache_meta",
             "last_update": last_update,
+            "last_full_refresh": last_full_refresh or last_update,
             "total_products": len(data),
             "total_chunks": total_chunks
         })
@@ -760,6 +766,100 @@ async def save_woocommerce_cache(data: List[Dict[str, Any]], last_update: dateti
         return False
 
 
+async def update_woocommerce_cache_products(
+    upserts: List[Dict[str, Any]],
+    deleted_ids: List[int],
+    last_update: datetime
+) -> bool:
+    """
+    اعمال تغییرات محصولات روی کش ذخیره شده بدون بازنویسی همه چانک‌ها.
+
+    محصولات موجود در همان چانک خود جایگزین می‌شوند، محصولات جدید به چانک
+    آخر (یا چانک‌های جدید) اضافه می‌شوند و محصولات حذف شده از چانک‌ها
+    برداشته می‌شوند.
+
+    Args:
+        upserts: محصولات جدید یا تغییر یافته
+        deleted_ids: شناسه محصولات حذف شده
+        last_update: زمان بروزرسانی
+
+    Returns:
+        bool: نتیجه عملیات (False اگر کشی برای بروزرسانی وجود نداشته باشد)
+    """
+    try:
+        db = get_database()
+
+        meta_record = await db.woocommerce_cache.find_one({"type": "products_cache_meta"})
+        if not meta_record or "total_chunks" not in meta_record:
+            return False
+
+        chunk_size = 100
+        chunk_filter = {"type": {"$regex": "^products_cache_chunk_"}}
+
+        # جایگزینی محصولات موجود در چانک خودشان
+        new_products = []
+        for product in upserts:
+            result = await db.woocommerce_cache.update_one(
+                {**chunk_filter, "data.id": product.get("id")},
+                {"$set": {"data.$": product, "last_update": last_update}}
+            )
+            if result.matched_count == 0:
+                new_products.append(product)
+
+        if deleted_ids:
+            await db.woocommerce_cache.update_many(
+                chunk_filter,
+                {"$pull": {"data": {"id": {"$in": list(deleted_ids)}}}}
+            )
+
+        # افزودن محصولات جدید به فضای خالی چانک آخر و سپس چانک‌های جدید
+        total_chunks = meta_record["total_chunks"]
+        if new_products and total_chunks > 0:
+            last_chunk = await db.woocommerce_cache.find_one(
+                {"type": f"products_cache_chunk_{total_chunks - 1}"})
+            space = chunk_size - len(last_chunk.get("data", [])) if last_chunk else 0
+            if space > 0:
+                await db.woocommerce_cache.update_one(
+                    {"type": f"products_cache_chunk_{total_chunks - 1}"},
+                    {"$push": {"data": {"$each": new_products[:space]}},
+                     "$set": {"last_update": last_update}}
+                )
+                new_products = new_products[space:]
+
+        for i in range(0, len(new_products), chunk_size):
+            await db.woocommerce_cache.insert_one({
+                "type": f"products_cache_chunk_{total_chunks}",
+                "chunk_number": total_chunks,
+                "last_update": last_update,
+                "data": new_products[i:i+chunk_size]
+            })
+            total_chunks += 1
+
+        # شمارش دوباره محصولات ذخیره شده
+        counts = await db.woocommerce_cache.aggregate([
+            {"$match": chunk_filter},
+            {"$group": {"_id": None, "total": {"$sum": {"$size": "$data"}}}}
+        ]).to_list(length=1)
+        total_products = counts[0]["total"] if counts else 0
+
+        await db.woocommerce_cache.update_one(
+            {"type": "products_cache_meta"},
+            {"$set": {
+                "last_update": last_update,
+                "total_products": total_products,
+                "total_chunks": total_chunks
+            }}
+        )
+
+        logger.info(
+            f"تغییرات کش محصولات در دیتابیس ذخیره شد ({len(upserts)} بروزرسانی، {len(deleted_ids)} حذف)")
+        return True
+
+    except Exception as e:
+        logger.error(f"خطا در ذخیره تغییرات کش محصولات در دیتابیس: {str(e)}")
+        return False
+
+
 async def get_woocommerce_cache() -> Tuple[Optional[List[Dict[str, Any]]], Optional[datetime]]:
     """
     دریافت کش محصولات WooCommerce از دیتابیس.
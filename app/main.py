@@ -11,10 +11,17 @@ from app.config import settings, create_required_directories
 from app.api.face_analysis import router as face_analysis_router
 from app.api.health import router as health_router
 from app.api.analytics import router as analytics_router
+from app.api.webhooks import router as webhooks_router
 from app.middleware import client_info_middleware
 from app.db.connection import connect_to_mongo, close_mongo_connection
 from app.services.woocommerce import initialize_product_cache
 from app.db.repository import create_database_indexes, check_and_update_request_analytics
+from app.core.mediapipe_pool import close_session_pools
+from app.core.model_registry import warmup_models
+from app.utils.debug_artifacts import stop_debug_artifact_writer
+from app.core.face_analysis import face_metrics_sink
+from app.core.vision_pool import start_vision_pool, stop_vision_pool
+from app.services.classifier import start_model_watcher, stop_model_watcher
 
 # تنظیمات لاگینگ
 logging.basicConfig(
@@ -91,6 +98,7 @@ async def add_process_time_header(request: Request, call_next):
 app.include_router(face_analysis_router, prefix="/api/v1", tags=["تحلیل چهره"])
 app.include_router(health_router, prefix="/api/v1", tags=["سلامت سیستم"])
 app.include_router(analytics_router, prefix="/api/v1", tags=["آمار و تحلیل"])
+app.include_router(webhooks_router, prefix="/api/v1", tags=["وب‌هوک‌ها"])
 
 
 @app.on_event("startup")
@@ -104,6 +112,22 @@ async def startup_event():
     os.makedirs(os.path.dirname(settings.FACE_SHAPE_DATA_PATH), exist_ok=True)
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
+    # بارگیری و گرم کردن مدل‌ها پیش از اولین درخواست
+    if settings.MODEL_WARMUP:
+        try:
+            await asyncio.to_thread(warmup_models)
+        except Exception as e:
+            logging.warning(f"خطا در گرم کردن مدل‌ها: {str(e)}")
+
+    # بارگیری مجدد مدل شکل چهره پس از تغییر فایل آن (بدون ری‌استارت)
+    start_model_watcher()
+
+    # راه‌اندازی استخر پروسه‌های پردازش تصویر
+    try:
+        start_vision_pool()
+    except Exception as e:
+        logging.warning(f"خطا در راه‌اندازی استخر پردازش تصویر: {str(e)}")
+
     # اتصال به MongoDB با چند بار تلاش
     max_retries = 5
     retry_delay = 5  # ثانیه
@@ -157,6 +181,15 @@ async def shutdown_event():
     # بستن اتصال MongoDB
     await close_mongo_connection()
 
+    # توقف استخر پردازش تصویر و آزادسازی نشست‌های MediaPipe
+    stop_model_watcher()
+    stop_vision_pool()
+    close_session_pools()
+
+    # نوشتن تصاویر عیب‌یابی و آمار باقیمانده
+    stop_debug_artifact_writer()
+    face_metrics_sink.close()
+
 
 # مسیر ریشه
 @app.get("/")
@@ -112,6 +112,108 @@ class FaceAnalysisResponse(BaseResponse):
         }
 
 
+class BatchImageResult(BaseResponse):
+    """نتیجه تحلیل یک تصویر در درخواست دسته‌ای"""
+    index: int = Field(..., description="جایگاه تصویر در درخواست")
+    filename: Optional[str] = Field(None, description="نام فایل تصویر")
+    face_coordinates: Optional[FaceCoordinates] = Field(
+        None, description="مختصات چهره")
+    face_shape: Optional[str] = Field(
+        None, description="شکل تشخیص داده شده چهره")
+    confidence: Optional[float] = Field(
+        None, description="میزان اطمینان تشخیص")
+    description: Optional[str] = Field(
+        None, description="توضیحات مربوط به شکل چهره")
+    recommendation: Optional[str] = Field(
+        None, description="توصیه‌های مربوط به فریم مناسب")
+    recommended_frame_types: Optional[List[str]] = Field(
+        None, description="انواع فریم‌های پیشنهادی")
+    recommended_frames: Optional[List[RecommendedFrame]] = Field(
+        None, description="فریم‌های پیشنهادی")
+
+
+class BatchFaceAnalysisResponse(BaseResponse):
+    """پاسخ تحلیل دسته‌ای چند تصویر"""
+    total: int = Field(..., description="تعداد تصاویر دریافت شده")
+    succeeded: int = Field(..., description="تعداد تصاویر تحلیل شده")
+    failed: int = Field(..., description="تعداد تصاویر ناموفق")
+    results: List[BatchImageResult] = Field(
+        ..., description="نتایج به ترتیب تصاویر ارسال شده")
+    client_info: Optional[ClientInfo] = Field(
+        None, description="اطلاعات دستگاه و مرورگر کاربر")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "success": True,
+                "message": "تحلیل 2 تصویر از 2 تصویر با موفقیت انجام شد",
+                "total": 2,
+                "succeeded": 2,
+                "failed": 0,
+                "results": [
+                    {
+                        "index": 0,
+                        "filename": "customer-1.jpg",
+                        "success": True,
+                        "message": "تحلیل چهره با موفقیت انجام شد",
+                        "face_shape": "OVAL",
+                        "confidence": 85.5,
+                        "recommended_frame_types": ["مستطیلی", "مربعی", "هشت‌ضلعی"]
+                    },
+                    {
+                        "index": 1,
+                        "filename": "customer-2.jpg",
+                        "success": True,
+                        "message": "تحلیل چهره با موفقیت انجام شد",
+                        "face_shape": "ROUND",
+                        "confidence": 78.0,
+                        "recommended_frame_types": ["مستطیلی", "مربعی"]
+                    }
+                ]
+            }
+        }
+
+
+class VideoFrameResult(BaseModel):
+    """نتیجه تحلیل یک فریم نمونه از ویدیو"""
+    index: int = Field(..., description="شماره فریم در ویدیو")
+    timestamp: float = Field(..., description="زمان فریم (ثانیه)")
+    success: bool = Field(..., description="موفقیت تحلیل فریم")
+    message: Optional[str] = Field(None, description="پیام خطا")
+    face_shape: Optional[str] = Field(None, description="شکل چهره در این فریم")
+    confidence: Optional[float] = Field(None, description="میزان اطمینان فریم")
+    decode_ms: float = Field(..., description="زمان خواندن و دیکد فریم (میلی‌ثانیه)")
+    analysis_ms: float = Field(..., description="زمان تحلیل فریم (میلی‌ثانیه)")
+
+
+class VideoFaceAnalysisResponse(BaseResponse):
+    """پاسخ تحلیل چهره در فایل ویدیو"""
+    face_shape: Optional[str] = Field(
+        None, description="شکل چهره تجمیعی")
+    confidence: Optional[float] = Field(
+        None, description="میزان اطمینان تجمیعی")
+    agreement: Optional[float] = Field(
+        None, description="نسبت فریم‌های موافق با شکل نهایی")
+    description: Optional[str] = Field(
+        None, description="توضیحات مربوط به شکل چهره")
+    recommendation: Optional[str] = Field(
+        None, description="توصیه‌های مربوط به فریم مناسب")
+    recommended_frame_types: Optional[List[str]] = Field(
+        None, description="انواع فریم‌های پیشنهادی")
+    recommended_frames: Optional[List[RecommendedFrame]] = Field(
+        None, description="فریم‌های پیشنهادی")
+    frames: List[VideoFrameResult] = Field(
+        default_factory=list, description="نتیجه و زمان‌بندی فریم‌های نمونه")
+    stopped_early: bool = Field(
+        False, description="توقف زودهنگام پس از رسیدن به آستانه اطمینان")
+    duration_seconds: Optional[float] = Field(
+        None, description="طول ویدیو (ثانیه)")
+    elapsed_ms: Optional[float] = Field(
+        None, description="زمان کل تحلیل (میلی‌ثانیه)")
+    client_info: Optional[ClientInfo] = Field(
+        None, description="اطلاعات دستگاه و مرورگر کاربر")
+
+
 class FrameRecommendationResponse(BaseResponse):
     """پاسخ پیشنهاد فریم بر اساس شکل صورت"""
     face_shape: str = Field(...,
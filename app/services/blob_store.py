@@ -0,0 +1,132 @@
+# app/services/blob_store.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# پیشوند مرجع‌ها و کلیدهای Redis
+_REF_PREFIX = "sha256:"
+_REDIS_KEY_PREFIX = "blob:"
+
+# کلاینت Redis (در اولین استفاده ساخته می‌شود)
+_redis_client = None
+_redis_lock = threading.Lock()
+
+# زمان آخرین پاکسازی فایل‌های منقضی شده در حالت محلی
+_last_cleanup = 0.0
+_CLEANUP_INTERVAL_SECONDS = 60
+
+
+def _get_redis():
+    global _redis_client
+
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                import redis
+                _redis_client = redis.Redis.from_url(
+                    settings.BLOB_STORE_REDIS_URL or settings.CELERY_BROKER_URL)
+    return _redis_client
+
+
+def _digest_from_ref(ref: str) -> str:
+    if not ref.startswith(_REF_PREFIX):
+        raise ValueError(f"مرجع نامعتبر: {ref}")
+    digest = ref[len(_REF_PREFIX):]
+    if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+        raise ValueError(f"مرجع نامعتبر: {ref}")
+    return digest
+
+
+def _local_path(digest: str) -> str:
+    # تقسیم فایل‌ها در زیرپوشه‌ها برای جلوگیری از دایرکتوری‌های بسیار بزرگ
+    return os.path.join(settings.BLOB_STORE_DIR, digest[:2], digest)
+
+
+def put_blob(data: bytes) -> str:
+    """
+    ذخیره داده باینری با آدرس‌دهی براساس محتوا.
+
+    داده‌های یکسان فقط یک بار ذخیره می‌شوند و هر بار ذخیره، زمان انقضا را
+    تمدید می‌کند.
+
+    Args:
+        data: داده باینری (مثلاً محتوای فایل تصویر)
+
+    Returns:
+        str: مرجع داده به شکل sha256:<hex>
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    ttl = settings.BLOB_STORE_TTL_SECONDS
+
+    if settings.BLOB_STORE_BACKEND == "local":
+        path = _local_path(digest)
+        if os.path.exists(path):
+            os.utime(path, None)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # نوشتن در فایل موقت و جابه‌جایی اتمی تا خواننده فایل ناقص نبیند
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        _maybe_cleanup_local()
+    else:
+        _get_redis().set(_REDIS_KEY_PREFIX + digest, data, ex=ttl)
+
+    return _REF_PREFIX + digest
+
+
+def get_blob(ref: str) -> Optional[bytes]:
+    """
+    خواندن داده باینری با مرجع.
+
+    Args:
+        ref: مرجع برگردانده شده توسط put_blob
+
+    Returns:
+        bytes: داده یا None اگر منقضی یا حذف شده باشد
+    """
+    digest = _digest_from_ref(ref)
+
+    if settings.BLOB_STORE_BACKEND == "local":
+        path = _local_path(digest)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    return _get_redis().get(_REDIS_KEY_PREFIX + digest)
+
+
+def _maybe_cleanup_local():
+    """حذف فایل‌های منقضی شده در حالت محلی (حداکثر یک بار در هر دقیقه)"""
+    global _last_cleanup
+
+    now = time.time()
+    if now - _last_cleanup < _CLEANUP_INTERVAL_SECONDS:
+        return
+    _last_cleanup = now
+
+    ttl = settings.BLOB_STORE_TTL_SECONDS
+    removed = 0
+    for root, _, files in os.walk(settings.BLOB_STORE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if now - os.path.getmtime(path) > ttl:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+
+    if removed:
+        logger.info(f"{removed} فایل منقضی شده از مخزن داده‌ها حذف شد")
@@ -1,15 +1,18 @@
 import os
+import hashlib
+import threading
 import numpy as np
 import logging
 import pickle
 from typing import Dict, List, Tuple, Any, Optional
 import cv2
 import joblib
-from sklearn.preprocessing import StandardScaler
-from sklearn.svm import SVC
+import time
 
 from app.config import settings
 from app.core.face_detection import detect_face_landmarks
+from app.core.model_registry import register_model, get_model, get_model_version, replace_model
+from app.utils.svm_inference import NumpySVMModel, export_model_arrays
 
 # تنظیمات لاگر
 logger = logging.getLogger(__name__)
@@ -18,203 +21,424 @@ logger = logging.getLogger(__name__)
 model = None
 scaler = None
 
+# ترد پایش فایل‌های مدل برای بارگیری مجدد بدون ری‌استارت
+_watcher_thread: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+_reload_lock = threading.Lock()
+
+
+def _get_scaler_path() -> str:
+    return os.path.splitext(settings.FACE_SHAPE_MODEL_PATH)[0] + "_scaler.pkl"
+
+
+def _get_arrays_path() -> str:
+    return os.path.splitext(settings.FACE_SHAPE_MODEL_PATH)[0] + ".npz"
+
+
+def _model_files() -> List[str]:
+    return [settings.FACE_SHAPE_MODEL_PATH, _get_scaler_path(), _get_arrays_path()]
+
+
+def _model_files_signature() -> Tuple:
+    """زمان تغییر و اندازه فایل‌های مدل و اسکیلر"""
+    signature = []
+    for path in _model_files():
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _model_version() -> Optional[str]:
+    """شناسه نسخه مدل براساس محتوای فایل‌های مدل و اسکیلر"""
+    digest = hashlib.sha256()
+    found = False
+    for path in _model_files():
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+            found = True
+        except OSError:
+            continue
+    return digest.hexdigest()[:12] if found else None
+
+
+def _load_face_shape_model() -> Tuple[Any, Any]:
+    """
+    بارگیری مدل و اسکیلر براساس CLASSIFIER_BACKEND.
+
+    در حالت numpy خروجی آرایه‌ای مدل (.npz) بدون واردسازی scikit-learn بارگیری
+    می‌شود و اسکیلر داخل خود مدل است؛ اگر فایل آرایه‌ای وجود نداشته باشد یا از
+    فایل مدل قدیمی‌تر باشد، مدل scikit-learn در حافظه تبدیل می‌شود.
+    """
+    if settings.CLASSIFIER_BACKEND == "numpy":
+        arrays_path = _get_arrays_path()
+        if os.path.exists(arrays_path) and (
+                not os.path.exists(settings.FACE_SHAPE_MODEL_PATH)
+                or os.path.getmtime(arrays_path) >= os.path.getmtime(settings.FACE_SHAPE_MODEL_PATH)):
+            logger.info(f"بارگیری مدل آرایه‌ای از {arrays_path}")
+            return NumpySVMModel.load(arrays_path), None
+
+        logger.warning(
+            f"فایل {arrays_path} یافت نشد یا قدیمی است، مدل scikit-learn در حافظه تبدیل می‌شود")
+        svm_model, svm_scaler = _load_sklearn_model()
+        return NumpySVMModel.from_sklearn(svm_model, svm_scaler), None
+
+    return _load_sklearn_model()
+
+
+def _load_sklearn_model() -> Tuple[Any, Any]:
+    """بارگیری مدل و اسکیلر scikit-learn از فایل"""
+    # بررسی وجود فایل مدل
+    if not os.path.exists(settings.FACE_SHAPE_MODEL_PATH):
+        logger.warning(
+            f"فایل مدل در مسیر {settings.FACE_SHAPE_MODEL_PATH} یافت نشد")
+        raise FileNotFoundError(
+            f"فایل مدل در مسیر {settings.FACE_SHAPE_MODEL_PATH} یافت نشد")
+
+    # بارگیری مدل
+    svm_model = joblib.load(settings.FACE_SHAPE_MODEL_PATH)
+
+    # بارگیری اسکیلر
+    scaler_path = _get_scaler_path()
+    if os.path.exists(scaler_path):
+        svm_scaler = joblib.load(scaler_path)
+        logger.info("اسکیلر با موفقیت بارگیری شد")
+    else:
+        # ساخت اسکیلر پیش‌فرض
+        from sklearn.preprocessing import StandardScaler
+        svm_scaler = StandardScaler()
+        logger.warning(
+            f"فایل اسکیلر در مسیر {scaler_path} یافت نشد، از اسکیلر پیش‌فرض استفاده می‌شود")
+
+    return svm_model, svm_scaler
+
+
+def _warmup_face_shape_model(bundle: Tuple[Any, Any]):
+    """اجرای یک پیش‌بینی آزمایشی برای گرم کردن مدل"""
+    svm_model, svm_scaler = bundle
+    features = np.zeros((1, 6))
+    if hasattr(svm_scaler, "mean_"):
+        features = svm_scaler.transform(features)
+    svm_model.predict_proba(features)
+
+
+# ثبت مدل SVM در رجیستری مدل‌ها
+register_model("face_shape_svm", _load_face_shape_model, _warmup_face_shape_model,
+               files=_model_files(), version=_model_version)
+
 
 def load_model():
     """
-    بارگیری مدل scikit-learn از فایل.
+    بارگیری مدل شکل چهره از رجیستری مدل‌ها.
 
     Returns:
         bool: نتیجه بارگیری مدل
     """
     global model, scaler
 
-    if model is not None and scaler is not None:
-        return True
+    bundle = get_model("face_shape_svm")
+    if bundle is None:
+        return False
 
-    try:
-        # بررسی وجود فایل مدل
-        if not os.path.exists(settings.FACE_SHAPE_MODEL_PATH):
-            logger.warning(
-                f"فایل مدل در مسیر {settings.FACE_SHAPE_MODEL_PATH} یافت نشد")
-            return False
-
-        # بارگیری مدل
-        model = joblib.load(settings.FACE_SHAPE_MODEL_PATH)
-
-        # بارگیری اسکیلر
-        scaler_path = os.path.splitext(settings.FACE_SHAPE_MODEL_PATH)[
-            0] + "_scaler.pkl"
-        if os.path.exists(scaler_path):
-            scaler = joblib.load(scaler_path)
-            logger.info("اسکیلر با موفقیت بارگیری شد")
-        else:
-            # ساخت اسکیلر پیش‌فرض
-            scaler = StandardScaler()
-            logger.warning(
-                f"فایل اسکیلر در مسیر {scaler_path} یافت نشد، از اسکیلر پیش‌فرض استفاده می‌شود")
+    # پس از بارگیری مجدد، متغیرهای سراسری هم نسخه جدید را نشان می‌دهند
+    model, scaler = bundle
+    return True
 
-        logger.info("مدل با موفقیت بارگیری شد")
-        return True
 
-    except Exception as e:
-        logger.error(f"خطا در بارگیری مدل: {str(e)}")
-        model = None
-        scaler = None
-        return False
+def reload_model() -> Optional[str]:
+    """
+    بارگیری نسخه جدید مدل، گرم کردن آن و جایگزینی اتمی در رجیستری.
+
+    تا پایان بارگیری و گرم شدن نسخه جدید، درخواست‌ها با نسخه قبلی پاسخ
+    داده می‌شوند. اگر محتوای فایل‌ها تغییر نکرده باشد کاری انجام نمی‌شود.
+
+    Returns:
+        str: شناسه نسخه فعال مدل
+    """
+    global model, scaler
+
+    with _reload_lock:
+        version = _model_version()
+        current_version = get_model_version("face_shape_svm")
+        if version is None or version == current_version:
+            return current_version
+
+        start_time = time.perf_counter()
+        bundle = _load_face_shape_model()
+        _warmup_face_shape_model(bundle)
+
+        replace_model("face_shape_svm", bundle, version)
+        model, scaler = bundle
 
+        logger.info(
+            f"مدل شکل چهره به نسخه {version} به‌روزرسانی شد (نسخه قبلی: {current_version}، "
+            f"{(time.perf_counter() - start_time) * 1000:.0f} میلی‌ثانیه)")
+        return version
 
-def extract_features_for_classification(image: np.ndarray, face_coordinates: Dict[str, int]) -> np.ndarray:
+
+def _watch_model_files(interval: float):
+    """بررسی دوره‌ای تغییر فایل‌های مدل و بارگیری مجدد آن"""
+    last_signature = _model_files_signature()
+
+    while not _watcher_stop.wait(interval):
+        signature = _model_files_signature()
+        if signature == last_signature:
+            # اگر بارگیری قبلی شکست خورده باشد (مثلاً فایل در حال نوشتن بوده) دوباره تلاش می‌شود
+            if get_model_version("face_shape_svm") is not None:
+                continue
+        else:
+            # صبر تا پایان نوشتن فایل‌ها توسط اسکریپت آموزش
+            if _watcher_stop.wait(1.0):
+                break
+            if _model_files_signature() != signature:
+                continue
+            last_signature = signature
+
+        try:
+            reload_model()
+        except Exception as e:
+            # نسخه قبلی مدل فعال می‌ماند
+            logger.error(f"خطا در بارگیری مجدد مدل شکل چهره: {str(e)}")
+
+
+def start_model_watcher():
+    """راه‌اندازی ترد پایش فایل‌های مدل در این پروسه"""
+    global _watcher_thread
+
+    if not settings.MODEL_RELOAD_ENABLED:
+        return
+    if _watcher_thread is not None and _watcher_thread.is_alive():
+        return
+
+    _watcher_stop.clear()
+    _watcher_thread = threading.Thread(
+        target=_watch_model_files, args=(settings.MODEL_RELOAD_INTERVAL,),
+        name="face-shape-model-watcher", daemon=True)
+    _watcher_thread.start()
+    logger.info("پایش فایل‌های مدل شکل چهره آغاز شد")
+
+
+def stop_model_watcher():
+    """توقف ترد پایش فایل‌های مدل"""
+    global _watcher_thread
+
+    _watcher_stop.set()
+    if _watcher_thread is not None:
+        _watcher_thread.join(timeout=5)
+        _watcher_thread = None
+
+
+def extract_features_for_classification(
+    image: np.ndarray,
+    face_coordinates: Dict[str, int],
+    landmarks: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     استخراج ویژگی‌های چهره برای طبقه‌بندی.
 
     Args:
         image: تصویر OpenCV
         face_coordinates: مختصات چهره
+        landmarks: نقاط کلیدی از پیش محاسبه شده (اختیاری)
 
     Returns:
         numpy.ndarray: بردار ویژگی‌ها
     """
-    # دریافت نقاط کلیدی چهره
-    landmarks = detect_face_landmarks(image, face_coordinates)
+    # دریافت نقاط کلیدی چهره در صورتی که از قبل محاسبه نشده باشند
+    if landmarks is None:
+        landmarks = detect_face_landmarks(image, face_coordinates)
 
     if landmarks is None:
         raise ValueError("نقاط کلیدی چهره قابل تشخیص نیست")
 
-    # تبدیل به آرایه numpy
-    landmarks_np = np.array(landmarks)
+    return extract_features_from_landmarks(landmarks)
+
+
+def extract_features_from_landmarks(landmarks: np.ndarray) -> np.ndarray:
+    """
+    محاسبه بردار ویژگی‌های طبقه‌بندی از نقاط کلیدی چهره.
+
+    Args:
+        landmarks: نقاط کلیدی چهره
+
+    Returns:
+        numpy.ndarray: بردار ویژگی‌ها با ابعاد (1, 6)
+    """
+    features = extract_features_batch(np.asarray(landmarks)[np.newaxis])
+
+    # لاگ کردن ویژگی‌های استخراج شده
+    logger.debug(f"ویژگی‌های استخراج شده: {features[0]}")
+
+    return features
+
+
+def extract_features_batch(landmarks: np.ndarray) -> np.ndarray:
+    """
+    محاسبه برداری ویژگی‌های طبقه‌بندی برای چند چهره به صورت یک‌جا.
+
+    ویژگی‌ها به ترتیب: نسبت عرض به طول، نسبت گونه به فک، نسبت پیشانی به
+    گونه، زاویه فک (درجه)، نسبت شکل صورت و نسبت باریک‌شدگی؛ دقیقاً مطابق با
+    ویژگی‌های آموزش مدل.
+
+    Args:
+        landmarks: آرایه نقاط کلیدی با ابعاد (N, 9, 2)
+
+    Returns:
+        numpy.ndarray: ماتریس ویژگی‌ها با ابعاد (N, 6)
+    """
+    points = np.asarray(landmarks, dtype=np.float64)
+    if points.ndim != 3 or points.shape[1:] != (9, 2):
+        raise ValueError(
+            f"ابعاد نقاط کلیدی باید (N, 9, 2) باشد، نه {points.shape}")
 
-    # محاسبه مقیاس‌های مهم چهره
     # 1. عرض پیشانی (نقاط 0 و 2)
-    forehead_width = np.linalg.norm(landmarks_np[0] - landmarks_np[2])
+    forehead_width = np.linalg.norm(points[:, 0] - points[:, 2], axis=1)
 
     # 2. عرض گونه‌ها (نقاط 6 و 8)
-    cheekbone_width = np.linalg.norm(landmarks_np[6] - landmarks_np[8])
+    cheekbone_width = np.linalg.norm(points[:, 6] - points[:, 8], axis=1)
 
     # 3. عرض فک (نقاط 3 و 5)
-    jawline_width = np.linalg.norm(landmarks_np[3] - landmarks_np[5])
+    jawline_width = np.linalg.norm(points[:, 3] - points[:, 5], axis=1)
 
-    # 4. طول صورت (میانگین نقاط 0، 1، 2 تا نقطه 4)
-    face_top = np.mean(landmarks_np[0:3], axis=0)
-    face_bottom = landmarks_np[4]  # چانه
-    face_length = np.linalg.norm(face_top - face_bottom)
+    # 4. طول صورت (میانگین نقاط 0، 1، 2 تا چانه)
+    face_top = points[:, 0:3].mean(axis=1)
+    face_length = np.linalg.norm(face_top - points[:, 4], axis=1)
 
     # 5. زاویه فک (بین وکتورهای 3-4 و 4-5)
-    chin_to_left_jaw = landmarks_np[3] - landmarks_np[4]
-    chin_to_right_jaw = landmarks_np[5] - landmarks_np[4]
-
-    # محاسبه کسینوس زاویه بین دو بردار
-    if np.linalg.norm(chin_to_left_jaw) > 0 and np.linalg.norm(chin_to_right_jaw) > 0:
-        cos_angle = np.dot(chin_to_left_jaw, chin_to_right_jaw) / (
-            np.linalg.norm(chin_to_left_jaw) *
-            np.linalg.norm(chin_to_right_jaw)
-        )
-        # اطمینان از محدوده مجاز کسینوس
-        cos_angle = np.clip(cos_angle, -1.0, 1.0)
-        jaw_angle = np.arccos(cos_angle) * 180 / np.pi  # تبدیل به درجه
-    else:
-        jaw_angle = 150.0  # مقدار پیش‌فرض
-
-    # محاسبه نسبت‌های کلیدی
-    width_to_length_ratio = cheekbone_width / face_length if face_length > 0 else 0
-    cheekbone_to_jaw_ratio = cheekbone_width / \
-        jawline_width if jawline_width > 0 else 0
-    forehead_to_cheekbone_ratio = forehead_width / \
-        cheekbone_width if cheekbone_width > 0 else 0
-
-    # ویژگی‌های اضافی مطابق با آموزش مدل
-    face_shape_ratio = width_to_length_ratio
-    face_taper_ratio = jawline_width / forehead_width if forehead_width > 0 else 0
-
-    # لاگ کردن ویژگی‌های استخراج شده
-    logger.debug(f"ویژگی‌های استخراج شده:")
-    logger.debug(f"1. نسبت عرض به طول: {width_to_length_ratio:.3f}")
-    logger.debug(f"2. نسبت گونه به فک: {cheekbone_to_jaw_ratio:.3f}")
-    logger.debug(f"3. نسبت پیشانی به گونه: {forehead_to_cheekbone_ratio:.3f}")
-    logger.debug(f"4. زاویه فک: {jaw_angle:.3f}")
-    logger.debug(f"5. نسبت شکل صورت: {face_shape_ratio:.3f}")
-    logger.debug(f"6. نسبت باریک‌شدگی: {face_taper_ratio:.3f}")
-
-    # ساخت بردار ویژگی‌ها برای طبقه‌بندی - دقیقاً مطابق با ویژگی‌های آموزش مدل
-    features = np.array([
+    chin_to_left_jaw = points[:, 3] - points[:, 4]
+    chin_to_right_jaw = points[:, 5] - points[:, 4]
+    norms = np.linalg.norm(chin_to_left_jaw, axis=1) * \
+        np.linalg.norm(chin_to_right_jaw, axis=1)
+    dot = np.einsum("ij,ij->i", chin_to_left_jaw, chin_to_right_jaw)
+
+    # تقسیم بر صفر در ردیف‌های نامعتبر با مقادیر پیش‌فرض جایگزین می‌شود
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cos_angle = np.clip(dot / norms, -1.0, 1.0)
+        jaw_angle = np.where(norms > 0, np.arccos(cos_angle) * 180 / np.pi, 150.0)
+
+        width_to_length_ratio = np.where(
+            face_length > 0, cheekbone_width / face_length, 0.0)
+        cheekbone_to_jaw_ratio = np.where(
+            jawline_width > 0, cheekbone_width / jawline_width, 0.0)
+        forehead_to_cheekbone_ratio = np.where(
+            cheekbone_width > 0, forehead_width / cheekbone_width, 0.0)
+        face_taper_ratio = np.where(
+            forehead_width > 0, jawline_width / forehead_width, 0.0)
+
+    return np.column_stack([
         width_to_length_ratio,
         cheekbone_to_jaw_ratio,
         forehead_to_cheekbone_ratio,
         jaw_angle,
-        face_shape_ratio,
+        width_to_length_ratio,  # نسبت شکل صورت
         face_taper_ratio
-    ]).reshape(1, -1)
-
-    return features
+    ])
 
 
-def predict_face_shape(image: np.ndarray, face_coordinates: Dict[str, int]) -> Tuple[str, float, Dict[str, float]]:
+def predict_face_shape(
+    image: np.ndarray,
+    face_coordinates: Dict[str, int],
+    features: Optional[np.ndarray] = None
+) -> Tuple[str, float, Dict[str, float]]:
     """
     پیش‌بینی شکل چهره با استفاده از مدل scikit-learn.
 
     Args:
         image: تصویر OpenCV
         face_coordinates: مختصات چهره
+        features: بردار ویژگی‌های از پیش محاسبه شده (اختیاری)
 
     Returns:
         tuple: (شکل_چهره، اطمینان، جزئیات_شکل)
     """
-    # بارگیری مدل اگر هنوز بارگیری نشده است
-    if not load_model():
+    # استخراج ویژگی‌ها در صورتی که از قبل محاسبه نشده باشند
+    if features is None:
+        features = extract_features_for_classification(
+            image, face_coordinates)
+
+    face_shape, confidence, shape_details = predict_face_shape_batch(features)[0]
+
+    logger.info(
+        f"شکل چهره تشخیص داده شده: {face_shape} با میزان اطمینان {confidence:.2f}%")
+
+    return face_shape, confidence, shape_details
+
+
+def predict_face_shape_batch(data: np.ndarray) -> List[Tuple[str, float, Dict[str, float]]]:
+    """
+    پیش‌بینی شکل چند چهره با یک بار مقیاس‌دهی و یک بار فراخوانی predict_proba.
+
+    Args:
+        data: ماتریس ویژگی‌ها با ابعاد (N, 6) یا نقاط کلیدی با ابعاد (N, 9, 2)
+
+    Returns:
+        list: برای هر چهره (شکل_چهره، اطمینان، جزئیات_شکل) به همان ترتیب ورودی
+    """
+    # مدل و اسکیلر یک‌جا از رجیستری خوانده می‌شوند تا بارگیری مجدد هم‌زمان آن‌ها را ناهماهنگ نکند
+    bundle = get_model("face_shape_svm")
+    if bundle is None:
         raise ValueError("بارگیری مدل ناموفق بود")
+    svm_model, svm_scaler = bundle
 
-    # استخراج ویژگی‌ها
-    features = extract_features_for_classification(image, face_coordinates)
+    data = np.asarray(data, dtype=np.float64)
+    features = extract_features_batch(data) if data.ndim == 3 else data.reshape(-1, 6)
+    if len(features) == 0:
+        return []
 
     # مقیاس‌دهی ویژگی‌ها
-    if scaler is not None:
-        scaled_features = scaler.transform(features)
+    if svm_scaler is not None:
+        scaled_features = svm_scaler.transform(features)
     else:
         scaled_features = features
 
     # پیش‌بینی شکل چهره
-    face_shape_proba = model.predict_proba(scaled_features)[0]
-    face_shape_idx = np.argmax(face_shape_proba)
-    face_shape = model.classes_[face_shape_idx]
-    confidence = face_shape_proba[face_shape_idx] * 100
+    probabilities = svm_model.predict_proba(scaled_features)
+    classes = svm_model.classes_
 
     # محدود کردن به ۵ شکل چهره مورد نظر
     valid_shapes = {"HEART", "OBLONG", "OVAL", "ROUND", "SQUARE"}
+    valid_indices = [i for i, shape in enumerate(classes) if shape in valid_shapes]
 
-    # اگر شکل تشخیص داده شده در لیست معتبر نباشد، نزدیک‌ترین شکل را انتخاب کنیم
-    if face_shape not in valid_shapes:
-        logger.warning(
-            f"شکل چهره {face_shape} در لیست شکل‌های معتبر نیست. استفاده از شکل جایگزین.")
-
-        # پیدا کردن نزدیک‌ترین شکل معتبر
-        valid_shape_indices = [i for i, shape in enumerate(
-            model.classes_) if shape in valid_shapes]
-        if valid_shape_indices:
-            valid_probs = [face_shape_proba[i] for i in valid_shape_indices]
-            max_idx = valid_shape_indices[np.argmax(valid_probs)]
-            face_shape = model.classes_[max_idx]
-            confidence = face_shape_proba[max_idx] * 100
-        else:
-            # اگر هیچ شکل معتبری نباشد (که بعید است)، از پیش‌فرض OVAL استفاده می‌کنیم
-            face_shape = "OVAL"
-            confidence = 70.0
+    best_indices = np.argmax(probabilities, axis=1)
+    if valid_indices:
+        best_valid_indices = np.array(valid_indices)[
+            np.argmax(probabilities[:, valid_indices], axis=1)]
 
-    # ساخت دیکشنری امتیازات برای هر شکل چهره معتبر
-    shape_details = {}
-    for idx, shape in enumerate(model.classes_):
-        if shape in valid_shapes:
-            shape_details[shape] = float(face_shape_proba[idx] * 100)
+    results = []
+    for row, best_idx in enumerate(best_indices):
+        face_shape = classes[best_idx]
+        confidence = probabilities[row, best_idx] * 100
 
-    logger.info(
-        f"شکل چهره تشخیص داده شده: {face_shape} با میزان اطمینان {confidence:.2f}%")
+        # اگر شکل تشخیص داده شده در لیست معتبر نباشد، نزدیک‌ترین شکل را انتخاب کنیم
+        if face_shape not in valid_shapes:
+            logger.warning(
+                f"شکل چهره {face_shape} در لیست شکل‌های معتبر نیست. استفاده از شکل جایگزین.")
 
-    return face_shape, confidence, shape_details
+            if valid_indices:
+                face_shape = classes[best_valid_indices[row]]
+                confidence = probabilities[row, best_valid_indices[row]] * 100
+            else:
+                # اگر هیچ شکل معتبری نباشد (که بعید است)، از پیش‌فرض OVAL استفاده می‌کنیم
+                face_shape = "OVAL"
+                confidence = 70.0
+
+        # ساخت دیکشنری امتیازات برای هر شکل چهره معتبر
+        shape_details = {
+            classes[idx]: float(probabilities[row, idx] * 100) for idx in valid_indices}
+
+        results.append((face_shape, confidence, shape_details))
+
+    return results
 
 
 def train_model(
     X: np.ndarray,
     y: np.ndarray,
     save_path: Optional[str] = None
-) -> Tuple[SVC, StandardScaler]:
+) -> Tuple[Any, Any]:
     """
     آموزش مدل طبقه‌بندی برای تشخیص شکل چهره.
 
@@ -226,6 +450,9 @@ def train_model(
     Returns:
         tuple: (مدل_آموزش_دیده، اسکیلر)
     """
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
     # مقیاس‌دهی داده‌ها
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
@@ -240,13 +467,24 @@ def train_model(
         # ایجاد دایرکتوری در صورت عدم وجود
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
-        # ذخیره مدل
-        joblib.dump(svm_model, save_path)
-
-        # ذخیره اسکیلر
+        # ذخیره اسکیلر و سپس مدل؛ هر فایل به صورت اتمی جایگزین می‌شود تا
+        # پروسه‌هایی که فایل‌ها را پایش می‌کنند فایل نیمه‌کاره نخوانند
         scaler_path = os.path.splitext(save_path)[0] + "_scaler.pkl"
-        joblib.dump(scaler, scaler_path)
+        _dump_atomic(scaler, scaler_path)
+        _dump_atomic(svm_model, save_path)
+
+        # خروجی آرایه‌ای برای ارزیاب NumPy
+        export_model_arrays(
+            svm_model, scaler, os.path.splitext(save_path)[0] + ".npz")
 
         logger.info(f"مدل و اسکیلر با موفقیت در مسیر {save_path} ذخیره شدند")
 
     return svm_model, scaler
+
+
+def _dump_atomic(obj: Any, path: str):
+    """ذخیره شیء با joblib در فایل موقت و جابه‌جایی اتمی آن"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
@@ -0,0 +1,296 @@
+# app/services/result_cache.py
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# پیشوند کلیدهای Redis
+_REDIS_KEY_PREFIX = "analysis:"
+
+# کلاینت Redis (در اولین استفاده ساخته می‌شود)
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+class _LRUCache:
+    """کش LRU با زمان انقضا برای هر ورودی"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self._max_size = max(1, max_size)
+        self._ttl = ttl
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._items[key] = (time.time() + self._ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def find_nearest_hash(self, prefix: str, value: int, max_distance: int) -> Optional[Any]:
+        """جستجوی نزدیک‌ترین ورودی dHash همان کلاینت (prefix) با فاصله همینگ حداکثر max_distance"""
+        best_key, best_distance = None, max_distance + 1
+        now = time.time()
+        with self._lock:
+            for key, (expires_at, _) in self._items.items():
+                if not key.startswith(prefix) or expires_at < now:
+                    continue
+                distance = bin(int(key[len(prefix):], 16) ^ value).count("1")
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+        return self.get(best_key) if best_key is not None else None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# کش درون پروسه
+_local_cache = _LRUCache(settings.RESULT_CACHE_SIZE,
+                         settings.RESULT_CACHE_TTL_SECONDS)
+
+# آمار استفاده از کش
+_stats = {
+    "lookups": 0,
+    "local_hits": 0,
+    "redis_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "errors": 0
+}
+_stats_lock = threading.Lock()
+
+
+def _increment(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _get_redis():
+    global _redis_client
+
+    if not settings.RESULT_CACHE_REDIS_URL:
+        return None
+
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                import redis
+                _redis_client = redis.Redis.from_url(
+                    settings.RESULT_CACHE_REDIS_URL)
+    return _redis_client
+
+
+def image_content_key(image: np.ndarray) -> str:
+    """
+    کلید کش براساس SHA-256 پیکسل‌های دیکد شده تصویر.
+
+    Args:
+        image: تصویر OpenCV
+
+    Returns:
+        str: کلید کش
+    """
+    digest = hashlib.sha256()
+    digest.update(str(image.shape).encode("utf-8"))
+    digest.update(np.ascontiguousarray(image).data)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def client_cache_scope(client_info: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    شناسه محدوده کش هش ادراکی برای یک کلاینت.
+
+    از آدرس IP و مشخصات دستگاه و مرورگر ساخته می‌شود و به صورت هش در کلید
+    قرار می‌گیرد تا آدرس IP در Redis ذخیره نشود.
+
+    Args:
+        client_info: اطلاعات کاربر (خروجی extract_client_info)
+
+    Returns:
+        str: شناسه محدوده یا None اگر آدرس IP کاربر مشخص نباشد
+    """
+    if not client_info or not client_info.get("ip_address"):
+        return None
+
+    parts = [str(client_info.get(field) or "") for field in
+             ("ip_address", "device_type", "os_name", "browser_name", "browser_version")]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def face_phash_key(face_image: Optional[np.ndarray], scope: Optional[str]) -> Optional[str]:
+    """
+    کلید کش براساس هش ادراکی (dHash) تصویر کوچک شده چهره.
+
+    نسخه‌های دوباره فشرده شده یا تغییر اندازه یافته یک تصویر هش یکسان یا
+    با فاصله همینگ کم دارند؛ کش درون پروسه نزدیک‌ترین هش را هم می‌پذیرد.
+    چهره‌های برش خورده و هم‌تراز افراد مختلف هم ممکن است dHash نزدیک داشته
+    باشند، به همین دلیل کلید فقط بین درخواست‌های یک کلاینت (scope) مشترک است.
+
+    Args:
+        face_image: تصویر برش خورده چهره
+        scope: شناسه محدوده کلاینت (خروجی client_cache_scope)
+
+    Returns:
+        str: کلید کش یا None اگر تصویر یا کلاینت نامعتبر باشد
+    """
+    if not settings.RESULT_CACHE_PHASH or not scope or face_image is None or face_image.size == 0:
+        return None
+
+    gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY) \
+        if face_image.ndim == 3 else face_image
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = int("".join("1" if bit else "0" for bit in bits), 2)
+    return f"dhash:{scope}:{value:016x}"
+
+
+def get_cached_result(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    جستجوی نتیجه در کش درون پروسه و سپس Redis.
+
+    Args:
+        key: کلید کش
+
+    Returns:
+        dict: نتیجه ذخیره شده یا None
+    """
+    if not settings.RESULT_CACHE_ENABLED or not key:
+        return None
+
+    _increment("lookups")
+
+    value = _local_cache.get(key)
+    if value is None and key.startswith("dhash:") and settings.RESULT_CACHE_PHASH_MAX_DISTANCE > 0:
+        # فشرده‌سازی دوباره چند بیت از هش را تغییر می‌دهد
+        prefix, _, hash_hex = key.rpartition(":")
+        value = _local_cache.find_nearest_hash(
+            prefix + ":", int(hash_hex, 16), settings.RESULT_CACHE_PHASH_MAX_DISTANCE)
+    if value is not None:
+        _increment("local_hits")
+        return value
+
+    try:
+        client = _get_redis()
+        if client is not None:
+            raw = client.get(_REDIS_KEY_PREFIX + key)
+            if raw is not None:
+                value = json.loads(raw)
+                _local_cache.set(key, value)
+                _increment("redis_hits")
+                return value
+    except Exception as e:
+        _increment("errors")
+        logger.warning(f"خطا در خواندن کش نتایج از Redis: {str(e)}")
+
+    _increment("misses")
+    return None
+
+
+def store_cached_result(key: Optional[str], value: Dict[str, Any]):
+    """
+    ذخیره نتیجه در کش درون پروسه و Redis.
+
+    Args:
+        key: کلید کش
+        value: نتیجه قابل تبدیل به JSON
+    """
+    if not settings.RESULT_CACHE_ENABLED or not key:
+        return
+
+    _local_cache.set(key, value)
+    _increment("stores")
+
+    try:
+        client = _get_redis()
+        if client is not None:
+            client.set(_REDIS_KEY_PREFIX + key, json.dumps(value),
+                       ex=settings.RESULT_CACHE_TTL_SECONDS)
+    except Exception as e:
+        _increment("errors")
+        logger.warning(f"خطا در ذخیره کش نتایج در Redis: {str(e)}")
+
+
+def get_cached_pipeline_result(key: Optional[str]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    جستجوی نتیجه تشخیص و تحلیل یک تصویر با کلید محتوا.
+
+    استخر پردازش تصویر و وظیفه Celery کلید sha256 مشترک (و لایه Redis مشترک)
+    دارند، پس هر دو از همین تابع و store_pipeline_result استفاده می‌کنند.
+
+    Args:
+        key: کلید محتوای تصویر (خروجی image_content_key)
+
+    Returns:
+        tuple: (مختصات چهره در ابعاد تصویر اصلی، نتیجه تحلیل) یا None
+    """
+    cached = get_cached_result(key)
+    if not isinstance(cached, dict):
+        return None
+
+    analysis = cached.get("analysis")
+    if not isinstance(analysis, dict) or not analysis.get("success", False) \
+            or "face_coordinates" not in cached:
+        return None
+
+    return cached["face_coordinates"], analysis
+
+
+def store_pipeline_result(key: Optional[str], face_coordinates: Optional[Dict[str, Any]],
+                          analysis: Dict[str, Any]):
+    """
+    ذخیره نتیجه موفق تشخیص و تحلیل یک تصویر با کلید محتوا.
+
+    Args:
+        key: کلید محتوای تصویر
+        face_coordinates: مختصات چهره در ابعاد تصویر اصلی
+        analysis: نتیجه تحلیل شکل چهره
+    """
+    if not analysis.get("success", False):
+        return
+
+    store_cached_result(key, {
+        "face_coordinates": face_coordinates,
+        "analysis": analysis
+    })
+
+
+def get_result_cache_stats() -> Dict[str, Any]:
+    """
+    دریافت آمار کش نتایج در این پروسه.
+
+    Returns:
+        dict: تعداد جستجو، برخورد و عدم برخورد و نرخ برخورد
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    hits = stats["local_hits"] + stats["redis_hits"]
+    stats["hit_rate"] = round(
+        hits / stats["lookups"], 4) if stats["lookups"] else 0.0
+    stats["local_size"] = len(_local_cache)
+    stats["redis_enabled"] = bool(settings.RESULT_CACHE_REDIS_URL)
+    return stats
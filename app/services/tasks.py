@@ -1,31 +1,97 @@
 # app/services/tasks.py
+import asyncio
 import logging
 import time
 import numpy as np
 from typing import Dict, Any, List, Optional, Tuple
-from celery import shared_task
+from celery import shared_task, states
 
 from app.celery_app import app
 from app.config import settings
 from app.db.repository import save_analysis_result, save_recommendation
-from app.utils.image_processing import base64_to_opencv
+from app.utils.image_processing import base64_to_opencv, decode_image_bytes
+from app.services.blob_store import get_blob
 from app.core.face_detection import detect_face
+from app.worker_runtime import run_async, ensure_database
+from app.services.result_cache import (
+    image_content_key, client_cache_scope, face_phash_key, get_cached_result, store_cached_result,
+    get_cached_pipeline_result, store_pipeline_result)
 
 
 # تنظیمات لاگر
 logger = logging.getLogger(__name__)
 
+# کلیدهای نتیجه نهایی پردازش (یکسان در حالت یکپارچه و زنجیره‌ای)
+_FINAL_RESULT_DEFAULTS: Dict[str, Any] = {
+    "face_coordinates": None,
+    "face_shape": None,
+    "confidence": None,
+    "description": None,
+    "recommendation": None,
+    "recommended_frame_types": [],
+    "recommended_frames": [],
+    "user_id": None,
+    "analysis_id": None,
+    "recommendation_id": None,
+    "timings": {},
+    "cache": None
+}
+
+
+def _store_final_result(final_task_id: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    تکمیل نتیجه نهایی با کلیدهای استاندارد و ثبت آن با شناسه وظیفه پایانی زنجیره.
+
+    در حالت زنجیره‌ای، API شناسه وظیفه پایانی را به کاربر برمی‌گرداند؛ اگر
+    زنجیره پیش از رسیدن به آن متوقف شود، نتیجه باید با همان شناسه ثبت شود.
+    بدون final_task_id فقط شکل نتیجه یکسان می‌شود.
+    """
+    for key, default in _FINAL_RESULT_DEFAULTS.items():
+        if key not in result:
+            result[key] = default.copy() if isinstance(default, (dict, list)) else default
+
+    if final_task_id:
+        try:
+            app.backend.store_result(final_task_id, result, states.SUCCESS)
+        except Exception as e:
+            logger.error(
+                f"خطا در ثبت نتیجه نهایی برای وظیفه {final_task_id}: {str(e)}")
+    return result
+
+
+def _load_task_image(image_ref: Optional[str], image_data: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    خواندن تصویر وظیفه از مخزن داده‌ها.
+
+    image_data (base64) فقط برای پیام‌هایی پشتیبانی می‌شود که پیش از
+    استفاده از مخزن داده‌ها در صف قرار گرفته‌اند.
+    """
+    if image_ref:
+        content = get_blob(image_ref)
+        if content is None:
+            logger.error(f"تصویر {image_ref} در مخزن داده‌ها یافت نشد (منقضی شده است؟)")
+            return None
+        image, _ = decode_image_bytes(content, max_dim=0)
+        return image
+
+    if image_data:
+        return base64_to_opencv(image_data)
+
+    return None
+
 
 @shared_task(name="app.services.tasks.detect_face")
-def detect_face_task(image_data: str, user_id: str, request_id: str, client_info: Dict[str, Any]) -> Dict[str, Any]:
+def detect_face_task(image_ref: Optional[str] = None, user_id: str = None, request_id: str = None, client_info: Dict[str, Any] = None, image_data: Optional[str] = None, final_task_id: Optional[str] = None) -> Dict[str, Any]:
     """
     وظیفه تشخیص چهره در تصویر.
 
     Args:
-        image_data: تصویر به صورت base64
+        image_ref: مرجع تصویر در مخزن داده‌ها
         user_id: شناسه کاربر
         request_id: شناسه درخواست
         client_info: اطلاعات کاربر
+        image_data: تصویر به صورت base64 (فقط برای پیام‌های قدیمی)
+        final_task_id: شناسه از پیش تعیین شده وظیفه پایانی زنجیره (اختیاری)
 
     Returns:
         dict: نتیجه تشخیص چهره
@@ -33,16 +99,16 @@ def detect_face_task(image_data: str, user_id: str, request_id: str, client_info
     try:
         logger.info(f"شروع تشخیص چهره برای درخواست {request_id}")
 
-        # تبدیل تصویر به فرمت OpenCV
-        image = base64_to_opencv(image_data)
+        # خواندن تصویر از مخزن داده‌ها
+        image = _load_task_image(image_ref, image_data)
 
         if image is None:
             logger.error(f"خطا در تبدیل تصویر برای درخواست {request_id}")
-            return {
+            return _store_final_result(final_task_id, {
                 "success": False,
                 "message": "تصویر نامعتبر است",
                 "request_id": request_id
-            }
+            })
 
         # تشخیص چهره
         detection_result = detect_face(image)
@@ -50,11 +116,11 @@ def detect_face_task(image_data: str, user_id: str, request_id: str, client_info
         if not detection_result.get("success", False):
             logger.warning(
                 f"تشخیص چهره ناموفق بود برای درخواست {request_id}: {detection_result.get('message')}")
-            return {
+            return _store_final_result(final_task_id, {
                 "success": False,
                 "message": detection_result.get("message", "خطا در تشخیص چهره"),
                 "request_id": request_id
-            }
+            })
 
         # نتیجه موفقیت‌آمیز
         result = {
@@ -67,35 +133,39 @@ def detect_face_task(image_data: str, user_id: str, request_id: str, client_info
 
         # ارسال وظیفه بعدی برای تحلیل چهره
         analyze_face_shape_task.delay(
+            image_ref=image_ref,
             image_data=image_data,
             face_coordinates=detection_result.get("face"),
             user_id=user_id,
             request_id=request_id,
-            client_info=client_info
+            client_info=client_info,
+            final_task_id=final_task_id
         )
 
         return result
 
     except Exception as e:
         logger.error(f"خطا در تشخیص چهره: {str(e)}")
-        return {
+        return _store_final_result(final_task_id, {
             "success": False,
             "message": f"خطا در تشخیص چهره: {str(e)}",
             "request_id": request_id
-        }
+        })
 
 
 @shared_task(name="app.services.tasks.analyze_face_shape")
-async def analyze_face_shape_task(image_data: str, face_coordinates: Dict[str, int], user_id: str, request_id: str, client_info: Dict[str, Any]) -> Dict[str, Any]:
+def analyze_face_shape_task(image_ref: Optional[str] = None, face_coordinates: Dict[str, int] = None, user_id: str = None, request_id: str = None, client_info: Dict[str, Any] = None, image_data: Optional[str] = None, final_task_id: Optional[str] = None) -> Dict[str, Any]:
     """
     وظیفه تحلیل شکل چهره.
 
     Args:
-        image_data: تصویر به صورت base64
+        image_ref: مرجع تصویر در مخزن داده‌ها
         face_coordinates: مختصات چهره در تصویر
         user_id: شناسه کاربر
         request_id: شناسه درخواست
         client_info: اطلاعات کاربر
+        image_data: تصویر به صورت base64 (فقط برای پیام‌های قدیمی)
+        final_task_id: شناسه از پیش تعیین شده وظیفه پایانی زنجیره (اختیاری)
 
     Returns:
         dict: نتیجه تحلیل شکل چهره
@@ -104,54 +174,67 @@ async def analyze_face_shape_task(image_data: str, face_coordinates: Dict[str, i
         logger.info(f"شروع تحلیل شکل چهره برای درخواست {request_id}")
 
         # واردسازی تأخیری برای جلوگیری از واردسازی دایره‌ای
-        from app.core.face_analysis import analyze_face_shape, get_recommended_frame_types
+        from app.core.face_analysis import analyze_face_shape, build_analysis_context, get_recommended_frame_types
         from app.services.classifier import predict_face_shape
 
-        # تبدیل تصویر به فرمت OpenCV
-        image = base64_to_opencv(image_data)
+        # خواندن تصویر از مخزن داده‌ها
+        image = _load_task_image(image_ref, image_data)
 
         if image is None:
             logger.error(f"خطا در تبدیل تصویر برای درخواست {request_id}")
-            return {
+            return _store_final_result(final_task_id, {
                 "success": False,
                 "message": "تصویر نامعتبر است",
                 "request_id": request_id
-            }
+            })
+
+        # محاسبه یک‌باره نقاط کلیدی برای هر دو روش
+        context = build_analysis_context(image, face_coordinates)
+        if context["landmarks"] is None:
+            logger.warning(
+                f"نقاط کلیدی چهره برای درخواست {request_id} قابل تشخیص نیست")
+            return _store_final_result(final_task_id, {
+                "success": False,
+                "message": "امکان تشخیص نقاط کلیدی چهره وجود ندارد",
+                "request_id": request_id
+            })
 
         # تحلیل شکل چهره با استفاده از مدل scikit-learn اگر موجود باشد
         try:
             face_shape, confidence, shape_details = predict_face_shape(
-                image, face_coordinates)
+                image, face_coordinates, features=context["features"])
             logger.info(
                 f"شکل چهره با استفاده از مدل ML تشخیص داده شد: {face_shape}")
         except Exception as model_error:
             logger.warning(
                 f"خطا در استفاده از مدل ML: {str(model_error)}. استفاده از روش قوانین...")
             # استفاده از تحلیل مبتنی بر قوانین به عنوان پشتیبان
-            analysis_result = analyze_face_shape(image, face_coordinates)
+            analysis_result = analyze_face_shape(
+                image, face_coordinates, landmarks=context["landmarks"])
 
             if not analysis_result.get("success", False):
                 logger.warning(
                     f"تحلیل شکل چهره ناموفق بود برای درخواست {request_id}: {analysis_result.get('message')}")
-                return {
+                return _store_final_result(final_task_id, {
                     "success": False,
                     "message": analysis_result.get("message", "خطا در تحلیل شکل چهره"),
                     "request_id": request_id
-                }
+                })
 
             face_shape = analysis_result.get("face_shape")
             confidence = analysis_result.get("confidence")
             shape_details = analysis_result.get("shape_metrics", {})
 
-        # ذخیره نتیجه تحلیل در دیتابیس
-        analysis_id = await save_analysis_result(
+        # ذخیره نتیجه تحلیل در دیتابیس (روی event loop ثابت ورکر)
+        ensure_database()
+        analysis_id = run_async(save_analysis_result(
             user_id=user_id,
             request_id=request_id,
             face_shape=face_shape,
             confidence=confidence,
             client_info=client_info,
             task_id=str(analyze_face_shape_task.request.id)
-        )
+        ))
 
         # دریافت انواع فریم پیشنهادی
         recommended_frame_types = get_recommended_frame_types(face_shape)
@@ -170,29 +253,35 @@ async def analyze_face_shape_task(image_data: str, face_coordinates: Dict[str, i
         }
 
         # ارسال وظیفه بعدی برای پیشنهاد فریم
-        match_frames_task.delay(
-            face_shape=face_shape,
-            user_id=user_id,
-            request_id=request_id,
-            client_info=client_info,
-            analysis_id=analysis_id
-        )
+        # در حالت زنجیره‌ای نتیجه نهایی با شناسه از پیش تعیین شده ثبت می‌شود
+        match_frames_task.apply_async(kwargs={
+            "face_shape": face_shape,
+            "face_coordinates": face_coordinates,
+            "user_id": user_id,
+            "request_id": request_id,
+            "client_info": client_info,
+            "analysis_id": analysis_id,
+            "confidence": confidence
+        }, task_id=final_task_id)
 
         return result
 
     except Exception as e:
         logger.error(f"خطا در تحلیل شکل چهره: {str(e)}")
-        return {
+        return _store_final_result(final_task_id, {
             "success": False,
             "message": f"خطا در تحلیل شکل چهره: {str(e)}",
             "request_id": request_id
-        }
+        })
 
 
 @shared_task(name="app.services.tasks.match_frames")
-async def match_frames_task(face_shape: str, user_id: str, request_id: str, client_info: Dict[str, Any], analysis_id: Optional[str] = None) -> Dict[str, Any]:
+def match_frames_task(face_shape: str, user_id: str, request_id: str, client_info: Dict[str, Any], analysis_id: Optional[str] = None, confidence: Optional[float] = None, face_coordinates: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
     """
-    وظیفه پیشنهاد فریم عینک مناسب.
+    وظیفه پیشنهاد فریم عینک مناسب (مرحله پایانی حالت زنجیره‌ای).
+
+    نتیجه همان کلیدهای analyze_pipeline_task را دارد تا پاسخ بررسی وضعیت
+    به حالت پردازش وابسته نباشد.
 
     Args:
         face_shape: شکل چهره
@@ -200,9 +289,11 @@ async def match_frames_task(face_shape: str, user_id: str, request_id: str, clie
         request_id: شناسه درخواست
         client_info: اطلاعات کاربر
         analysis_id: شناسه تحلیل (اختیاری)
+        confidence: میزان اطمینان تشخیص شکل چهره (اختیاری)
+        face_coordinates: مختصات چهره در تصویر (اختیاری)
 
     Returns:
-        dict: نتیجه پیشنهاد فریم
+        dict: نتیجه نهایی شامل شکل چهره و فریم‌های پیشنهادی
     """
     try:
         logger.info(
@@ -210,54 +301,306 @@ async def match_frames_task(face_shape: str, user_id: str, request_id: str, clie
 
         # واردسازی تأخیری برای جلوگیری از واردسازی دایره‌ای
         from app.core.face_analysis import get_recommended_frame_types
+        from app.core.face_shape_data import load_face_shape_data
         from app.services import get_recommended_frames
 
-        # دریافت انواع فریم پیشنهادی
+        # دریافت انواع فریم پیشنهادی و توضیحات شکل چهره
         recommended_frame_types = get_recommended_frame_types(face_shape)
+        face_shape_info = load_face_shape_data().get(
+            "face_shapes", {}).get(face_shape, {})
+
+        result = {
+            "success": True,
+            "message": "پردازش تصویر با موفقیت انجام شد",
+            "face_coordinates": face_coordinates,
+            "face_shape": face_shape,
+            "confidence": confidence,
+            "description": face_shape_info.get("description", ""),
+            "recommendation": face_shape_info.get("recommendation", ""),
+            "recommended_frame_types": recommended_frame_types,
+            "recommended_frames": [],
+            "request_id": request_id,
+            "user_id": user_id,
+            "analysis_id": analysis_id
+        }
 
         # دریافت فریم‌های پیشنهادی از WooCommerce
-        frames_result = await get_recommended_frames(face_shape)
+        frames_result = run_async(get_recommended_frames(face_shape))
 
         if not frames_result.get("success", False):
+            # مانند حالت یکپارچه، نتیجه تحلیل بدون فریم پیشنهادی برگردانده می‌شود
             logger.warning(
                 f"دریافت فریم‌های پیشنهادی ناموفق بود برای درخواست {request_id}: {frames_result.get('message')}")
-            return {
-                "success": False,
-                "message": frames_result.get("message", "خطا در دریافت فریم‌های پیشنهادی"),
-                "request_id": request_id
-            }
+            return _store_final_result(None, result)
 
         recommended_frames = frames_result.get("recommended_frames", [])
+        result["recommended_frames"] = recommended_frames
 
         # ذخیره پیشنهادات در دیتابیس
-        recommendation_id = await save_recommendation(
+        ensure_database()
+        result["recommendation_id"] = run_async(save_recommendation(
             user_id=user_id,
             face_shape=face_shape,
             recommended_frame_types=recommended_frame_types,
             recommended_frames=recommended_frames,
             client_info=client_info,
             analysis_id=analysis_id
+        ))
+
+        return _store_final_result(None, result)
+
+    except Exception as e:
+        logger.error(f"خطا در پیشنهاد فریم: {str(e)}")
+        return _store_final_result(None, {
+            "success": False,
+            "message": f"خطا در پیشنهاد فریم: {str(e)}",
+            "request_id": request_id
+        })
+
+
+async def _persist_and_match(
+    task_id: str,
+    user_id: str,
+    request_id: str,
+    client_info: Dict[str, Any],
+    face_shape: str,
+    confidence: float,
+    include_frames: bool,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    limit: int
+) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """
+    ذخیره نتیجه تحلیل و دریافت فریم‌های پیشنهادی به صورت همزمان.
+
+    خطای دیتابیس نتیجه تحلیل را از بین نمی‌برد و فقط analysis_id خالی می‌ماند.
+
+    Returns:
+        tuple: (شناسه تحلیل، نتیجه پیشنهاد فریم یا None)
+    """
+    from app.core.frame_matching import get_combined_result
+    from app.db.connection import connect_to_mongo
+
+    async def save_analysis() -> Optional[str]:
+        await connect_to_mongo()
+        return await save_analysis_result(
+            user_id=user_id,
+            request_id=request_id,
+            face_shape=face_shape,
+            confidence=confidence,
+            client_info=client_info,
+            task_id=task_id
         )
 
-        # نتیجه موفقیت‌آمیز
+    coroutines = [save_analysis()]
+    if include_frames:
+        coroutines.append(get_combined_result(
+            face_shape=face_shape,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit
+        ))
+
+    results = await asyncio.gather(*coroutines, return_exceptions=True)
+
+    analysis_id = results[0]
+    if isinstance(analysis_id, BaseException):
+        logger.warning(f"خطا در ذخیره نتیجه تحلیل: {str(analysis_id)}")
+        analysis_id = None
+
+    if not include_frames:
+        return analysis_id, None
+
+    frames_result = results[1]
+    if isinstance(frames_result, BaseException):
+        return analysis_id, {
+            "success": False,
+            "message": f"خطا در دریافت فریم‌های پیشنهادی: {str(frames_result)}"
+        }
+
+    if frames_result.get("success", False):
+        try:
+            await save_recommendation(
+                user_id=user_id,
+                face_shape=face_shape,
+                recommended_frame_types=frames_result.get(
+                    "recommended_frame_types", []),
+                recommended_frames=frames_result.get("recommended_frames", []),
+                client_info=client_info,
+                analysis_id=analysis_id
+            )
+        except Exception as db_error:
+            logger.warning(f"خطا در ذخیره پیشنهادات: {str(db_error)}")
+
+    return analysis_id, frames_result
+
+
+@shared_task(bind=True, name="app.services.tasks.analyze_pipeline")
+def analyze_pipeline_task(
+    self,
+    image_ref: str,
+    user_id: str,
+    request_id: str,
+    client_info: Dict[str, Any],
+    include_frames: bool = True,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 15
+) -> Dict[str, Any]:
+    """
+    وظیفه یکپارچه تشخیص چهره، تحلیل شکل چهره و پیشنهاد فریم در یک اجرا.
+
+    پس از هر مرحله وضعیت وظیفه (PROGRESS) با نام مرحله و نتایج جزئی به‌روز
+    می‌شود تا درخواست وضعیت بدون انتظار برای پایان کار پیشرفت را ببیند.
+
+    Args:
+        image_ref: مرجع تصویر در مخزن داده‌ها
+        user_id: شناسه کاربر
+        request_id: شناسه درخواست
+        client_info: اطلاعات کاربر
+        include_frames: پیشنهاد فریم پس از تحلیل
+        min_price: حداقل قیمت
+        max_price: حداکثر قیمت
+        limit: حداکثر تعداد فریم‌های پیشنهادی
+
+    Returns:
+        dict: نتیجه نهایی شامل شکل چهره و فریم‌های پیشنهادی
+    """
+    from app.core.face_detection import get_face_image
+    from app.core.face_analysis import generate_full_analysis
+
+    timings: Dict[str, float] = {}
+    cache_tier: Optional[str] = None
+
+    def checkpoint(stage: str, **partial):
+        self.update_state(state="PROGRESS", meta={
+            "stage": stage,
+            "request_id": request_id,
+            **partial
+        })
+
+    try:
+        logger.info(f"شروع پردازش یکپارچه برای درخواست {request_id}")
+
+        # مرحله 1: تشخیص چهره
+        checkpoint("detecting")
+        stage_start = time.perf_counter()
+
+        image = _load_task_image(image_ref)
+        if image is None:
+            return _store_final_result(None, {
+                "success": False,
+                "message": "تصویر نامعتبر است",
+                "request_id": request_id
+            })
+
+        # جستجوی نتیجه تصویر یکسان در کش
+        content_key = image_content_key(image)
+        cached = get_cached_pipeline_result(content_key)
+
+        if cached is not None:
+            face_coordinates, analysis_result = cached
+            cache_tier = "exact"
+        else:
+            success, detection_result, face_image = get_face_image(image)
+            timings["detection_ms"] = round(
+                (time.perf_counter() - stage_start) * 1000, 2)
+
+            if not success:
+                return _store_final_result(None, {
+                    "success": False,
+                    "message": detection_result.get("message", "خطا در تشخیص چهره"),
+                    "request_id": request_id
+                })
+
+            face_coordinates = detection_result.get("face")
+
+            # مرحله 2: تحلیل شکل چهره
+            checkpoint("analyzing", face_coordinates=face_coordinates)
+            stage_start = time.perf_counter()
+
+            # جستجوی نسخه دوباره فشرده شده همین چهره با هش ادراکی
+            phash_key = face_phash_key(face_image, client_cache_scope(client_info))
+            analysis_result = get_cached_result(phash_key)
+            if analysis_result is not None:
+                cache_tier = "phash"
+            else:
+                analysis_result = generate_full_analysis(
+                    image, face_coordinates, face_image)
+                if analysis_result.get("success", False):
+                    store_cached_result(phash_key, analysis_result)
+            timings["analysis_ms"] = round(
+                (time.perf_counter() - stage_start) * 1000, 2)
+
+            store_pipeline_result(content_key, face_coordinates, analysis_result)
+
+        if not analysis_result.get("success", False):
+            return _store_final_result(None, {
+                "success": False,
+                "message": analysis_result.get("message", "خطا در تحلیل شکل چهره"),
+                "face_coordinates": face_coordinates,
+                "request_id": request_id
+            })
+
+        face_shape = analysis_result.get("face_shape")
+        confidence = analysis_result.get("confidence")
+
         result = {
             "success": True,
+            "message": "پردازش تصویر با موفقیت انجام شد",
+            "face_coordinates": face_coordinates,
             "face_shape": face_shape,
-            "recommended_frame_types": recommended_frame_types,
-            "recommended_frames": recommended_frames,
-            "message": "فریم‌های مناسب با موفقیت پیشنهاد شدند",
+            "confidence": confidence,
+            "description": analysis_result.get("description"),
+            "recommendation": analysis_result.get("recommendation"),
+            "recommended_frame_types": analysis_result.get("recommended_frame_types", []),
+            "recommended_frames": [],
             "request_id": request_id,
             "user_id": user_id,
-            "analysis_id": analysis_id,
-            "recommendation_id": recommendation_id
+            "analysis_id": None,
+            "timings": timings,
+            "cache": cache_tier
         }
 
-        return result
+        if include_frames:
+            checkpoint("matching", face_coordinates=face_coordinates,
+                       face_shape=face_shape, confidence=confidence)
+        stage_start = time.perf_counter()
+
+        # مرحله 3: ذخیره نتیجه تحلیل و پیشنهاد فریم به صورت همزمان روی event loop ورکر
+        analysis_id, frames_result = run_async(_persist_and_match(
+            task_id=str(self.request.id),
+            user_id=user_id,
+            request_id=request_id,
+            client_info=client_info,
+            face_shape=face_shape,
+            confidence=confidence,
+            include_frames=include_frames,
+            min_price=min_price,
+            max_price=max_price,
+            limit=limit
+        ))
+        result["analysis_id"] = analysis_id
+
+        if frames_result is not None:
+            timings["matching_ms"] = round(
+                (time.perf_counter() - stage_start) * 1000, 2)
+
+            if frames_result.get("success", False):
+                result["recommended_frames"] = frames_result.get(
+                    "recommended_frames", [])
+            else:
+                logger.warning(
+                    f"خطا در دریافت فریم‌های پیشنهادی: {frames_result.get('message')}")
+
+        logger.info(
+            f"پردازش یکپارچه برای درخواست {request_id} انجام شد: {timings} (کش: {cache_tier})")
+        return _store_final_result(None, result)
 
     except Exception as e:
-        logger.error(f"خطا در پیشنهاد فریم: {str(e)}")
-        return {
+        logger.error(f"خطا در پردازش یکپارچه: {str(e)}")
+        return _store_final_result(None, {
             "success": False,
-            "message": f"خطا در پیشنهاد فریم: {str(e)}",
+            "message": f"خطا در پردازش تصویر: {str(e)}",
             "request_id": request_id
-        }
+        })
@@ -1,6 +1,5 @@
 import logging
-import json
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 import asyncio
 import threading
@@ -8,11 +7,16 @@ import time
 import schedule
 import aiohttp
 import random
+import base64
+import hashlib
+import hmac
 
 from app.config import settings
-from app.core.face_shape_data import get_recommended_frame_types
+from app.core.face_shape_data import (
+    get_recommended_frame_types, infer_frame_type, get_frame_type_mappings_version)
 from app.db.connection import get_database
-from app.db.repository import save_woocommerce_cache, get_woocommerce_cache
+from app.db.repository import (
+    save_woocommerce_cache, get_woocommerce_cache, update_woocommerce_cache_products)
 
 
 # تنظیمات لاگر
@@ -21,23 +25,138 @@ logger = logging.getLogger(__name__)
 # کش برای محصولات
 product_cache = None
 last_cache_update = None
+last_full_refresh = None
+
+# جایگاه هر محصول در product_cache براساس شناسه
+_product_positions: Dict[Any, int] = {}
+
+# ایندکس طبقه‌بندی محصولات (شناسه -> رکورد فشرده با نتایج از پیش محاسبه شده)
+_catalog_index: Dict[Any, Dict[str, Any]] = {}
+
+# نسخه نقشه نوع فریم که انواع فریم ایندکس با آن محاسبه شده‌اند
+_catalog_mappings_version = None
 refresh_lock = asyncio.Lock()
+
+# قفل تغییر کش حافظه و کش دیتابیس (woocommerce_cache)؛ دانلود از شبکه بیرون این قفل است
+cache_write_lock = asyncio.Lock()
+
+# رویدادهای وب‌هوک دریافت شده در طول بروزرسانی یا همگام‌سازی در حال اجرا؛
+# پس از ادغام نتیجه دانلود دوباره اعمال می‌شوند تا داده قدیمی‌تر دانلود آن‌ها را از بین نبرد
+_pending_webhooks: Optional[List[Tuple[str, Dict[str, Any]]]] = None
 update_scheduler = None
 
 # نگهداری وضعیت بروزرسانی
 update_status = {
     "last_update": None,
+    "last_full_refresh": None,
+    "last_sync": None,
     "in_progress": False,
     "total_products": 0,
     "last_error": None
 }
 
+# همپوشانی بازه زمانی همگام‌سازی برای جبران اختلاف ساعت سرورها
+_SYNC_OVERLAP = timedelta(minutes=2)
+
+# حلقه رویداد اصلی برنامه (برای اجرای بروزرسانی‌های زمان‌بندی شده)
+_main_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _as_utc(value: datetime) -> datetime:
+    """تاریخ‌های بدون منطقه زمانی دیتابیس به وقت UTC هستند"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _classify_product(product: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    طبقه‌بندی یک محصول برای ایندکس کاتالوگ.
+
+    همه بررسی‌هایی که مسیر پیشنهاد فریم به آن‌ها نیاز دارد (فریم بودن، عدسی
+    نبودن، موجودی، لینک، نامرتبط بودن، دسته و قیمت) یک بار انجام می‌شوند.
+    """
+    permalink = product.get("permalink", "")
+    is_frame = (product.get("stock_status") == "instock"
+                and "/product/" in permalink
+                and "/?post_type=product&p=" not in permalink
+                and is_eyeglass_frame(product)
+                and not is_lens_or_lens_package(product))
+
+    category_ids = {category.get("id") for category in product.get("categories", [])}
+    if 17 in category_ids:
+        eyeglass_type = "آفتابی"
+    elif 18 in category_ids:
+        eyeglass_type = "طبی"
+    else:
+        eyeglass_type = "سایر"
+
+    try:
+        price = float(product.get("price") or "")
+    except (ValueError, TypeError):
+        price = None
+
+    return {
+        "product": product,
+        "is_frame": is_frame,
+        "unrelated": is_unrelated_product(product),
+        "eyeglass_type": eyeglass_type,
+        "price": price,
+        "frame_type": get_frame_type(product) if is_frame else None
+    }
+
+
+def _set_product_cache(products: List[Dict[str, Any]]):
+    """جایگزینی کامل کش محصولات و ساخت دوباره ایندکس شناسه‌ها و طبقه‌بندی"""
+    global product_cache, _product_positions, _catalog_index, _catalog_mappings_version
+
+    start_time = time.perf_counter()
+    mappings_version = get_frame_type_mappings_version()
+    catalog_index = {product.get("id"): _classify_product(product) for product in products}
+
+    product_cache = products
+    _product_positions = {product.get("id"): i for i, product in enumerate(products)}
+    _catalog_index = catalog_index
+    _catalog_mappings_version = mappings_version
+
+    logger.info(
+        f"ایندکس کاتالوگ برای {len(products)} محصول در {(time.perf_counter() - start_time) * 1000:.0f} میلی‌ثانیه ساخته شد "
+        f"({sum(1 for record in catalog_index.values() if record['is_frame'])} فریم عینک)")
+
+
+def _upsert_cached_product(product: Dict[str, Any]):
+    """افزودن یا جایگزینی یک محصول در کش با هزینه O(1)"""
+    _catalog_index[product.get("id")] = _classify_product(product)
+
+    position = _product_positions.get(product.get("id"))
+    if position is not None:
+        product_cache[position] = product
+    else:
+        _product_positions[product.get("id")] = len(product_cache)
+        product_cache.append(product)
+
+
+def _remove_cached_product(product_id: Any) -> bool:
+    """
+    حذف یک محصول از کش با هزینه O(1).
+
+    آخرین محصول لیست به جای محصول حذف شده منتقل می‌شود.
+    """
+    _catalog_index.pop(product_id, None)
+    position = _product_positions.pop(product_id, None)
+    if position is None:
+        return False
+
+    last_product = product_cache.pop()
+    if position < len(product_cache):
+        product_cache[position] = last_product
+        _product_positions[last_product.get("id")] = position
+    return True
+
 
 async def initialize_product_cache():
     """
     راه‌اندازی اولیه کش محصولات در شروع برنامه
     """
-    global product_cache, last_cache_update, update_status
+    global product_cache, last_cache_update, last_full_refresh, update_status
 
     logger.info("شروع راه‌اندازی اولیه کش محصولات WooCommerce")
 
@@ -49,7 +168,7 @@ async def initialize_product_cache():
         if cache_record and "total_products" in cache_record and cache_record["total_products"] > 0:
             # بررسی اعتبار کش
             cache_age = datetime.now(timezone.utc) - \
-                cache_record['last_update']
+                _as_utc(cache_record['last_update'])
             if cache_age > timedelta(hours=24):
                 logger.info(
                     f"کش محصولات در دیتابیس منقضی شده است (آخرین بروزرسانی: {cache_record['last_update']}). نیاز به بروزرسانی دارد.")
@@ -66,9 +185,12 @@ async def initialize_product_cache():
                 if chunks_data:
                     logger.info(
                         f"کش محصولات از دیتابیس بازیابی شد: {len(chunks_data)} محصول (آخرین بروزرسانی: {cache_record['last_update']})")
-                    product_cache = chunks_data
-                    last_cache_update = cache_record["last_update"]
-                    update_status["last_update"] = cache_record["last_update"]
+                    _set_product_cache(chunks_data)
+                    last_cache_update = _as_utc(cache_record["last_update"])
+                    last_full_refresh = _as_utc(
+                        cache_record.get("last_full_refresh", cache_record["last_update"]))
+                    update_status["last_update"] = last_cache_update
+                    update_status["last_full_refresh"] = last_full_refresh
                     update_status["total_products"] = len(chunks_data)
 
                     # بررسی محصولات معتبر پس از بازیابی
@@ -87,11 +209,13 @@ async def initialize_product_cache():
                     if len(valid_products) < len(product_cache):
                         logger.info(
                             f"{len(product_cache) - len(valid_products)} محصول نامعتبر از کش حذف شد")
-                        product_cache = valid_products
+                        _set_product_cache(valid_products)
                         update_status["total_products"] = len(valid_products)
 
-                    # فقط راه‌اندازی زمان‌بندی بدون دانلود اولیه
+                    # راه‌اندازی زمان‌بندی و دریافت تغییرات پس از آخرین ذخیره بدون دانلود کامل
                     start_scheduled_updates()
+                    if settings.WOOCOMMERCE_SYNC_INTERVAL_MINUTES > 0:
+                        asyncio.create_task(sync_product_cache())
                     return
                 else:
                     logger.info(
@@ -114,26 +238,46 @@ def start_scheduled_updates():
     """
     راه‌اندازی بروزرسانی زمان‌بندی شده محصولات
     """
-    global update_scheduler
+    global update_scheduler, _main_loop
 
     # اگر قبلاً راه‌اندازی شده، آن را متوقف کنیم
     if update_scheduler and update_scheduler.is_alive():
         return
 
-    # تنظیم زمان‌بندی بروزرسانی (روزی یکبار در ساعت 3 صبح)
+    # بروزرسانی‌ها در حلقه اصلی اجرا می‌شوند تا با کش و اتصال دیتابیس آن هماهنگ باشند
+    try:
+        _main_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _main_loop = None
+
+    sync_interval = settings.WOOCOMMERCE_SYNC_INTERVAL_MINUTES
+
+    # همگام‌سازی تغییرات در فواصل کوتاه و بروزرسانی کامل برای تطبیق دوره‌ای
     def run_scheduler():
         schedule.every().monday.at("03:00").do(run_async_update)  # دوشنبه‌ها ساعت 3 صبح
         schedule.every().thursday.at("03:00").do(
             run_async_update)  # پنجشنبه‌ها ساعت 3 صبح
+        if sync_interval > 0:
+            schedule.every(sync_interval).minutes.do(run_async_sync)
 
         while True:
             schedule.run_pending()
-            # بررسی هر 15 دقیقه
-            time.sleep(900)
+            # بررسی هر دقیقه
+            time.sleep(60)
+
+    def run_coroutine(coroutine):
+        if _main_loop is not None and _main_loop.is_running():
+            asyncio.run_coroutine_threadsafe(coroutine, _main_loop).result()
+        else:
+            asyncio.run(coroutine)
 
     def run_async_update():
         logger.info("اجرای زمان‌بندی شده بروزرسانی کش محصولات WooCommerce")
-        asyncio.run(refresh_product_cache(force=True))
+        run_coroutine(refresh_product_cache(force=True))
+
+    def run_async_sync():
+        logger.debug("اجرای زمان‌بندی شده همگام‌سازی تغییرات محصولات WooCommerce")
+        run_coroutine(sync_product_cache())
 
     # اجرای زمان‌بندی در یک ترد جداگانه
     update_scheduler = threading.Thread(target=run_scheduler, daemon=True)
@@ -141,6 +285,9 @@ def start_scheduled_updates():
 
     logger.info(
         "زمان‌بندی بروزرسانی خودکار محصولات WooCommerce فعال شد (دوشنبه ها و پنجشنبه ها)")
+    if sync_interval > 0:
+        logger.info(
+            f"همگام‌سازی تغییرات محصولات WooCommerce هر {sync_interval} دقیقه فعال شد")
 
 
 async def refresh_product_cache(force=False) -> bool:
@@ -153,7 +300,7 @@ async def refresh_product_cache(force=False) -> bool:
     Returns:
         bool: نتیجه بروزرسانی
     """
-    global product_cache, last_cache_update, update_status
+    global product_cache, last_cache_update, last_full_refresh, update_status, _pending_webhooks
 
     # بررسی وضعیت فعلی کش
     if not force and product_cache is not None and len(product_cache) > 0:
@@ -171,13 +318,24 @@ async def refresh_product_cache(force=False) -> bool:
         # تنظیم وضعیت بروزرسانی
         update_status["in_progress"] = True
         update_status["last_error"] = None
+        _pending_webhooks = []
 
         try:
             logger.info(
                 "شروع فرآیند دانلود و بروزرسانی کش محصولات از WooCommerce API")
 
+            # زمان شروع دانلود مبنای همگام‌سازی بعدی است
+            refresh_start = datetime.now(timezone.utc)
+
             # دریافت محصولات از API
-            products = await fetch_all_woocommerce_products()
+            products, complete = await fetch_all_woocommerce_products()
+
+            if not complete:
+                # کاتالوگ ناقص جایگزین کش فعلی و نسخه دیتابیس نمی‌شود
+                logger.error("دانلود کاتالوگ محصولات ناقص بود، کش فعلی حفظ شد")
+                update_status["in_progress"] = False
+                update_status["last_error"] = "دانلود کاتالوگ محصولات ناقص بود"
+                return False
 
             if not products:
                 logger.error("خطا در دریافت محصولات از WooCommerce API")
@@ -185,33 +343,33 @@ async def refresh_product_cache(force=False) -> bool:
                 update_status["last_error"] = "خطا در دریافت محصولات از API"
                 return False
 
-            # بروزرسانی کش
-            product_cache = products
-            last_cache_update = datetime.now(timezone.utc)
-            update_status["last_update"] = last_cache_update
-            update_status["total_products"] = len(products)
+            async with cache_write_lock:
+                # بروزرسانی کش و اعمال دوباره وب‌هوک‌های رسیده در طول دانلود
+                _set_product_cache(products)
+                _replay_pending_webhooks()
+                last_cache_update = refresh_start
+                last_full_refresh = refresh_start
+                update_status["last_update"] = last_cache_update
+                update_status["last_full_refresh"] = last_full_refresh
+                update_status["total_products"] = len(product_cache)
 
-            logger.info(
-                f"دانلود محصولات از WooCommerce API با موفقیت انجام شد. تعداد محصولات: {len(products)}")
-
-            # اضافه کردن لاگ برای محصولات موجود
-            eyeglass_frames_count = sum(
-                1 for p in products if is_eyeglass_frame(p))
-            logger.info(f"تعداد فریم‌های عینک موجود: {eyeglass_frames_count}")
-
-            # ذخیره در دیتابیس
-            try:
-                logger.info("در حال ذخیره محصولات دانلود شده در دیتابیس...")
-                success = await save_woocommerce_cache(products, last_cache_update)
-                if not success:
-                    logger.warning(
-                        "ذخیره کش محصولات در دیتابیس با مشکل مواجه شد")
-            except Exception as db_error:
-                logger.error(
-                    f"خطا در ذخیره کش محصولات در دیتابیس: {str(db_error)}")
+                logger.info(
+                    f"دانلود محصولات از WooCommerce API با موفقیت انجام شد. تعداد محصولات: {len(product_cache)}")
+
+                # ذخیره در دیتابیس
+                try:
+                    logger.info("در حال ذخیره محصولات دانلود شده در دیتابیس...")
+                    success = await save_woocommerce_cache(
+                        product_cache, last_cache_update, last_full_refresh)
+                    if not success:
+                        logger.warning(
+                            "ذخیره کش محصولات در دیتابیس با مشکل مواجه شد")
+                except Exception as db_error:
+                    logger.error(
+                        f"خطا در ذخیره کش محصولات در دیتابیس: {str(db_error)}")
 
             logger.info(
-                f"بروزرسانی کش محصولات WooCommerce با موفقیت انجام شد ({len(products)} محصول)")
+                f"بروزرسانی کش محصولات WooCommerce با موفقیت انجام شد ({len(product_cache)} محصول)")
             update_status["in_progress"] = False
             return True
 
@@ -221,168 +379,506 @@ async def refresh_product_cache(force=False) -> bool:
             update_status["last_error"] = str(e)
             return False
 
+        finally:
+            _pending_webhooks = None
 
-async def fetch_all_woocommerce_products() -> List[Dict[str, Any]]:
+
+async def sync_product_cache() -> bool:
     """
-    دریافت تمام محصولات از WooCommerce API و فیلتر کردن محصولات نامرتبط، ناموجود و بدون عکس.
-    با معیارهای فیلتر کمتر سختگیرانه برای حفظ بیشتر محصولات.
+    همگام‌سازی تدریجی کش محصولات با تغییرات WooCommerce.
+
+    فقط محصولاتی که پس از آخرین بروزرسانی تغییر کرده‌اند (modified_after)
+    دریافت می‌شوند و محصولات حذف شده با یک فهرست سبک از شناسه‌ها
+    (_fields=id) پیدا می‌شوند. تغییرات روی کش حافظه و کش دیتابیس اعمال
+    می‌شود. اگر کشی وجود نداشته باشد یا از آخرین بروزرسانی کامل بیش از
+    WOOCOMMERCE_FULL_REFRESH_HOURS گذشته باشد بروزرسانی کامل انجام می‌شود.
 
     Returns:
-        list: لیست محصولات فیلتر شده
+        bool: نتیجه همگام‌سازی
     """
-    try:
-        logger.info("شروع دانلود محصولات از WooCommerce API...")
+    global product_cache, last_cache_update, update_status, _pending_webhooks
 
-        # API پارامترها
-        api_url = settings.WOOCOMMERCE_API_URL
-        consumer_key = settings.WOOCOMMERCE_CONSUMER_KEY
-        consumer_secret = settings.WOOCOMMERCE_CONSUMER_SECRET
-        per_page = settings.WOOCOMMERCE_PER_PAGE
-
-        # دسته‌بندی‌های مورد نظر
-        categories = [
-            {"id": 5215, "name": "computer-glasses"},
-            {"id": 18, "name": "eyeglasses"},
-            {"id": 17, "name": "sunglasses"},
-            {"id": 5216, "name": "reading-glasses"}
-        ]
+    full_refresh_age = timedelta(hours=settings.WOOCOMMERCE_FULL_REFRESH_HOURS)
+    if product_cache is None or last_cache_update is None or last_full_refresh is None \
+            or datetime.now(timezone.utc) - last_full_refresh > full_refresh_age:
+        logger.info("همگام‌سازی تدریجی ممکن نیست، انجام بروزرسانی کامل کش محصولات")
+        return await refresh_product_cache(force=True)
 
-        # مقداردهی اولیه لیست محصولات
-        all_products = []
-        total_downloaded = 0
+    async with refresh_lock:
+        update_status["in_progress"] = True
+        update_status["last_error"] = None
+        _pending_webhooks = []
 
-        async with aiohttp.ClientSession() as session:
-            # دانلود محصولات از هر دسته‌بندی
-            for category in categories:
-                page = 1
-                category_products = []
+        try:
+            sync_start = datetime.now(timezone.utc)
+            modified_after = (last_cache_update - _SYNC_OVERLAP).strftime("%Y-%m-%dT%H:%M:%S")
 
-                logger.info(
-                    f"در حال دانلود محصولات دسته‌بندی {category['name']} (ID: {category['id']})...")
-
-                while True:
-                    # پارامترهای درخواست
-                    params = {
-                        "consumer_key": consumer_key,
-                        "consumer_secret": consumer_secret,
-                        "per_page": per_page,
-                        "page": page,
-                        "category": category["id"]
-                    }
-
-                    # ارسال درخواست
-                    try:
-                        async with session.get(api_url, params=params, timeout=30) as response:
-                            if response.status != 200:
-                                error_text = await response.text()
-                                logger.error(
-                                    f"خطا در WooCommerce API برای دسته‌بندی {category['name']}: {response.status} - {error_text}")
-                                break
-
-                            products = await response.json()
-
-                            if not products:
-                                logger.info(
-                                    f"دانلود محصولات دسته‌بندی {category['name']} کامل شد. صفحه آخر: {page-1}")
-                                break
-
-                            total_downloaded += len(products)
-                            logger.info(
-                                f"دانلود صفحه {page} از دسته‌بندی {category['name']} با {len(products)} محصول انجام شد")
-                            category_products.extend(products)
-
-                            # بررسی تعداد محصولات دریافتی
-                            if len(products) < per_page:
-                                logger.info(
-                                    f"دانلود محصولات دسته‌بندی {category['name']} کامل شد. صفحه آخر: {page}")
-                                break
-
-                            page += 1
-                            logger.info(
-                                f"در حال دانلود صفحه {page} از دسته‌بندی {category['name']}...")
-                    except Exception as req_error:
-                        logger.error(
-                            f"خطا در ارسال درخواست به WooCommerce API برای دسته‌بندی {category['name']} (صفحه {page}): {str(req_error)}")
-                        # کمی صبر کنیم و دوباره تلاش کنیم
-                        logger.info(
-                            f"تلاش مجدد برای دانلود صفحه {page} از دسته‌بندی {category['name']} پس از 2 ثانیه...")
-                        await asyncio.sleep(2)
+            changed_products, complete = await download_catalog_products({
+                "modified_after": modified_after,
+                "dates_are_gmt": "true"
+            })
+            if not complete:
+                # بدون همه تغییرات نقطه شروع همگام‌سازی بعدی جلو برده نمی‌شود
+                logger.error("دریافت تغییرات محصولات ناقص بود، همگام‌سازی انجام نشد")
+                update_status["in_progress"] = False
+                update_status["last_error"] = "دریافت تغییرات محصولات ناقص بود"
+                return False
+
+            listed_products, listing_complete = await download_catalog_products({"_fields": "id"})
+
+            valid_products = filter_catalog_products(changed_products) if changed_products else []
+            valid_ids = {product.get("id") for product in valid_products}
+
+            # محصولات تغییر یافته‌ای که دیگر معتبر نیستند (مثلاً ناموجود شده‌اند)
+            removed_ids = {product.get("id") for product in changed_products} - valid_ids
+
+            if not listing_complete:
+                logger.warning("فهرست شناسه محصولات ناقص بود، بررسی حذف‌ها انجام نشد")
+
+            async with cache_write_lock:
+                # محصولاتی که در فهرست شناسه‌ها نیستند حذف شده‌اند
+                if listing_complete:
+                    listed_ids = {product.get("id") for product in listed_products}
+                    removed_ids |= {product.get("id") for product in product_cache
+                                    if product.get("id") not in listed_ids}
+
+                # ادغام تغییرات با حفظ ترتیب کش
+                updates = {product.get("id"): product for product in valid_products}
+                merged = []
+                for product in product_cache:
+                    product_id = product.get("id")
+                    if product_id in removed_ids:
                         continue
+                    merged.append(updates.pop(product_id, product))
+                merged.extend(updates.values())
 
-                logger.info(
-                    f"مجموع محصولات دانلود شده از دسته‌بندی {category['name']}: {len(category_products)}")
-                all_products.extend(category_products)
+                _set_product_cache(merged)
+                webhook_upserts, webhook_removed = _replay_pending_webhooks()
+                last_cache_update = sync_start
+                update_status["last_update"] = sync_start
+                update_status["last_sync"] = sync_start
+                update_status["total_products"] = len(product_cache)
 
-        logger.info(f"پیش‌پردازش {len(all_products)} محصول دانلود شده...")
+                if valid_products or removed_ids:
+                    logger.info(
+                        f"همگام‌سازی محصولات انجام شد: {len(valid_products)} محصول جدید یا تغییر یافته، "
+                        f"{len(removed_ids)} محصول حذف شده (مجموع {len(product_cache)})")
+
+                # ذخیره تغییرات در دیتابیس (در نبود کش ذخیره شده، ذخیره کامل)؛
+                # تغییرات وب‌هوک پس از تغییرات همگام‌سازی نوشته می‌شوند
+                try:
+                    persisted = await update_woocommerce_cache_products(
+                        valid_products, sorted(removed_ids), sync_start)
+                    if not persisted:
+                        # ذخیره کامل پس از همگام‌سازی زمان بروزرسانی کامل را جلو نمی‌برد
+                        await save_woocommerce_cache(
+                            product_cache, sync_start, last_full_refresh)
+                    elif webhook_upserts or webhook_removed:
+                        await update_woocommerce_cache_products(
+                            webhook_upserts, webhook_removed, sync_start)
+                except Exception as db_error:
+                    logger.error(
+                        f"خطا در ذخیره تغییرات کش محصولات در دیتابیس: {str(db_error)}")
 
-        # شمارنده‌های فیلتر
-        # محصولات ناموجود (stock_status != instock)
-        out_of_stock_count = 0
-        invalid_permalink_count = 0   # محصولات با permalink نامعتبر
-        unrelated_count = 0          # محصولات نامرتبط
-        non_eyeglass_count = 0       # محصولات غیر فریم عینک
-        lens_package_count = 0       # عدسی‌ها و پکیج‌های عدسی
-        no_image_count = 0           # محصولات بدون تصویر
-        valid_count = 0              # محصولات معتبر نهایی
-
-        # پیش‌پردازش محصولات
-        processed_products = []
-        for product in all_products:
-            # فقط فیلترهای ضروری را اعمال می‌کنیم
-
-            # 1. بررسی وضعیت موجودی - محصولات ناموجود را نادیده می‌گیریم
-            if product.get("stock_status") != "instock":
-                out_of_stock_count += 1
-                continue
+            update_status["in_progress"] = False
+            return True
 
-            # 2. بررسی permalink - فقط محصولاتی که لینک نامعتبر دارند رد می‌شوند
-            permalink = product.get("permalink", "")
-            if "/?post_type=product&p=" in permalink:
-                invalid_permalink_count += 1
-                continue
+        except Exception as e:
+            logger.error(f"خطا در همگام‌سازی کش محصولات WooCommerce: {str(e)}")
+            update_status["in_progress"] = False
+            update_status["last_error"] = str(e)
+            return False
 
-            # 3. بررسی عدم ارتباط با محصولات نامرتبط
-            if is_unrelated_product(product):
-                unrelated_count += 1
-                continue
+        finally:
+            _pending_webhooks = None
+
+
+def verify_webhook_signature(body: bytes, signature: Optional[str]) -> bool:
+    """
+    بررسی امضای وب‌هوک WooCommerce.
+
+    هدر X-WC-Webhook-Signature برابر base64 امضای HMAC-SHA256 بدنه خام
+    درخواست با کلید WOOCOMMERCE_WEBHOOK_SECRET است.
+
+    Args:
+        body: بدنه خام درخواست
+        signature: مقدار هدر امضا
+
+    Returns:
+        bool: True اگر امضا معتبر باشد
+    """
+    secret = settings.WOOCOMMERCE_WEBHOOK_SECRET
+    if not secret or not signature:
+        return False
+
+    expected = base64.b64encode(
+        hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()).decode("ascii")
+    return hmac.compare_digest(expected, signature.strip())
+
+
+def _in_catalog_categories(product: Dict[str, Any]) -> bool:
+    catalog_ids = {category["id"] for category in CATALOG_CATEGORIES}
+    return any(category.get("id") in catalog_ids for category in product.get("categories", []))
+
+
+async def apply_product_webhook(topic: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    اعمال یک رویداد وب‌هوک محصول روی کش حافظه و کش دیتابیس.
+
+    محصول جدید یا تغییر یافته اگر از فیلترهای کاتالوگ عبور کند جایگزین یا
+    اضافه می‌شود و در غیر این صورت (مثلاً ناموجود شدن) از کش حذف می‌شود.
+    زمان آخرین بروزرسانی تغییر نمی‌کند تا همگام‌سازی بعدی تغییرات دیگر را
+    از دست ندهد.
+
+    Args:
+        topic: موضوع وب‌هوک (product.created، product.updated، product.deleted، product.restored)
+        payload: بدنه وب‌هوک
+
+    Returns:
+        dict: action انجام شده (updated، removed یا ignored) و شناسه محصول
+    """
+    product_id = payload.get("id")
+    if product_id is None or not topic.startswith("product."):
+        return {"action": "ignored", "product_id": product_id}
+
+    async with cache_write_lock:
+        if product_cache is None:
+            # کش هنوز بارگیری نشده است؛ بارگیری اولیه این تغییر را هم دریافت می‌کند
+            return {"action": "ignored", "product_id": product_id}
+
+        if _pending_webhooks is not None:
+            _pending_webhooks.append((topic, payload))
+
+        action = _apply_webhook_to_cache(topic, payload)
+        if action == "ignored":
+            return {"action": action, "product_id": product_id}
+
+        update_status["total_products"] = len(product_cache)
+        logger.info(f"وب‌هوک {topic} برای محصول {product_id} اعمال شد ({action})")
+
+        try:
+            keep = action == "updated"
+            await update_woocommerce_cache_products(
+                [payload] if keep else [], [] if keep else [product_id],
+                last_cache_update or datetime.now(timezone.utc))
+        except Exception as db_error:
+            logger.error(f"خطا در ذخیره تغییر وب‌هوک در دیتابیس: {str(db_error)}")
+
+    return {"action": action, "product_id": product_id}
+
+
+def _apply_webhook_to_cache(topic: str, payload: Dict[str, Any]) -> str:
+    """اعمال یک رویداد وب‌هوک روی کش حافظه؛ با cache_write_lock فراخوانی می‌شود"""
+    keep = topic != "product.deleted" and _in_catalog_categories(payload) \
+        and bool(filter_catalog_products([payload], log_stats=False))
+
+    if keep:
+        _upsert_cached_product(payload)
+        return "updated"
+    if _remove_cached_product(payload.get("id")):
+        return "removed"
+    return "ignored"
 
-            # 4. بررسی وجود تصویر
-            if not product.get("images"):
-                no_image_count += 1
+
+def _replay_pending_webhooks() -> Tuple[List[Dict[str, Any]], List[Any]]:
+    """
+    اعمال دوباره وب‌هوک‌های رسیده در طول بروزرسانی روی کش تازه ادغام شده.
+
+    اگر نسخه دانلود شده یک محصول از نسخه وب‌هوک جدیدتر باشد (date_modified_gmt)
+    همان نسخه دانلود شده حفظ می‌شود. با cache_write_lock فراخوانی می‌شود.
+
+    Returns:
+        tuple: (محصولات افزوده یا جایگزین شده، شناسه محصولات حذف شده) برای ذخیره در دیتابیس
+    """
+    global _pending_webhooks
+
+    pending, _pending_webhooks = _pending_webhooks or [], None
+    effects: Dict[Any, Optional[Dict[str, Any]]] = {}
+
+    for topic, payload in pending:
+        product_id = payload.get("id")
+        position = _product_positions.get(product_id)
+        if position is not None and topic != "product.deleted":
+            cached_modified = product_cache[position].get("date_modified_gmt") or ""
+            if cached_modified > (payload.get("date_modified_gmt") or ""):
                 continue
 
-            # 5. بررسی اینکه عدسی یا پکیج عدسی نباشد
-            if is_lens_or_lens_package(product):
-                lens_package_count += 1
+        action = _apply_webhook_to_cache(topic, payload)
+        if action == "updated":
+            effects[product_id] = payload
+        elif action == "removed":
+            effects[product_id] = None
+
+    if pending:
+        logger.info(f"{len(pending)} وب‌هوک رسیده در طول بروزرسانی دوباره اعمال شد")
+
+    upserts = [product for product in effects.values() if product is not None]
+    removed = [product_id for product_id, product in effects.items() if product is None]
+    return upserts, removed
+
+
+# دسته‌بندی‌های مورد نظر در کاتالوگ
+CATALOG_CATEGORIES = [
+    {"id": 5215, "name": "computer-glasses"},
+    {"id": 18, "name": "eyeglasses"},
+    {"id": 17, "name": "sunglasses"},
+    {"id": 5216, "name": "reading-glasses"}
+]
+
+
+async def _fetch_products_page(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    params: Dict[str, Any],
+    label: str
+) -> Tuple[Optional[List[Dict[str, Any]]], Mapping[str, str]]:
+    """
+    دریافت یک صفحه از محصولات با تلاش مجدد.
+
+    خطاهای شبکه، 429 و خطاهای 5xx با تأخیر نمایی دوباره تلاش می‌شوند؛ سایر
+    پاسخ‌های غیر 200 بلافاصله ناموفق هستند.
+
+    Returns:
+        tuple: (لیست محصولات یا None در صورت خطا، هدرهای پاسخ)
+    """
+    attempts = max(1, settings.WOOCOMMERCE_MAX_RETRIES + 1)
+    for attempt in range(1, attempts + 1):
+        try:
+            async with semaphore:
+                async with session.get(settings.WOOCOMMERCE_API_URL, params=params, timeout=30) as response:
+                    if response.status == 200:
+                        # کپی CIMultiDict جستجوی بدون حساسیت به حروف را حفظ می‌کند
+                        # (پراکسی‌های HTTP/2 نام هدرها را با حروف کوچک می‌فرستند)
+                        return await response.json(), response.headers.copy()
+
+                    error_text = await response.text()
+                    logger.error(
+                        f"خطا در WooCommerce API برای {label}: {response.status} - {error_text[:200]}")
+                    if response.status != 429 and response.status < 500:
+                        return None, {}
+        except Exception as req_error:
+            logger.error(
+                f"خطا در ارسال درخواست به WooCommerce API برای {label}: {str(req_error)}")
+
+        if attempt < attempts:
+            delay = 2 ** (attempt - 1)
+            logger.info(f"تلاش مجدد برای {label} پس از {delay} ثانیه...")
+            await asyncio.sleep(delay)
+
+    return None, {}
+
+
+async def _fetch_category_products(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    category: Dict[str, Any],
+    extra_params: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    دریافت همه صفحات یک دسته‌بندی.
+
+    تعداد صفحات از هدر X-WP-TotalPages صفحه اول خوانده می‌شود و بقیه صفحات
+    هم‌زمان دریافت می‌شوند. اگر هدر موجود نباشد صفحات به ترتیب خوانده می‌شوند.
+
+    Returns:
+        tuple: (محصولات دسته‌بندی، True اگر همه صفحات با موفقیت دریافت شده باشند)
+    """
+    per_page = settings.WOOCOMMERCE_PER_PAGE
+    base_params = {
+        "consumer_key": settings.WOOCOMMERCE_CONSUMER_KEY,
+        "consumer_secret": settings.WOOCOMMERCE_CONSUMER_SECRET,
+        "per_page": per_page,
+        "category": category["id"],
+        **(extra_params or {})
+    }
+
+    def page_label(page: int) -> str:
+        return f"دسته‌بندی {category['name']} (صفحه {page})"
+
+    first_page, headers = await _fetch_products_page(
+        session, semaphore, {**base_params, "page": 1}, page_label(1))
+    if first_page is None:
+        return [], False
+
+    products = list(first_page)
+    total_pages = headers.get("X-WP-TotalPages")
+
+    if total_pages is not None:
+        total_pages = int(total_pages)
+        logger.info(
+            f"دسته‌بندی {category['name']}: {headers.get('X-WP-Total', '?')} محصول در {total_pages} صفحه")
+
+        pages = await asyncio.gather(*[
+            _fetch_products_page(session, semaphore, {**base_params, "page": page}, page_label(page))
+            for page in range(2, total_pages + 1)
+        ])
+        complete = True
+        for page_products, _ in pages:
+            if page_products is None:
+                complete = False
                 continue
+            products.extend(page_products)
+        return products, complete
+
+    # هدر تعداد صفحات موجود نیست؛ ادامه به ترتیب تا صفحه ناقص
+    page = 1
+    last_page = first_page
+    while len(last_page) >= per_page:
+        page += 1
+        last_page, _ = await _fetch_products_page(
+            session, semaphore, {**base_params, "page": page}, page_label(page))
+        if last_page is None:
+            return products, False
+        products.extend(last_page)
+    return products, True
+
+
+async def download_catalog_products(
+    extra_params: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    دریافت هم‌زمان محصولات همه دسته‌بندی‌ها و حذف محصولات تکراری.
 
-            # شمارش غیر فریم‌ها اما بدون رد کردن آنها
-            if not is_eyeglass_frame(product):
-                non_eyeglass_count += 1
-                # ما این محصول را رد نمی‌کنیم، فقط می‌شماریم
+    تعداد درخواست‌های هم‌زمان با WOOCOMMERCE_MAX_CONCURRENCY و تعداد اتصال‌ها
+    به سرور با محدودیت اتصال هر میزبان کنترل می‌شود. محصولی که در چند
+    دسته‌بندی آمده فقط یک بار برگردانده می‌شود.
 
-            # اضافه کردن محصول معتبر
-            processed_products.append(product)
-            valid_count += 1
+    Args:
+        extra_params: پارامترهای اضافی درخواست (مثلاً فیلتر تاریخ)
 
-        # لاگ‌های وضعیت فیلترها
-        logger.info("===== آمار فیلتر محصولات =====")
-        logger.info(f"تعداد کل محصولات دانلود شده: {len(all_products)}")
+    Returns:
+        tuple: (محصولات یکتا، True اگر همه صفحات با موفقیت دریافت شده باشند)
+    """
+    concurrency = max(1, settings.WOOCOMMERCE_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        results = await asyncio.gather(*[
+            _fetch_category_products(session, semaphore, category, extra_params)
+            for category in CATALOG_CATEGORIES
+        ])
+
+    products: Dict[Any, Dict[str, Any]] = {}
+    complete = True
+    for category, (category_products, category_complete) in zip(CATALOG_CATEGORIES, results):
         logger.info(
-            f"محصولات ناموجود (stock_status != instock): {out_of_stock_count}")
-        logger.info(f"محصولات با لینک نامعتبر: {invalid_permalink_count}")
-        logger.info(f"محصولات نامرتبط: {unrelated_count}")
-        logger.info(f"محصولات غیر فریم عینک (شمارش): {non_eyeglass_count}")
-        logger.info(f"عدسی‌ها و پکیج‌های عدسی: {lens_package_count}")
-        logger.info(f"محصولات بدون تصویر: {no_image_count}")
-        logger.info(f"تعداد محصولات معتبر نهایی: {valid_count}")
-        logger.info("================================")
+            f"مجموع محصولات دانلود شده از دسته‌بندی {category['name']}: {len(category_products)}")
+        complete = complete and category_complete
+        for product in category_products:
+            products.setdefault(product.get("id"), product)
+
+    return list(products.values()), complete
+
+
+def filter_catalog_products(all_products: List[Dict[str, Any]], log_stats: bool = True) -> List[Dict[str, Any]]:
+    """
+    فیلتر محصولات دانلود شده (ناموجود، لینک نامعتبر، نامرتبط، بدون تصویر و عدسی).
+
+    Args:
+        all_products: محصولات دریافت شده از API
+        log_stats: ثبت آمار فیلترها در لاگ
+
+    Returns:
+        list: محصولات معتبر برای نگهداری در کش
+    """
+    if log_stats:
+        logger.info(f"پیش‌پردازش {len(all_products)} محصول دانلود شده...")
+
+    # شمارنده‌های فیلتر
+    # محصولات ناموجود (stock_status != instock)
+    out_of_stock_count = 0
+    invalid_permalink_count = 0   # محصولات با permalink نامعتبر
+    unrelated_count = 0          # محصولات نامرتبط
+    non_eyeglass_count = 0       # محصولات غیر فریم عینک
+    lens_package_count = 0       # عدسی‌ها و پکیج‌های عدسی
+    no_image_count = 0           # محصولات بدون تصویر
+    valid_count = 0              # محصولات معتبر نهایی
+
+    # پیش‌پردازش محصولات
+    processed_products = []
+    for product in all_products:
+        # فقط فیلترهای ضروری را اعمال می‌کنیم
+
+        # 1. بررسی وضعیت موجودی - محصولات ناموجود را نادیده می‌گیریم
+        if product.get("stock_status") != "instock":
+            out_of_stock_count += 1
+            continue
+
+        # 2. بررسی permalink - فقط محصولاتی که لینک نامعتبر دارند رد می‌شوند
+        permalink = product.get("permalink", "")
+        if "/?post_type=product&p=" in permalink:
+            invalid_permalink_count += 1
+            continue
+
+        # 3. بررسی عدم ارتباط با محصولات نامرتبط
+        if is_unrelated_product(product):
+            unrelated_count += 1
+            continue
+
+        # 4. بررسی وجود تصویر
+        if not product.get("images"):
+            no_image_count += 1
+            continue
+
+        # 5. بررسی اینکه عدسی یا پکیج عدسی نباشد
+        if is_lens_or_lens_package(product):
+            lens_package_count += 1
+            continue
+
+        # شمارش غیر فریم‌ها اما بدون رد کردن آنها
+        if not is_eyeglass_frame(product):
+            non_eyeglass_count += 1
+            # ما این محصول را رد نمی‌کنیم، فقط می‌شماریم
+
+        # اضافه کردن محصول معتبر
+        processed_products.append(product)
+        valid_count += 1
 
+    if not log_stats:
         return processed_products
 
+    # لاگ‌های وضعیت فیلترها
+    logger.info("===== آمار فیلتر محصولات =====")
+    logger.info(f"تعداد کل محصولات دانلود شده: {len(all_products)}")
+    logger.info(
+        f"محصولات ناموجود (stock_status != instock): {out_of_stock_count}")
+    logger.info(f"محصولات با لینک نامعتبر: {invalid_permalink_count}")
+    logger.info(f"محصولات نامرتبط: {unrelated_count}")
+    logger.info(f"محصولات غیر فریم عینک (شمارش): {non_eyeglass_count}")
+    logger.info(f"عدسی‌ها و پکیج‌های عدسی: {lens_package_count}")
+    logger.info(f"محصولات بدون تصویر: {no_image_count}")
+    logger.info(f"تعداد محصولات معتبر نهایی: {valid_count}")
+    logger.info("================================")
+
+    return processed_products
+
+
+async def fetch_all_woocommerce_products() -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    دریافت تمام محصولات از WooCommerce API و فیلتر کردن محصولات نامرتبط، ناموجود و بدون عکس.
+    با معیارهای فیلتر کمتر سختگیرانه برای حفظ بیشتر محصولات.
+
+    Returns:
+        tuple: (لیست محصولات فیلتر شده، آیا همه صفحات دریافت شدند)
+    """
+    try:
+        logger.info("شروع دانلود محصولات از WooCommerce API...")
+        download_start = time.perf_counter()
+
+        all_products, complete = await download_catalog_products()
+
+        logger.info(
+            f"دانلود {len(all_products)} محصول یکتا در {time.perf_counter() - download_start:.1f} ثانیه انجام شد")
+        if not complete:
+            logger.warning("برخی صفحات محصولات پس از تلاش مجدد دریافت نشدند")
+            return [], False
+
+        return filter_catalog_products(all_products), True
+
     except Exception as e:
         logger.error(f"خطا در دریافت محصولات از WooCommerce API: {str(e)}")
-        return []
+        return [], False
 
 
 def is_valid_product(product: Dict[str, Any]) -> bool:
@@ -590,32 +1086,9 @@ def get_frame_type(product: Dict[str, Any]) -> str:
                 return attribute["options"][0]
 
     # اگر نوع فریم خاصی پیدا نشد، سعی در استنباط از نام محصول
-    name = product.get("name", "").lower()
-
-    # نقشه نوع فریم به کلمات کلیدی
-    try:
-        # بارگیری نقشه از فایل داده
-        with open(settings.FACE_SHAPE_DATA_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            frame_type_mappings = data.get('frame_type_mappings', {})
-    except Exception as e:
-        logger.error(f"خطا در بارگیری نقشه نوع فریم: {str(e)}")
-        # نقشه پیش‌فرض
-        frame_type_mappings = {
-            "مستطیلی": ["مستطیل", "rectangular", "rectangle"],
-            "مربعی": ["مربع", "square"],
-            "گرد": ["گرد", "round", "circular"],
-            "بیضی": ["بیضی", "oval"],
-            "گربه‌ای": ["گربه", "cat eye", "cat-eye"],
-            "هشت‌ضلعی": ["هشت", "octagonal", "octagon"],
-            "هاوایی": ["هاوایی", "aviator"],
-            "بدون‌فریم": ["بدون فریم", "rimless"]
-        }
-
-    for frame_type, keywords in frame_type_mappings.items():
-        for keyword in keywords:
-            if keyword in name:
-                return frame_type
+    frame_type = infer_frame_type(product.get("name", "").lower())
+    if frame_type:
+        return frame_type
 
     # پیش‌فرض به یک نوع رایج
     return "مستطیلی"
@@ -696,6 +1169,40 @@ def filter_products_by_price(products: List[Dict[str, Any]], min_price: Optional
     return filtered_products
 
 
+async def _get_indexed_frames(min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    دریافت رکوردهای ایندکس فریم‌های عینک معتبر با فیلتر قیمت.
+
+    Returns:
+        list: رکوردهای ایندکس کاتالوگ
+    """
+    global _catalog_mappings_version
+
+    # اطمینان از بارگیری کش (ایندکس همراه کش ساخته می‌شود)
+    await get_all_products()
+
+    # پس از تغییر نقشه نوع فریم در فایل داده، انواع فریم ایندکس دوباره محاسبه می‌شوند
+    mappings_version = get_frame_type_mappings_version()
+    if mappings_version != _catalog_mappings_version:
+        for record in _catalog_index.values():
+            if record["is_frame"]:
+                record["frame_type"] = get_frame_type(record["product"])
+        _catalog_mappings_version = mappings_version
+
+    records = [record for record in _catalog_index.values() if record["is_frame"]]
+
+    # فیلتر بر اساس قیمت (محصولات بدون قیمت معتبر در این حالت کنار گذاشته می‌شوند)
+    if min_price is not None or max_price is not None:
+        records = [
+            record for record in records
+            if record["price"] is not None
+            and (min_price is None or record["price"] >= min_price)
+            and (max_price is None or record["price"] <= max_price)
+        ]
+
+    return records
+
+
 async def get_eyeglass_frames(min_price: Optional[float] = None, max_price: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     دریافت همه فریم‌های عینک از کش.
@@ -707,33 +1214,11 @@ async def get_eyeglass_frames(min_price: Optional[float] = None, max_price: Opti
     Returns:
         list: لیست فریم‌های عینک
     """
-    # دریافت محصولات از کش
-    products = await get_all_products()
-
-    # فیلتر کردن فریم‌های عینک معتبر
-    eyeglass_frames = []
-    for product in products:
-
-        # بررسی وضعیت موجودی
-        if product.get("stock_status") != "instock":
-            continue
-
-        # بررسی permalink
-        permalink = product.get("permalink", "")
-        if "/?post_type=product&p=" in permalink or not "/product/" in permalink:
-            continue
-
-        # بررسی اینکه فریم عینک باشد
-        if is_eyeglass_frame(product) and not is_lens_or_lens_package(product):
-            eyeglass_frames.append(product)
-
-    # فیلتر بر اساس قیمت (اگر درخواست شده باشد)
-    if min_price is not None or max_price is not None:
-        eyeglass_frames = filter_products_by_price(
-            eyeglass_frames, min_price, max_price)
+    records = await _get_indexed_frames(min_price, max_price)
+    eyeglass_frames = [record["product"] for record in records]
 
     logger.info(
-        f"تعداد {len(eyeglass_frames)} فریم عینک معتبر از {len(products)} محصول یافت شد")
+        f"تعداد {len(eyeglass_frames)} فریم عینک معتبر از {len(_catalog_index)} محصول یافت شد")
     return eyeglass_frames
 
 
@@ -748,9 +1233,11 @@ def sort_products_by_match_score(products: List[Dict[str, Any]], face_shape: str
     Returns:
         list: محصولات مرتب شده
     """
-    # محاسبه امتیاز تطابق برای هر محصول
+    # محاسبه امتیاز تطابق برای هر محصول (نوع فریم از ایندکس کاتالوگ در صورت وجود)
     for product in products:
-        frame_type = get_frame_type(product)
+        record = _catalog_index.get(product.get("id"))
+        frame_type = record["frame_type"] if record and record["product"] is product and record["frame_type"] \
+            else get_frame_type(product)
         product["match_score"] = calculate_match_score(face_shape, frame_type)
 
     # مرتب‌سازی بر اساس امتیاز تطابق (نزولی)
@@ -901,9 +1388,11 @@ async def get_cache_status() -> Dict[str, Any]:
         "cache_initialized": product_cache is not None,
         "total_products": len(product_cache) if product_cache else 0,
         "last_update": last_cache_update,
+        "last_full_refresh": last_full_refresh,
+        "last_sync": update_status["last_sync"],
         "update_in_progress": update_status["in_progress"],
         "last_error": update_status["last_error"],
-        "eyeglass_frames_count": len([p for p in (product_cache or []) if p.get("is_eyeglass_frame", False)])
+        "eyeglass_frames_count": sum(1 for record in _catalog_index.values() if record["is_frame"])
     }
 
 
@@ -932,12 +1421,12 @@ async def get_recommended_frames(face_shape: str, min_price: Optional[float] = N
                 "message": f"هیچ توصیه فریمی برای شکل چهره {face_shape} موجود نیست"
             }
 
-        # دریافت فریم‌های عینک از کش
-        all_frames = await get_eyeglass_frames(min_price, max_price)
+        # دریافت فریم‌های عینک از ایندکس کاتالوگ
+        all_frames = await _get_indexed_frames(min_price, max_price)
 
-        # فیلتر کردن محصولات نامرتبط به صورت دستی
+        # فیلتر کردن محصولات نامرتبط
         filtered_frames = [
-            frame for frame in all_frames if not is_unrelated_product(frame)]
+            frame for frame in all_frames if not frame["unrelated"]]
         if len(filtered_frames) < len(all_frames):
             logger.info(
                 f"تعداد {len(all_frames) - len(filtered_frames)} محصول نامرتبط حذف شد")
@@ -970,18 +1459,9 @@ async def get_recommended_frames(face_shape: str, min_price: Optional[float] = N
         other_frames = []  # سایر انواع عینک
 
         for frame in all_frames:
-            # بررسی اینکه آیا محصول نامرتبط است
-            if is_unrelated_product(frame):
-                logger.info(f"محصول نامرتبط حذف شد: {frame.get('name', '')}")
-                continue
-
-            # بررسی دسته‌بندی‌های هر محصول
-            categories = frame.get("categories", [])
-            category_ids = [cat.get("id") for cat in categories]
-
-            if 17 in category_ids:  # عینک آفتابی
+            if frame["eyeglass_type"] == "آفتابی":
                 sunglasses_frames.append(frame)
-            elif 18 in category_ids:  # عینک طبی
+            elif frame["eyeglass_type"] == "طبی":
                 eyeglasses_frames.append(frame)
             else:  # سایر انواع
                 other_frames.append(frame)
@@ -990,19 +1470,21 @@ async def get_recommended_frames(face_shape: str, min_price: Optional[float] = N
         logger.info(f"تعداد عینک‌های آفتابی: {len(sunglasses_frames)}")
         logger.info(f"تعداد سایر عینک‌ها: {len(other_frames)}")
 
-        # محاسبه امتیاز تطابق برای هر دسته
-        for frame in eyeglasses_frames + sunglasses_frames + other_frames:
-            frame_type = get_frame_type(frame)
-            frame["match_score"] = calculate_match_score(
-                face_shape, frame_type)
+        # امتیاز تطابق فقط به نوع فریم بستگی دارد و برای هر نوع یک بار محاسبه می‌شود
+        type_scores = {
+            frame_type: calculate_match_score(face_shape, frame_type)
+            for frame_type in {frame["frame_type"] for frame in all_frames}
+        }
+
+        def match_score(frame):
+            return type_scores[frame["frame_type"]]
 
         # مرتب‌سازی هر دسته براساس امتیاز تطابق
         eyeglasses_frames = sorted(
-            eyeglasses_frames, key=lambda x: x.get("match_score", 0), reverse=True)
+            eyeglasses_frames, key=match_score, reverse=True)
         sunglasses_frames = sorted(
-            sunglasses_frames, key=lambda x: x.get("match_score", 0), reverse=True)
-        other_frames = sorted(other_frames, key=lambda x: x.get(
-            "match_score", 0), reverse=True)
+            sunglasses_frames, key=match_score, reverse=True)
+        other_frames = sorted(other_frames, key=match_score, reverse=True)
 
         # محاسبه تعداد فریم‌ها از هر دسته براساس توزیع تعیین شده
         eyeglasses_count = int(limit * 0.4)  # 40% عینک طبی
@@ -1086,12 +1568,12 @@ async def get_recommended_frames(face_shape: str, min_price: Optional[float] = N
                 f"تعداد فریم‌های انتخابی ({len(selected_frames)}) کمتر از تعداد درخواستی ({limit}) است")
 
             # استفاده از تمام فریم‌های موجود
-            all_sorted_frames = sorted(all_frames, key=lambda x: x.get(
-                "match_score", 0) if "match_score" in x else calculate_match_score(face_shape, get_frame_type(x)), reverse=True)
+            all_sorted_frames = sorted(all_frames, key=match_score, reverse=True)
 
             # فیلتر کردن فریم‌هایی که قبلاً انتخاب شده‌اند
+            selected_ids = {id(frame) for frame in selected_frames}
             remaining_frames = [
-                f for f in all_sorted_frames if f not in selected_frames]
+                f for f in all_sorted_frames if id(f) not in selected_ids]
 
             # اضافه کردن فریم‌های باقیمانده تا رسیدن به تعداد درخواستی
             frames_to_add = min(limit - len(selected_frames),
@@ -1107,40 +1589,20 @@ async def get_recommended_frames(face_shape: str, min_price: Optional[float] = N
             selected_frames = selected_frames[:limit]
 
         # تبدیل به فرمت پاسخ مورد نظر
+        # موجودی و لینک محصول هنگام ساخت ایندکس بررسی شده است
         recommended_frames = []
-        for product in selected_frames:
-            # بررسی وضعیت موجودی - محصولات ناموجود را نادیده می‌گیریم
-            if product.get("stock_status") != "instock":
-                continue
-
-            # بررسی permalink
-            permalink = product.get("permalink", "")
-            if "/?post_type=product&p=" in permalink or not "/product/" in permalink:
-                continue
-
-            frame_type = product.get("frame_type", get_frame_type(product))
-            match_score = product.get("match_score", 0)
-
-            # تعیین نوع عینک (طبی، آفتابی، سایر)
-            eyeglass_type = "سایر"
-            categories = product.get("categories", [])
-            category_ids = [cat.get("id") for cat in categories]
-
-            if 17 in category_ids:
-                eyeglass_type = "آفتابی"
-            elif 18 in category_ids:
-                eyeglass_type = "طبی"
-
+        for frame in selected_frames:
+            product = frame["product"]
             recommended_frames.append({
                 "id": product["id"],
                 "name": product["name"],
                 "permalink": product["permalink"],
                 "price": product.get("price", ""),
                 "regular_price": product.get("regular_price", ""),
-                "frame_type": frame_type,
-                "eyeglass_type": eyeglass_type,  # اضافه کردن نوع عینک
+                "frame_type": frame["frame_type"],
+                "eyeglass_type": frame["eyeglass_type"],  # اضافه کردن نوع عینک
                 "images": [img["src"] for img in product.get("images", [])[:3]],
-                "match_score": match_score
+                "match_score": match_score(frame)
             })
 
         logger.info(
@@ -0,0 +1,244 @@
+# app/utils/debug_artifacts.py
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# صف کارهای ذخیره‌سازی و ترد پس‌زمینه
+_queue: Optional["queue.Queue[Optional[Dict[str, Any]]]"] = None
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+
+# آمار زیرسیستم
+_stats = {
+    "submitted": 0,
+    "skipped": 0,
+    "dropped": 0,
+    "written": 0,
+    "failed": 0,
+    "pruned": 0
+}
+_stats_lock = threading.Lock()
+
+# زمان آخرین پاکسازی دایرکتوری
+_last_prune = 0.0
+
+# حداقل فاصله بین دو پاکسازی دایرکتوری (ثانیه)
+_PRUNE_INTERVAL_SECONDS = 60
+
+
+def _increment(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def _ensure_worker():
+    """راه‌اندازی ترد پس‌زمینه در اولین استفاده"""
+    global _queue, _worker
+
+    if _worker is not None and _worker.is_alive():
+        return
+
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _queue = queue.Queue(maxsize=max(1, settings.DEBUG_ARTIFACTS_QUEUE_SIZE))
+        _worker = threading.Thread(
+            target=_worker_loop, name="debug-artifacts", daemon=True)
+        _worker.start()
+
+
+def _should_sample() -> bool:
+    rate = settings.DEBUG_ARTIFACTS_SAMPLE_RATE
+    if rate <= 0:
+        return False
+    if rate >= 1:
+        return True
+    return random.random() < rate
+
+
+def save_debug_image(name: str, render: Callable[[], np.ndarray]) -> bool:
+    """
+    ثبت یک تصویر عیب‌یابی برای ذخیره در پس‌زمینه.
+
+    تصمیم نمونه‌برداری پیش از هر کاری گرفته می‌شود؛ ساخت تصویر (render)،
+    فشرده‌سازی JPEG و نوشتن روی دیسک در ترد پس‌زمینه انجام می‌شود.
+    اگر صف پر باشد تصویر کنار گذاشته می‌شود تا درخواست معطل نماند.
+
+    Args:
+        name: پیشوند نام فایل
+        render: تابع ساخت تصویر (بدون ورودی)
+
+    Returns:
+        bool: آیا تصویر برای ذخیره در صف قرار گرفت
+    """
+    if not _should_sample():
+        _increment("skipped")
+        return False
+
+    _ensure_worker()
+
+    try:
+        _queue.put_nowait({
+            "name": name,
+            "render": render,
+            "timestamp": datetime.now().strftime("%Y%m%d%H%M%S%f")
+        })
+        _increment("submitted")
+        return True
+    except queue.Full:
+        _increment("dropped")
+        logger.debug("صف تصاویر عیب‌یابی پر است، تصویر کنار گذاشته شد")
+        return False
+
+
+def _worker_loop():
+    while True:
+        job = _queue.get()
+        if job is None:
+            break
+
+        try:
+            _write_job(job)
+        except Exception as e:
+            _increment("failed")
+            logger.warning(f"خطا در ذخیره تصویر عیب‌یابی: {str(e)}")
+
+        try:
+            _maybe_prune()
+        except Exception as e:
+            logger.warning(f"خطا در پاکسازی دایرکتوری عیب‌یابی: {str(e)}")
+
+
+def _write_job(job: Dict[str, Any]):
+    image = job["render"]()
+    if image is None:
+        return
+
+    success, buffer = cv2.imencode(
+        ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, settings.DEBUG_ARTIFACTS_JPEG_QUALITY])
+    if not success:
+        raise ValueError("فشرده‌سازی تصویر ناموفق بود")
+
+    debug_dir = settings.DEBUG_ARTIFACTS_DIR
+    os.makedirs(debug_dir, exist_ok=True)
+    file_path = os.path.join(debug_dir, f"{job['name']}_{job['timestamp']}.jpg")
+
+    with open(file_path, "wb") as f:
+        f.write(buffer.tobytes())
+
+    _increment("written")
+    logger.debug(f"تصویر عیب‌یابی در فایل {file_path} ذخیره شد")
+
+
+def _maybe_prune(force: bool = False):
+    global _last_prune
+
+    now = time.time()
+    if not force and now - _last_prune < _PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = now
+
+    removed = prune_debug_directory()
+    if removed:
+        with _stats_lock:
+            _stats["pruned"] += removed
+
+
+def prune_debug_directory() -> int:
+    """
+    اعمال محدودیت سن و حجم روی دایرکتوری تصاویر عیب‌یابی.
+
+    ابتدا فایل‌های قدیمی‌تر از حداکثر سن حذف می‌شوند و سپس در صورت عبور
+    حجم از سقف، قدیمی‌ترین فایل‌ها تا رسیدن به سقف حذف می‌شوند.
+
+    Returns:
+        int: تعداد فایل‌های حذف شده
+    """
+    debug_dir = settings.DEBUG_ARTIFACTS_DIR
+    if not os.path.isdir(debug_dir):
+        return 0
+
+    files = []
+    for entry in os.scandir(debug_dir):
+        if entry.is_file():
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    files.sort()
+    removed = 0
+    max_age_seconds = settings.DEBUG_ARTIFACTS_MAX_AGE_HOURS * 3600
+    max_bytes = settings.DEBUG_ARTIFACTS_MAX_DIR_MB * 1024 * 1024
+    now = time.time()
+
+    remaining = []
+    for mtime, size, path in files:
+        if max_age_seconds > 0 and now - mtime > max_age_seconds:
+            if _remove_file(path):
+                removed += 1
+                continue
+        remaining.append((mtime, size, path))
+
+    total_size = sum(size for _, size, _ in remaining)
+    for _, size, path in remaining:
+        if max_bytes <= 0 or total_size <= max_bytes:
+            break
+        if _remove_file(path):
+            removed += 1
+            total_size -= size
+
+    if removed:
+        logger.info(f"{removed} تصویر عیب‌یابی قدیمی حذف شد")
+
+    return removed
+
+
+def _remove_file(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+def get_debug_artifact_stats() -> Dict[str, Any]:
+    """
+    دریافت آمار زیرسیستم تصاویر عیب‌یابی.
+
+    Returns:
+        dict: آمار ثبت، حذف و ذخیره تصاویر
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats["sample_rate"] = settings.DEBUG_ARTIFACTS_SAMPLE_RATE
+    stats["queue_size"] = _queue.qsize() if _queue is not None else 0
+    return stats
+
+
+def stop_debug_artifact_writer(timeout: float = 5.0):
+    """توقف ترد پس‌زمینه پس از نوشتن کارهای باقیمانده در صف"""
+    global _worker
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            return
+        try:
+            _queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("امکان توقف ترد تصاویر عیب‌یابی وجود ندارد، صف پر است")
+            return
+        _worker.join(timeout=timeout)
+        _worker = None
@@ -2,11 +2,15 @@ import cv2
 import numpy as np
 import logging
 import base64
+import io
 import os
+import tempfile
 from typing import Optional, Tuple
 from fastapi import UploadFile
-import aiofiles
 import binascii
+from PIL import Image
+
+from app.config import settings
 
 # تنظیمات لاگر
 logger = logging.getLogger(__name__)
@@ -48,6 +52,135 @@ async def validate_image_file(file: UploadFile) -> bool:
         return False
 
 
+# نوع‌های مجاز فایل ویدیو و پسوند فایل موقت متناظر
+VIDEO_CONTENT_TYPES = {
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/webm": ".webm",
+    "video/x-matroska": ".mkv"
+}
+
+
+async def save_video_upload(file: UploadFile) -> Optional[str]:
+    """
+    ذخیره فایل ویدیو آپلود شده در یک فایل موقت (VideoCapture به مسیر فایل نیاز دارد).
+
+    محتوا به صورت تکه‌ای کپی می‌شود و فایل‌های بزرگ‌تر از VIDEO_MAX_UPLOAD_MB رد می‌شوند.
+    حذف فایل موقت بر عهده فراخوانی‌کننده است.
+
+    Args:
+        file: فایل آپلود شده
+
+    Returns:
+        str: مسیر فایل موقت یا None اگر فایل نامعتبر باشد
+    """
+    suffix = VIDEO_CONTENT_TYPES.get(file.content_type)
+    if suffix is None:
+        logger.warning(f"نوع فایل ویدیو نامعتبر: {file.content_type}")
+        return None
+
+    max_bytes = settings.VIDEO_MAX_UPLOAD_MB * 1024 * 1024
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="video_")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await file.read(1024 * 1024)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    logger.warning("حجم فایل ویدیو بیش از حد مجاز است")
+                    os.remove(path)
+                    return None
+                f.write(chunk)
+    except Exception as e:
+        logger.error(f"خطا در ذخیره فایل ویدیو: {str(e)}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+    if written == 0:
+        os.remove(path)
+        return None
+
+    return path
+
+
+def get_image_size(content: bytes) -> Optional[Tuple[int, int]]:
+    """
+    خواندن ابعاد تصویر از هدر فایل بدون دیکد کردن پیکسل‌ها.
+
+    Args:
+        content: محتوای فایل تصویر
+
+    Returns:
+        tuple: (عرض، ارتفاع) یا None در صورت خطا
+    """
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            return img.size
+    except Exception as e:
+        logger.debug(f"خطا در خواندن هدر تصویر: {str(e)}")
+        return None
+
+
+# فلگ‌های دیکد با کاهش وضوح (مقیاس DCT در JPEG)
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def decode_image_bytes(content: bytes, max_dim: Optional[int] = None) -> Tuple[Optional[np.ndarray], float]:
+    """
+    دیکد تصویر از حافظه با کمترین وضوح لازم.
+
+    ابعاد تصویر از هدر خوانده می‌شود و بزرگ‌ترین ضریب کاهش (2، 4 یا 8) که
+    بزرگ‌ترین بعد را از max_dim کمتر نکند انتخاب می‌شود؛ در JPEG این کاهش
+    هنگام دیکد انجام می‌شود و آرایه با وضوح کامل ساخته نمی‌شود.
+
+    Args:
+        content: محتوای فایل تصویر
+        max_dim: حداقل اندازه بزرگ‌ترین بعد پس از کاهش (پیش‌فرض: UPLOAD_DECODE_MAX_DIM، 0 یعنی وضوح کامل)
+
+    Returns:
+        tuple: (تصویر OpenCV یا None، ضریب مقیاس نسبت به تصویر اصلی)
+    """
+    if max_dim is None:
+        max_dim = settings.UPLOAD_DECODE_MAX_DIM
+
+    np_arr = np.frombuffer(content, np.uint8)
+    flag = cv2.IMREAD_COLOR
+    original_dim = None
+
+    if max_dim and max_dim > 0:
+        size = get_image_size(content)
+        if size is not None:
+            original_dim = max(size)
+            for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+                if original_dim / factor >= max_dim:
+                    flag = reduced_flag
+                    break
+
+    try:
+        image = cv2.imdecode(np_arr, flag)
+    except cv2.error as e:
+        logger.error(f"خطا در دیکد تصویر: {str(e)}")
+        return None, 1.0
+
+    if image is None:
+        return None, 1.0
+
+    scale = 1.0
+    if flag != cv2.IMREAD_COLOR and original_dim:
+        # ابعاد پس از چرخش EXIF هم معتبر است چون بزرگ‌ترین بعد مقایسه می‌شود
+        scale = max(image.shape[:2]) / original_dim
+
+    return image, scale
+
+
 async def read_image_file(file: UploadFile) -> Optional[np.ndarray]:
     """
     خواندن فایل تصویر و تبدیل به آرایه NumPy.
@@ -59,19 +192,13 @@ async def read_image_file(file: UploadFile) -> Optional[np.ndarray]:
         numpy.ndarray: تصویر به فرمت OpenCV یا None در صورت خطا
     """
     try:
-        # خواندن محتوای فایل
-        async with aiofiles.open("temp_image", "wb") as f:
-            content = await file.read()
-            await f.write(content)
+        # خواندن محتوای فایل و دیکد در حافظه
+        content = await file.read()
         
         # بازگرداندن به ابتدای فایل
         await file.seek(0)
         
-        # استفاده از OpenCV برای خواندن تصویر
-        image = cv2.imread("temp_image")
-        
-        # حذف فایل موقت
-        os.remove("temp_image")
+        image, _ = decode_image_bytes(content)
         
         if image is None:
             logger.error("خطا در خواندن تصویر با OpenCV")
@@ -81,8 +208,6 @@ async def read_image_file(file: UploadFile) -> Optional[np.ndarray]:
         
     except Exception as e:
         logger.error(f"خطا در خواندن فایل تصویر: {str(e)}")
-        if os.path.exists("temp_image"):
-            os.remove("temp_image")
         return None
 
 
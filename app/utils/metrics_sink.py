@@ -0,0 +1,319 @@
+# app/utils/metrics_sink.py
+import atexit
+import csv
+import glob
+import logging
+import multiprocessing.util
+import os
+import re
+import socket
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+
+from app.config import settings
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# الگوی نام فایل‌ها: {name}_{YYYYMMDD}_{hostname-pid}_{شماره}.{csv|parquet}
+# (فایل‌های قدیمی بدون شناسه نویسنده هم خوانده می‌شوند)
+_FILE_PATTERN = re.compile(
+    r"^(?P<name>.+)_(?P<day>\d{8})(?:_(?P<writer>[A-Za-z0-9.-]+))?_(?P<seq>\d{3})\.(?P<ext>csv|parquet)$")
+
+
+def _writer_id() -> str:
+    """
+    شناسه نویسنده فایل (نام میزبان و شماره پروسه).
+
+    هر پروسه (uvicorn، پروسه‌های pool پردازش تصویر و workerهای Celery) در
+    فایل‌های خودش می‌نویسد تا ردیف‌ها در هم نروند و چرخش یک پروسه فایل
+    پروسه دیگری را حذف نکند. شماره پروسه در هر بار فراخوانی خوانده می‌شود
+    چون پروسه‌های fork شده نمونه ذخیره‌ساز را از والد به ارث می‌برند.
+    """
+    host = re.sub(r"[^A-Za-z0-9.-]", "-", socket.gethostname()) or "host"
+    return f"{host}-{os.getpid()}"
+
+
+class MetricsSink:
+    """
+    ذخیره‌ساز بافر شده ردیف‌های آماری.
+
+    ردیف‌ها در حافظه جمع می‌شوند و یک ترد پس‌زمینه آن‌ها را به صورت دسته‌ای
+    در فایل CSV روز جاری همین پروسه می‌نویسد. فایل‌ها براساس روز و حجم چرخش می‌کنند و در
+    حالت parquet فایل‌های CSV بسته شده به فرمت ستونی فشرده می‌شوند.
+    """
+
+    def __init__(self, name: str, fieldnames: List[str]):
+        self.name = name
+        self.fieldnames = list(fieldnames)
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._current_path: Optional[str] = None
+        self._dropped = 0
+        self._written = 0
+        self._atexit_registered = False
+        self._finalizer_pid: Optional[int] = None
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(
+                target=self._worker_loop, name=f"metrics-{self.name}", daemon=True)
+            self._worker.start()
+
+            # ترد پس از fork یا close دوباره ساخته می‌شود ولی close فقط یک بار ثبت می‌شود؛
+            # فهرست atexit به پروسه فرزند به ارث می‌رسد ولی multiprocessing فهرست
+            # Finalize را در پروسه فرزند پاک می‌کند، پس آن یکی برای هر پروسه ثبت می‌شود
+            if not self._atexit_registered:
+                self._atexit_registered = True
+                atexit.register(self.close)
+            if self._finalizer_pid != os.getpid():
+                self._finalizer_pid = os.getpid()
+                # پروسه‌های فرزند multiprocessing بدون اجرای atexit خارج می‌شوند
+                multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+
+    def write(self, row: Dict[str, Any]):
+        """
+        افزودن یک ردیف به بافر؛ نوشتن روی دیسک در پس‌زمینه انجام می‌شود.
+
+        Args:
+            row: مقادیر ردیف (کلیدهای خارج از fieldnames نادیده گرفته می‌شوند)
+        """
+        self._ensure_worker()
+
+        with self._lock:
+            # اگر دیسک کند باشد بافر بی‌نهایت رشد نمی‌کند
+            if len(self._buffer) >= settings.METRICS_MAX_BUFFERED_ROWS:
+                self._dropped += 1
+                return
+            self._buffer.append(row)
+            should_flush = len(self._buffer) >= settings.METRICS_FLUSH_ROWS
+
+        if should_flush:
+            self._wakeup.set()
+
+    def _worker_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=settings.METRICS_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"خطا در نوشتن آمار {self.name}: {str(e)}")
+
+    def flush(self) -> int:
+        """
+        نوشتن ردیف‌های بافر شده روی دیسک.
+
+        Returns:
+            int: تعداد ردیف‌های نوشته شده
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+
+        if not rows:
+            return 0
+
+        with self._flush_lock:
+            path = self._target_path()
+            file_exists = os.path.exists(path)
+
+            with open(path, "a", newline="") as f:
+                writer = csv.DictWriter(
+                    f, fieldnames=self.fieldnames, extrasaction="ignore")
+                if not file_exists:
+                    writer.writeheader()
+                writer.writerows(rows)
+
+            self._written += len(rows)
+
+        logger.debug(f"{len(rows)} ردیف آمار در فایل {path} ثبت شد")
+        return len(rows)
+
+    def _target_path(self) -> str:
+        """تعیین فایل مقصد با اعمال چرخش روزانه و حجمی؛ با قفل flush فراخوانی می‌شود"""
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        today = datetime.now().strftime("%Y%m%d")
+        writer = _writer_id()
+        max_bytes = settings.METRICS_MAX_FILE_MB * 1024 * 1024
+
+        current = self._current_path
+        if current is not None:
+            match = _FILE_PATTERN.match(os.path.basename(current))
+            if match is None or match.group("writer") != writer:
+                # مسیر از پروسه والد به ارث رسیده و متعلق به این پروسه نیست
+                current = None
+                self._current_path = None
+
+        if current is not None:
+            same_day = match.group("day") == today
+            if same_day and (max_bytes <= 0 or not os.path.exists(current)
+                             or os.path.getsize(current) < max_bytes):
+                return current
+            # فایل فعلی بسته می‌شود
+            self._finalize(current)
+
+        seq = self._next_sequence(today, writer, max_bytes)
+        self._current_path = os.path.join(
+            settings.METRICS_DIR, f"{self.name}_{today}_{writer}_{seq:03d}.csv")
+        return self._current_path
+
+    def _next_sequence(self, day: str, writer: str, max_bytes: int) -> int:
+        """پیدا کردن شماره فایل روز جاری این نویسنده (ادامه آخرین فایل در صورت داشتن ظرفیت)"""
+        last_seq = -1
+        last_path = None
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, f"{self.name}_{day}_{writer}_*")):
+            match = _FILE_PATTERN.match(os.path.basename(path))
+            if match is None or match.group("name") != self.name or match.group("writer") != writer:
+                continue
+            seq = int(match.group("seq"))
+            if seq > last_seq:
+                last_seq = seq
+                last_path = path
+
+        if last_path is None:
+            return 0
+        if last_path.endswith(".csv") and (max_bytes <= 0 or os.path.getsize(last_path) < max_bytes):
+            return last_seq
+        return last_seq + 1
+
+    def _finalize(self, path: str):
+        """تبدیل فایل CSV بسته شده به parquet در صورت فعال بودن"""
+        if settings.METRICS_FORMAT != "parquet" or not os.path.exists(path):
+            return
+
+        try:
+            import pandas as pd
+
+            parquet_path = os.path.splitext(path)[0] + ".parquet"
+            pd.read_csv(path).to_parquet(parquet_path, index=False)
+            os.remove(path)
+            logger.info(f"فایل آمار {path} به فرمت parquet تبدیل شد")
+        except ImportError:
+            logger.warning(
+                "کتابخانه pyarrow نصب نیست، فایل‌های آمار به صورت CSV باقی می‌مانند")
+        except Exception as e:
+            logger.warning(f"خطا در تبدیل فایل آمار به parquet: {str(e)}")
+
+    def close(self):
+        """توقف ترد پس‌زمینه و نوشتن ردیف‌های باقیمانده"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None and self._worker.is_alive() \
+                and self._worker is not threading.current_thread():
+            self._worker.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"خطا در نوشتن آمار {self.name}: {str(e)}")
+
+        # فایل این پروسه توسط پروسه دیگری ادامه داده نمی‌شود، پس همین‌جا بسته می‌شود
+        with self._flush_lock:
+            current = self._current_path
+            match = _FILE_PATTERN.match(os.path.basename(current)) if current else None
+            if match is not None and match.group("writer") == _writer_id():
+                self._finalize(current)
+                self._current_path = None
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار ذخیره‌ساز"""
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "written": self._written,
+                "dropped": self._dropped,
+                "current_file": self._current_path
+            }
+
+
+def _to_date(value: Union[str, date, datetime, None]) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+def list_metrics_files(
+    name: str,
+    start: Union[str, date, datetime, None] = None,
+    end: Union[str, date, datetime, None] = None
+) -> List[str]:
+    """
+    فهرست فایل‌های آمار یک ذخیره‌ساز در بازه زمانی (براساس تاریخ نام فایل)،
+    شامل فایل‌های همه نویسنده‌ها.
+
+    Args:
+        name: نام ذخیره‌ساز
+        start: تاریخ شروع (اختیاری)
+        end: تاریخ پایان (اختیاری)
+
+    Returns:
+        list: مسیر فایل‌ها به ترتیب روز، نویسنده و شماره فایل
+    """
+    start_date, end_date = _to_date(start), _to_date(end)
+    files = []
+
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, f"{name}_*")):
+        match = _FILE_PATTERN.match(os.path.basename(path))
+        if match is None or match.group("name") != name:
+            continue
+        day = datetime.strptime(match.group("day"), "%Y%m%d").date()
+        if start_date is not None and day < start_date:
+            continue
+        if end_date is not None and day > end_date:
+            continue
+        files.append((match.group("day"), match.group("writer") or "", int(match.group("seq")), path))
+
+    return [path for _, _, _, path in sorted(files)]
+
+
+def load_metrics(
+    name: str,
+    start: Union[str, date, datetime, None] = None,
+    end: Union[str, date, datetime, None] = None,
+    columns: Optional[List[str]] = None
+):
+    """
+    خواندن آمار ذخیره شده در یک بازه زمانی به صورت DataFrame.
+
+    فقط فایل‌های روزهای بازه خوانده می‌شوند؛ فایل‌های parquet فقط ستون‌های
+    درخواستی را از دیسک می‌خوانند.
+
+    Args:
+        name: نام ذخیره‌ساز
+        start: تاریخ شروع (اختیاری)
+        end: تاریخ پایان (اختیاری)
+        columns: ستون‌های مورد نیاز (پیش‌فرض: همه ستون‌ها)
+
+    Returns:
+        pandas.DataFrame: ردیف‌های آمار
+    """
+    import pandas as pd
+
+    frames = []
+    for path in list_metrics_files(name, start, end):
+        try:
+            if path.endswith(".parquet"):
+                frames.append(pd.read_parquet(path, columns=columns))
+            else:
+                frames.append(pd.read_csv(path, usecols=columns))
+        except Exception as e:
+            logger.warning(f"خطا در خواندن فایل آمار {path}: {str(e)}")
+
+    if not frames:
+        return pd.DataFrame()
+
+    return pd.concat(frames, ignore_index=True)
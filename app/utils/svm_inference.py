@@ -0,0 +1,251 @@
+# app/utils/svm_inference.py
+import logging
+import os
+from typing import Any, Dict
+
+import numpy as np
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+
+# نسخه قالب خروجی آرایه‌ای مدل
+_ARRAYS_FORMAT_VERSION = 1
+
+# حداقل احتمال جفتی در libsvm
+_MIN_PAIRWISE_PROB = 1e-7
+
+
+class NumpySVMModel:
+    """
+    ارزیاب NumPy برای مدل SVC آموزش دیده با probability=True.
+
+    تابع تصمیم یک‌به‌یک (OvO)، تبدیل Platt و ترکیب احتمالات جفتی دقیقاً
+    مطابق libsvm پیاده‌سازی شده است و predict_proba آن با scikit-learn برابر
+    است. مقیاس‌دهی StandardScaler هم داخل مدل انجام می‌شود.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.classes_ = arrays["classes"]
+        self.support_vectors = arrays["support_vectors"].astype(np.float64)
+        self.dual_coef = arrays["dual_coef"].astype(np.float64)
+        self.intercept = arrays["intercept"].astype(np.float64)
+        self.prob_a = arrays["prob_a"].astype(np.float64)
+        self.prob_b = arrays["prob_b"].astype(np.float64)
+        self.kernel = str(arrays["kernel"])
+        self.gamma = float(arrays["gamma"])
+        self.coef0 = float(arrays["coef0"])
+        self.degree = int(arrays["degree"])
+        self.scaler_mean = arrays.get("scaler_mean")
+        self.scaler_scale = arrays.get("scaler_scale")
+        self.n_features_in_ = self.support_vectors.shape[1]
+
+        # بازه بردارهای پشتیبان هر کلاس و نرم آن‌ها برای هسته RBF
+        self._bounds = np.concatenate(
+            [[0], np.cumsum(arrays["n_support"])]).astype(int)
+        self._sv_norms = np.einsum(
+            "ij,ij->i", self.support_vectors, self.support_vectors)
+
+    @classmethod
+    def from_sklearn(cls, svm_model: Any, svm_scaler: Any = None) -> "NumpySVMModel":
+        """ساخت ارزیاب از مدل SVC و اسکیلر scikit-learn"""
+        return cls(_model_to_arrays(svm_model, svm_scaler))
+
+    @classmethod
+    def load(cls, path: str) -> "NumpySVMModel":
+        """بارگیری خروجی آرایه‌ای مدل از فایل .npz"""
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+
+        if int(arrays.get("format_version", 0)) != _ARRAYS_FORMAT_VERSION:
+            raise ValueError(f"نسخه قالب فایل مدل پشتیبانی نمی‌شود: {path}")
+        return cls(arrays)
+
+    def _kernel(self, X: np.ndarray) -> np.ndarray:
+        dot = X @ self.support_vectors.T
+        if self.kernel == "rbf":
+            sq_dist = np.einsum("ij,ij->i", X, X)[:, np.newaxis] + self._sv_norms - 2 * dot
+            return np.exp(-self.gamma * np.maximum(sq_dist, 0.0))
+        if self.kernel == "linear":
+            return dot
+        if self.kernel == "poly":
+            return (self.gamma * dot + self.coef0) ** self.degree
+        return np.tanh(self.gamma * dot + self.coef0)
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"تعداد ویژگی‌ها باید {self.n_features_in_} باشد (دریافت شده: {X.shape[1]})")
+        if self.scaler_mean is not None:
+            X = (X - self.scaler_mean) / self.scaler_scale
+        return X
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """
+        مقادیر تصمیم یک‌به‌یک libsvm برای هر جفت کلاس (i, j) با i < j.
+
+        Args:
+            X: ماتریس ویژگی‌ها (پیش از مقیاس‌دهی)
+
+        Returns:
+            numpy.ndarray: ماتریس با ابعاد (N, k*(k-1)/2)
+        """
+        kernel = self._kernel(self._scale(X))
+        n_classes = len(self.classes_)
+        bounds = self._bounds
+
+        decisions = np.empty((kernel.shape[0], n_classes * (n_classes - 1) // 2))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                si, ei = bounds[i], bounds[i + 1]
+                sj, ej = bounds[j], bounds[j + 1]
+                decisions[:, pair] = kernel[:, si:ei] @ self.dual_coef[j - 1, si:ei] \
+                    + kernel[:, sj:ej] @ self.dual_coef[i, sj:ej] + self.intercept[pair]
+                pair += 1
+        return decisions
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        احتمال هر کلاس (معادل SVC.predict_proba).
+
+        Args:
+            X: ماتریس ویژگی‌ها (پیش از مقیاس‌دهی)
+
+        Returns:
+            numpy.ndarray: ماتریس احتمالات با ابعاد (N, k)
+        """
+        decisions = self.decision_function(X)
+        n_samples, n_classes = decisions.shape[0], len(self.classes_)
+
+        # تبدیل Platt با فرم پایدار عددی libsvm
+        f_apb = decisions * self.prob_a + self.prob_b
+        exp_neg = np.exp(-np.abs(f_apb))
+        pairwise_prob = np.where(
+            f_apb >= 0, exp_neg / (1.0 + exp_neg), 1.0 / (1.0 + exp_neg))
+        pairwise_prob = np.clip(
+            pairwise_prob, _MIN_PAIRWISE_PROB, 1 - _MIN_PAIRWISE_PROB)
+
+        r = np.zeros((n_samples, n_classes, n_classes))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                r[:, i, j] = pairwise_prob[:, pair]
+                r[:, j, i] = 1 - pairwise_prob[:, pair]
+                pair += 1
+
+        return _multiclass_probability(r)
+
+
+def _multiclass_probability(r: np.ndarray) -> np.ndarray:
+    """
+    ترکیب احتمالات جفتی به احتمال کلاس‌ها (روش دوم Wu، Lin و Weng در libsvm).
+
+    حلقه Gauss-Seidel برای همه نمونه‌ها با هم اجرا می‌شود و هر نمونه مانند
+    libsvm پس از همگرایی کنار گذاشته می‌شود.
+
+    Args:
+        r: احتمالات جفتی با ابعاد (N, k, k)
+
+    Returns:
+        numpy.ndarray: احتمالات با ابعاد (N, k)
+    """
+    n_samples, k = r.shape[0], r.shape[1]
+    max_iter = max(100, k)
+    eps = 0.005 / k
+
+    # Q[t][t] = sum_{j != t} r[j][t]^2 و Q[t][j] = -r[j][t] * r[t][j]
+    r_t = np.swapaxes(r, 1, 2)
+    Q = -r_t * r
+    diagonal = np.einsum("nij,nij->nj", r, r) - np.einsum("nii->ni", r * r)
+    idx = np.arange(k)
+    Q[:, idx, idx] = diagonal
+
+    p = np.full((n_samples, k), 1.0 / k)
+    active = np.arange(n_samples)
+
+    for _ in range(max_iter):
+        Qa, pa = Q[active], p[active]
+        Qp = np.einsum("nij,nj->ni", Qa, pa)
+        pQp = np.einsum("ni,ni->n", pa, Qp)
+
+        converged = np.max(np.abs(Qp - pQp[:, np.newaxis]), axis=1) < eps
+        if converged.any():
+            Qa, pa, Qp, pQp = Qa[~converged], pa[~converged], Qp[~converged], pQp[~converged]
+            active = active[~converged]
+        if len(active) == 0:
+            break
+
+        for t in range(k):
+            diff = (-Qp[:, t] + pQp) / Qa[:, t, t]
+            pa[:, t] += diff
+            scale = 1 + diff
+            pQp = (pQp + diff * (diff * Qa[:, t, t] + 2 * Qp[:, t])) / scale / scale
+            Qp = (Qp + diff[:, np.newaxis] * Qa[:, t, :]) / scale[:, np.newaxis]
+            pa /= scale[:, np.newaxis]
+
+        p[active] = pa
+    else:
+        logger.warning("ترکیب احتمالات جفتی به حداکثر تکرار رسید")
+
+    return p
+
+
+def _model_to_arrays(svm_model: Any, svm_scaler: Any = None) -> Dict[str, np.ndarray]:
+    """استخراج آرایه‌های لازم برای ارزیاب NumPy از SVC و StandardScaler"""
+    prob_a = getattr(svm_model, "probA_", None)
+    if prob_a is None or len(prob_a) == 0:
+        raise ValueError("مدل باید با probability=True آموزش داده شده باشد")
+    if svm_model.kernel not in ("rbf", "linear", "poly", "sigmoid"):
+        raise ValueError(f"هسته {svm_model.kernel} پشتیبانی نمی‌شود")
+
+    arrays = {
+        "format_version": np.array(_ARRAYS_FORMAT_VERSION),
+        "classes": np.asarray(svm_model.classes_).astype(str),
+        "support_vectors": np.asarray(svm_model.support_vectors_, dtype=np.float64),
+        # ضرایب و عرض از مبدأ خام libsvm (در حالت دو کلاسه، نسخه عمومی scikit-learn قرینه شده است)
+        "dual_coef": np.asarray(svm_model._dual_coef_, dtype=np.float64),
+        "intercept": np.asarray(svm_model._intercept_, dtype=np.float64),
+        "n_support": np.asarray(svm_model.n_support_, dtype=np.int64),
+        "prob_a": np.asarray(svm_model.probA_, dtype=np.float64),
+        "prob_b": np.asarray(svm_model.probB_, dtype=np.float64),
+        "kernel": np.array(svm_model.kernel),
+        "gamma": np.array(float(svm_model._gamma)),
+        "coef0": np.array(float(svm_model.coef0)),
+        "degree": np.array(int(svm_model.degree))
+    }
+
+    if svm_scaler is not None:
+        if not hasattr(svm_scaler, "mean_"):
+            raise ValueError("اسکیلر آموزش داده نشده است")
+        arrays["scaler_mean"] = np.asarray(svm_scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(svm_scaler.scale_, dtype=np.float64)
+
+    return arrays
+
+
+def export_model_arrays(svm_model: Any, svm_scaler: Any, path: str) -> str:
+    """
+    ذخیره مدل SVC و اسکیلر به صورت آرایه‌های فشرده برای ارزیاب NumPy.
+
+    Args:
+        svm_model: مدل SVC آموزش دیده با probability=True
+        svm_scaler: اسکیلر StandardScaler (اختیاری)
+        path: مسیر فایل .npz
+
+    Returns:
+        str: مسیر فایل ذخیره شده
+    """
+    arrays = _model_to_arrays(svm_model, svm_scaler)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+    logger.info(f"خروجی آرایه‌ای مدل در مسیر {path} ذخیره شد")
+    return path
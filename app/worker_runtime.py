@@ -0,0 +1,102 @@
+# app/worker_runtime.py
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Optional
+
+# تنظیمات لاگر
+logger = logging.getLogger(__name__)
+
+# event loop ثابت هر پروسه ورکر و ترد اجرای آن
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def start_worker_runtime(connect_database: bool = True) -> asyncio.AbstractEventLoop:
+    """
+    راه‌اندازی event loop ثابت این پروسه در یک ترد جداگانه.
+
+    همه توابع async وظایف Celery روی همین loop اجرا می‌شوند تا کلاینت Motor
+    و کانکشن‌های آن در طول عمر پروسه یک بار ساخته شوند.
+
+    Args:
+        connect_database: برقراری اتصال MongoDB روی loop
+
+    Returns:
+        asyncio.AbstractEventLoop: event loop پروسه
+    """
+    global _loop, _thread
+
+    with _lock:
+        if _loop is not None and _thread is not None and _thread.is_alive():
+            return _loop
+
+        _loop = asyncio.new_event_loop()
+        _thread = threading.Thread(
+            target=_run_loop, args=(_loop,), name="worker-event-loop", daemon=True)
+        _thread.start()
+        logger.info("event loop ورکر راه‌اندازی شد")
+
+    if connect_database:
+        try:
+            ensure_database()
+        except Exception as e:
+            # وظایف در اولین نیاز دوباره برای اتصال تلاش می‌کنند
+            logger.warning(f"خطا در اتصال ورکر به MongoDB: {str(e)}")
+
+    return _loop
+
+
+def run_async(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    اجرای یک coroutine روی event loop ثابت پروسه و انتظار برای نتیجه.
+
+    Args:
+        coro: coroutine
+        timeout: حداکثر زمان انتظار (ثانیه)
+
+    Returns:
+        Any: نتیجه coroutine
+    """
+    loop = _loop
+    if loop is None or _thread is None or not _thread.is_alive():
+        loop = start_worker_runtime(connect_database=False)
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    return future.result(timeout)
+
+
+def ensure_database():
+    """برقراری اتصال MongoDB روی loop پروسه (در صورت نبود اتصال)"""
+    from app.db.connection import connect_to_mongo
+    run_async(connect_to_mongo())
+
+
+def stop_worker_runtime(timeout: float = 10.0):
+    """بستن اتصال MongoDB و توقف event loop پروسه"""
+    global _loop, _thread
+
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop, _thread = None, None
+
+    if loop is None or thread is None or not thread.is_alive():
+        return
+
+    try:
+        from app.db.connection import close_mongo_connection
+        asyncio.run_coroutine_threadsafe(
+            close_mongo_connection(), loop).result(timeout)
+    except Exception as e:
+        logger.warning(f"خطا در بستن اتصال MongoDB ورکر: {str(e)}")
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    loop.close()
+    logger.info("event loop ورکر متوقف شد")
@@ -5,6 +5,7 @@ import joblib
 import logging
 import mediapipe as mp
 import argparse
+import sys
 from PIL import Image, ImageDraw, ImageFont
 import matplotlib.pyplot as plt
 from tqdm import tqdm
@@ -43,6 +44,107 @@ SHAPE_COLORS = {
 }
 
 
+def check_synthetic_numpy_parity(tolerance=1e-6, num_samples=500):
+    """
+    مقایسه ارزیاب NumPy با SVC(probability=True) روی مدل‌های مصنوعی.
+
+    به فایل مدل آموزش دیده نیاز ندارد؛ برای هر کرنل یک مدل دو کلاسه و یک
+    مدل پنج کلاسه آموزش داده و احتمالات دو پیاده‌سازی مقایسه می‌شوند.
+
+    Returns:
+        bool: True اگر همه مدل‌ها در محدوده tolerance باشند
+    """
+    from sklearn.datasets import make_classification
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+    from app.utils.svm_inference import NumpySVMModel
+
+    passed = True
+    for n_classes in (2, 5):
+        X, y = make_classification(
+            n_samples=300, n_features=8, n_informative=6, n_redundant=0,
+            n_classes=n_classes, random_state=n_classes)
+        scaler = StandardScaler().fit(X)
+        features = np.random.default_rng(n_classes).standard_normal(
+            (num_samples, X.shape[1])) * X.std(axis=0) * 1.5 + X.mean(axis=0)
+
+        for kernel in ('rbf', 'linear', 'poly', 'sigmoid'):
+            svm_model = SVC(kernel=kernel, probability=True, random_state=0)
+            svm_model.fit(scaler.transform(X), y)
+
+            expected = svm_model.predict_proba(scaler.transform(features))
+            actual = NumpySVMModel.from_sklearn(svm_model, scaler).predict_proba(features)
+            max_error = float(np.max(np.abs(expected - actual)))
+
+            ok = max_error <= tolerance
+            passed = passed and ok
+            logger.info(
+                f"Synthetic NumPy parity ({n_classes} classes, {kernel}): "
+                f"max abs error {max_error:.2e} {'OK' if ok else 'FAILED'}")
+
+    if not passed:
+        logger.error(f"Synthetic NumPy parity check failed (tolerance {tolerance})")
+    return passed
+
+
+def check_batch_detection(test_dir, max_images=32, batch_size=8):
+    """
+    مقایسه خروجی detect_faces_batch با تشخیص تک تصویری برای هر تصویر.
+
+    برای تصاویری که DNN دسته‌ای چهره را پیدا کرده، مختصات باید با اجرای DNN
+    روی همان تصویر یکسان باشد و برای بقیه (مسیر fallback) ساختار نتیجه باید با
+    detect_face یکسان باشد. یک تصویر خالی (بدون چهره) و یک ورودی None هم
+    اضافه می‌شوند تا مسیر fallback و ورودی نامعتبر همیشه بررسی شوند.
+
+    Returns:
+        bool: True اگر همه تصاویر با تشخیص تک تصویری سازگار باشند
+    """
+    from app.core.face_detection import detect_faces_batch, detect_face, _detect_with_dnn
+
+    image_paths = []
+    for root, _, files in os.walk(test_dir):
+        image_paths.extend(os.path.join(root, f) for f in sorted(files)
+                           if f.lower().endswith(('.jpg', '.jpeg', '.png')))
+    image_paths = sorted(image_paths)[:max_images]
+
+    labels = image_paths + ['<blank>', '<none>']
+    images = [cv2.imread(path) for path in image_paths] + \
+        [np.full((480, 640, 3), 127, dtype=np.uint8), None]
+
+    results = detect_faces_batch(images, batch_size=batch_size)
+
+    passed = True
+    dnn_count = fallback_count = 0
+    for label, image, result in zip(labels, images, results):
+        problems = []
+
+        if image is None or image.size == 0:
+            if result.get("success", True):
+                problems.append("invalid input reported as success")
+        elif result.get("success") and result["face"].get("source") == "dnn":
+            dnn_count += 1
+            expected_face = _detect_with_dnn(image)
+            if result["face"] != expected_face:
+                problems.append(f"DNN face {result['face']} != single-image DNN face {expected_face}")
+        else:
+            fallback_count += 1
+            expected = detect_face(image)
+            if set(result) != set(expected) or result["success"] != expected["success"]:
+                problems.append(f"keys/success {sorted(result)} {result['success']} != "
+                                f"detect_face {sorted(expected)} {expected['success']}")
+            elif result["success"] and set(result["face"]) != set(expected["face"]):
+                problems.append("face keys differ from detect_face")
+
+        if problems:
+            passed = False
+            logger.error(f"Batch detection mismatch for {label}: {'; '.join(problems)}")
+
+    logger.info(
+        f"Batch detection check: {len(images)} images, {dnn_count} batched DNN hits, "
+        f"{fallback_count} fallback/no-face, {'OK' if passed else 'FAILED'}")
+    return passed
+
+
 class FaceShapeTester:
     def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
         """مقداردهی اولیه کلاس تست مدل تشخیص شکل چهره"""
@@ -278,6 +380,12 @@ class FaceShapeTester:
         if features is None:
             return None, None
 
+        return self.predict_face_shapes(features)[0]
+
+    def predict_face_shapes(self, features):
+        """پیش‌بینی شکل چند چهره با یک بار مقیاس‌دهی و یک بار فراخوانی predict_proba"""
+        features = np.asarray(features).reshape(len(features), -1)
+
         # مقیاس‌دهی ویژگی‌ها
         if self.scaler is not None:
             features_scaled = self.scaler.transform(features)
@@ -285,14 +393,45 @@ class FaceShapeTester:
             features_scaled = features
 
         # پیش‌بینی شکل چهره
-        predicted_shape = self.model.predict(features_scaled)[0]
+        predicted_shapes = self.model.predict(features_scaled)
 
         # پیش‌بینی احتمالات
-        prediction_proba = self.model.predict_proba(features_scaled)[0]
-        max_proba_idx = np.argmax(prediction_proba)
-        confidence = prediction_proba[max_proba_idx] * 100
+        prediction_proba = self.model.predict_proba(features_scaled)
+        confidences = np.max(prediction_proba, axis=1) * 100
 
-        return predicted_shape, confidence
+        return list(zip(predicted_shapes, confidences))
+
+    def check_numpy_parity(self, num_samples=1000, tolerance=1e-6):
+        """مقایسه احتمالات ارزیاب NumPy سرویس با predict_proba مدل scikit-learn"""
+        import time
+        from app.utils.svm_inference import NumpySVMModel
+
+        numpy_model = NumpySVMModel.from_sklearn(self.model, self.scaler)
+
+        # نمونه‌های تصادفی در محدوده داده‌های آموزشی اسکیلر
+        rng = np.random.default_rng(0)
+        features = self.scaler.mean_ + rng.standard_normal(
+            (num_samples, len(self.scaler.mean_))) * self.scaler.scale_ * 1.5
+
+        start = time.perf_counter()
+        expected = self.model.predict_proba(self.scaler.transform(features))
+        sklearn_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        actual = numpy_model.predict_proba(features)
+        numpy_ms = (time.perf_counter() - start) * 1000
+
+        max_error = float(np.max(np.abs(expected - actual)))
+        argmax_match = float(np.mean(
+            np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+
+        logger.info(
+            f"NumPy parity: max abs error {max_error:.2e}, argmax agreement {argmax_match:.2%}, "
+            f"sklearn {sklearn_ms:.2f} ms, numpy {numpy_ms:.2f} ms ({num_samples} samples)")
+        if max_error > tolerance:
+            logger.error(f"NumPy parity check failed (tolerance {tolerance})")
+            return False
+        return True
 
     def test_single_image(self, image_path, output_dir=OUTPUT_DIR):
         """تست یک تصویر و نمایش نتیجه"""
@@ -399,21 +538,21 @@ class FaceShapeTester:
             logger.info(
                 f"Testing {len(selected_files)} images of type {true_shape}...")
 
+            # استخراج ویژگی‌های همه تصاویر و پیش‌بینی یک‌جای آن‌ها
+            extracted = []
             for image_file in tqdm(selected_files, desc=f"Testing {true_shape}"):
                 image_path = os.path.join(shape_path, image_file)
-
-                # استخراج ویژگی‌ها
                 features, _ = self.extract_features_from_image(image_path)
+                if features is not None:
+                    extracted.append((image_file, image_path, features))
 
-                if features is None:
-                    continue
-
-                # پیش‌بینی شکل چهره
-                predicted_shape, confidence = self.predict_face_shape(features)
-
-                if predicted_shape is None:
-                    continue
+            if extracted:
+                predictions = self.predict_face_shapes(
+                    np.vstack([features for _, _, features in extracted]))
+            else:
+                predictions = []
 
+            for (image_file, image_path, features), (predicted_shape, confidence) in zip(extracted, predictions):
                 # افزودن به نتایج
                 shape_results.append({
                     "file": image_file,
@@ -543,15 +682,37 @@ def main():
                         help='Path to scaler file (default: data/face_shape_model_scaler.pkl)')
     parser.add_argument('--num_samples', type=int, default=10,
                         help='Number of test samples per class (default: 10)')
+    parser.add_argument('--check_numpy_parity', action='store_true',
+                        help='Compare the NumPy inference engine with scikit-learn and exit')
+    parser.add_argument('--check_numpy_parity_synthetic', action='store_true',
+                        help='Compare the NumPy inference engine with scikit-learn on synthetic '
+                             'models (no trained model needed) and exit')
+
+    parser.add_argument('--check_batch_detection', action='store_true',
+                        help='Compare detect_faces_batch with single-image detection on the '
+                             'images under --test_dir and exit')
 
     args = parser.parse_args()
 
+    # مقایسه تشخیص دسته‌ای با تشخیص تک تصویری؛ کد خروج نتیجه را نشان می‌دهد
+    if args.check_batch_detection:
+        sys.exit(0 if check_batch_detection(args.test_dir) else 1)
+
+    # مقایسه روی مدل‌های مصنوعی بدون نیاز به فایل مدل؛ کد خروج نتیجه را نشان می‌دهد
+    if args.check_numpy_parity_synthetic:
+        sys.exit(0 if check_synthetic_numpy_parity() else 1)
+
     # راه‌اندازی تستر
     try:
         tester = FaceShapeTester(args.model_path, args.scaler_path)
 
+        # مقایسه ارزیاب NumPy با scikit-learn
+        if args.check_numpy_parity:
+            if not tester.check_numpy_parity():
+                sys.exit(1)
+
         # تست یک تصویر خاص
-        if args.single_image:
+        elif args.single_image:
             if os.path.exists(args.single_image):
                 tester.test_single_image(args.single_image, args.output_dir)
             else:
@@ -567,6 +728,8 @@ def main():
 
     except Exception as e:
         logger.error(f"Error in running test: {str(e)}")
+        if args.check_numpy_parity:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
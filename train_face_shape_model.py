@@ -439,6 +439,11 @@ class FaceShapeTrainer:
         joblib.dump(scaler, os.path.join(
             OUTPUT_DIR, 'face_shape_model_scaler.pkl'))
 
+        # خروجی آرایه‌ای برای ارزیاب NumPy سرویس (بدون نیاز به scikit-learn)
+        from app.utils.svm_inference import export_model_arrays
+        export_model_arrays(svm_model, scaler, os.path.join(
+            OUTPUT_DIR, 'face_shape_model.npz'))
+
         logger.info(f"مدل و اسکیلر با موفقیت در مسیر {OUTPUT_DIR} ذخیره شدند")
 
         return svm_model, scaler, test_accuracy, cm